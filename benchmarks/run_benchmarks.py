@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Author: Michal Szymanski <misiektoja-github@rm-rf.ninja>
+v1.8.1
+
+Micro and macro benchmarks of steam_monitor's hot paths:
+https://github.com/misiektoja/steam_monitor/
+
+Results are saved as JSON (with the git commit they were measured on), so runs from different commits can be
+compared and regressions flagged.
+
+Examples:
+
+python3 benchmarks/run_benchmarks.py run -o before.json
+python3 benchmarks/run_benchmarks.py run -o after.json -k colorize
+python3 benchmarks/run_benchmarks.py compare before.json after.json --threshold 0.1
+"""
+
+import sys
+
+if sys.version_info < (3, 6):
+    print("* Error: Python version 3.6 or higher required !")
+    sys.exit(1)
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from array import array
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import steam_fake_api  # noqa: E402
+import steam_monitor  # noqa: E402
+
+RESULTS_FORMAT_VERSION = 1
+
+# Typical console lines printed while monitoring, used by the colorizer benchmarks
+LOG_LINES = [
+    "Steam64 ID:\t\t\t76561197960265729",
+    "Display name:\t\t\talice",
+    "Status:\t\t\t\tONLINE",
+    "User is currently in-game:\tDota 2",
+    "Steam user alice changed status from offline to online",
+    "User was offline for 2 hours, 13 minutes (Sun 21 Apr 2024, 13:01:12 - Sun 21 Apr 2024, 15:14:40)",
+    "Steam user alice started playing 'Counter-Strike 2'",
+    "Steam user alice played 'Dota 2' for 45 minutes",
+    "Timestamp:\t\t\tSun 21 Apr 2024, 15:14:40",
+    "─" * 113,
+]
+
+
+# Enables coloured output with the default theme regardless of the terminal, as the monitor does on a tty
+def enable_colors():
+    steam_monitor.COLOR_ENABLED = True
+    steam_monitor._COLOR_STYLES = {name: seq for name, seq in ((name, steam_monitor._build_ansi_sequence(style)) for name, style in steam_monitor.DEFAULT_COLOR_THEME.items()) if seq}
+
+
+# Returns a GetOwnedGames response with the given number of games
+def owned_games_payload(games):
+    rnd = random.Random(games)
+    return {"response": {"game_count": games, "games": [{"appid": 10 + i * 10, "name": f"Game {i}", "playtime_forever": rnd.randint(0, 100000), "img_icon_url": "%040x" % rnd.getrandbits(160), "has_community_visible_stats": True, "playtime_windows_forever": rnd.randint(0, 1000), "playtime_mac_forever": 0, "playtime_linux_forever": 0, "playtime_deck_forever": 0, "rtime_last_played": 1700000000 + rnd.randint(0, 10000000), "playtime_disconnected": 0} for i in range(games)]}}
+
+
+def bench_colorize_line():
+    enable_colors()
+
+    def run():
+        for line in LOG_LINES:
+            steam_monitor._colorize_line(line)
+    return run, len(LOG_LINES)
+
+
+def bench_apply_color_to_text():
+    enable_colors()
+    text = "\n".join(LOG_LINES) + "\n"
+
+    def run():
+        steam_monitor.apply_color_to_text(text)
+    return run, len(LOG_LINES)
+
+
+def bench_calculate_timespan():
+    def run():
+        steam_monitor.calculate_timespan(1713712872, 1713704472)
+        steam_monitor.calculate_timespan(1713712872, 1700000000, show_seconds=False)
+    return run, 2
+
+
+def bench_display_time():
+    def run():
+        steam_monitor.display_time(59)
+        steam_monitor.display_time(7980)
+        steam_monitor.display_time(1209600)
+    return run, 3
+
+
+def bench_get_range_of_dates_from_tss():
+    def run():
+        steam_monitor.get_range_of_dates_from_tss(1713704472, 1713712872, short=True)
+        steam_monitor.get_range_of_dates_from_tss(1713704472, 1716304472)
+    return run, 2
+
+
+def bench_write_csv_entry(tmp_dir):
+    csv_file = os.path.join(tmp_dir, "bench.csv")
+    steam_monitor.init_csv_file(csv_file)
+    ts = datetime.fromtimestamp(1713712872)
+
+    def run():
+        steam_monitor.write_csv_entry(csv_file, ts, "online", "Dota 2", 570)
+    return run, 1
+
+
+# Friends lists are sorted Steam64 ID arrays compared with a linear merge; a few friends are added and removed
+def bench_friends_diff(size):
+    rnd = random.Random(size)
+    old_ids = sorted(rnd.sample(range(76561197960265728, 76561197960265728 + size * 10), size))
+    new_ids = array('Q', sorted(old_ids[size // 10:] + [76561197960265728 + size * 10 + i for i in range(max(1, size // 100))]))
+    old_ids = array('Q', old_ids)
+
+    def run():
+        steam_monitor.diff_sorted_ids(old_ids, new_ids)
+    return run, 1
+
+
+# Games libraries are sets of appids compared as in detect_events()
+def bench_library_diff(size):
+    old_appids = set(range(10, 10 + size * 10, 10))
+    new_appids = set(list(old_appids)[1:]) | {size * 10 + 20}
+
+    def run():
+        sorted(new_appids - old_appids)
+        sorted(old_appids - new_appids)
+    return run, 1
+
+
+def bench_owned_games_json(games):
+    data = json.dumps(owned_games_payload(games))
+
+    def run():
+        steam_monitor.get_games_playtimes(json.loads(data))
+    return run, 1
+
+
+# Full monitoring of a synthetic user with all tracking features enabled, run in-process on a virtual clock
+# against the fake API (run_simulation); reported per poll
+def bench_poll_cycle(tmp_dir):
+    scenario = steam_fake_api.generate_scenario(20, 86400, seed=1)
+    steamid = min(scenario["users"])
+    scenario_file = os.path.join(tmp_dir, "scenario.json")
+    with open(scenario_file, "w", encoding="utf-8") as f:
+        json.dump(scenario, f)
+    duration = 6 * 3600
+    polls = duration // 60
+
+    settings = {"STEAM_CHECK_INTERVAL": 60, "STEAM_ACTIVE_CHECK_INTERVAL": 60, "STEAM_LEVEL_XP_CHECK": True, "FRIENDS_CHECK": True, "GAMES_LIBRARY_CHECK": True, "PLAYTIME_CHECK": True, "ACHIEVEMENTS_CHECK": True, "LIVENESS_CHECK_COUNTER": 0, "API_RATE_LIMIT": 0}
+
+    def run():
+        saved = {name: getattr(steam_monitor, name) for name in settings}
+        cwd = os.getcwd()
+        os.chdir(tmp_dir)
+        try:
+            for name, value in settings.items():
+                setattr(steam_monitor, name, value)
+            with contextlib.redirect_stdout(io.StringIO()):
+                steam_monitor.run_simulation(steamid, scenario_file, duration, None)
+        finally:
+            os.chdir(cwd)
+            for name, value in saved.items():
+                setattr(steam_monitor, name, value)
+    return run, polls
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Import time of steam_monitor as reported by python -X importtime (cumulative, including all imported modules)
+# in a fresh interpreter, i.e. what every cron-driven one-shot run (-i, --version etc.) pays before doing any work
+def bench_startup_import():
+    subprocess.check_call([sys.executable, "-m", "py_compile", os.path.join(REPO_DIR, "steam_monitor.py")])
+
+    def sample():
+        output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import steam_monitor"], cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True).stderr.decode()
+        for line in output.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == "steam_monitor":
+                return int(fields[1]) / 1e6
+        raise RuntimeError("steam_monitor not found in -X importtime output")
+    return sample, None
+
+
+# Wall time of a complete steam_monitor --version run (interpreter startup, imports and argument parsing)
+def bench_startup_version():
+    def sample():
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import sys, steam_monitor; sys.argv = ['steam_monitor', '--version']; steam_monitor.main()"], cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+    return sample, None
+
+
+# Returns [(name, factory)] of all benchmarks; factories return (function, operations per call) for timed
+# benchmarks or (sample function returning seconds, None) for benchmarks measuring themselves
+def get_benchmarks(tmp_dir):
+    benchmarks = [
+        ("colorize_line", bench_colorize_line),
+        ("apply_color_to_text", bench_apply_color_to_text),
+        ("calculate_timespan", bench_calculate_timespan),
+        ("display_time", bench_display_time),
+        ("get_range_of_dates_from_tss", bench_get_range_of_dates_from_tss),
+        ("write_csv_entry", lambda: bench_write_csv_entry(tmp_dir)),
+    ]
+    for size in (10, 1000, 10000):
+        benchmarks.append((f"friends_diff_{size}", lambda size=size: bench_friends_diff(size)))
+        benchmarks.append((f"library_diff_{size}", lambda size=size: bench_library_diff(size)))
+    for games in (100, 5000):
+        benchmarks.append((f"owned_games_json_{games}", lambda games=games: bench_owned_games_json(games)))
+    benchmarks.append(("poll_cycle", lambda: bench_poll_cycle(tmp_dir)))
+    benchmarks.append(("startup_import", bench_startup_import))
+    benchmarks.append(("startup_version", bench_startup_version))
+    return benchmarks
+
+
+# Times the function: the number of calls per run is calibrated to take at least min_time, then the best, median,
+# mean and standard deviation of the time per operation over the runs are returned
+def measure(func, ops_per_call, runs=5, min_time=0.2):
+    func()
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or calls >= 1 << 24:
+            break
+        calls *= 10 if elapsed < min_time / 10 else 2
+
+    timings = [elapsed]
+    for _ in range(runs - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        timings.append(time.perf_counter() - start)
+    per_op = [t / (calls * ops_per_call) for t in timings]
+    return {"min": min(per_op), "median": statistics.median(per_op), "mean": statistics.mean(per_op), "stdev": statistics.stdev(per_op) if len(per_op) > 1 else 0.0, "runs": len(per_op), "ops": calls * ops_per_call}
+
+
+# Collects samples of a benchmark measuring itself (after one warm-up call) and returns the same statistics as measure()
+def collect_samples(sample, runs=5):
+    sample()
+    values = [sample() for _ in range(runs)]
+    return {"min": min(values), "median": statistics.median(values), "mean": statistics.mean(values), "stdev": statistics.stdev(values) if len(values) > 1 else 0.0, "runs": len(values), "ops": 1}
+
+
+# Returns the current git commit of the repository or None
+def get_git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip() or None
+    except Exception:
+        return None
+
+
+# Formats the time per operation with a suitable unit
+def format_duration(seconds):
+    for unit, factor in (("s", 1), ("ms", 1e3), ("us", 1e6)):
+        if seconds * factor >= 1:
+            return f"{seconds * factor:.2f} {unit}"
+    return f"{seconds * 1e9:.1f} ns"
+
+
+def run_benchmarks(output_file, pattern=None, runs=5, min_time=0.2):
+    commit = get_git_commit()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, factory in get_benchmarks(tmp_dir):
+            if pattern and pattern not in name:
+                continue
+            func, ops_per_call = factory()
+            results[name] = measure(func, ops_per_call, runs, min_time) if ops_per_call else collect_samples(func, runs)
+            print(f"{name:<32} {format_duration(results[name]['median']):>12} per op (min {format_duration(results[name]['min'])}, {results[name]['ops']} ops/run)", flush=True)
+
+    data = {"version": RESULTS_FORMAT_VERSION, "created": datetime.now().isoformat(timespec="seconds"), "commit": commit, "python": platform.python_version(), "platform": platform.platform(), "results": results}
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"\n* Results saved to '{output_file}'")
+
+
+# Compares two results files and returns the number of regressions (benchmarks slower by more than the threshold)
+def compare_results(old_file, new_file, threshold=0.1, metric="median"):
+    with open(old_file, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_file, "r", encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"Comparing {old.get('commit') or old_file} -> {new.get('commit') or new_file} ({metric}, threshold {threshold:.0%})\n")
+    print(f"{'Benchmark':<32} {'Old':>12} {'New':>12} {'Change':>9}")
+    regressions = 0
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        if name not in old["results"] or name not in new["results"]:
+            print(f"{name:<32} {'only in ' + ('new' if name in new['results'] else 'old'):>35}")
+            continue
+        old_value = old["results"][name][metric]
+        new_value = new["results"][name][metric]
+        change = new_value / old_value - 1 if old_value else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<32} {format_duration(old_value):>12} {format_duration(new_value):>12} {change:>+9.1%}{flag}")
+
+    print(f"\n* {regressions} regression(s) found" if regressions else "\n* No regressions found")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="run_benchmarks",
+        description="Benchmarks of steam_monitor's hot paths [ https://github.com/misiektoja/steam_monitor/ ]"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and save the results as JSON")
+    run_parser.add_argument("-o", "--output", metavar="FILE", help="Results file (default: benchmark_<commit>.json)")
+    run_parser.add_argument("-k", "--filter", metavar="PATTERN", help="Run only benchmarks whose name contains the pattern")
+    run_parser.add_argument("--runs", type=int, default=5, help="Number of timed runs of every benchmark (default: 5)")
+    run_parser.add_argument("--min-time", metavar="SECONDS", type=float, default=0.2, help="Minimum duration of one run (default: 0.2)")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files and flag regressions (exit code 1 if any)")
+    compare_parser.add_argument("old", help="Results file of the baseline")
+    compare_parser.add_argument("new", help="Results file to check")
+    compare_parser.add_argument("--threshold", metavar="FRACTION", type=float, default=0.1, help="Slowdown treated as a regression (default: 0.1, i.e. 10%%)")
+    compare_parser.add_argument("--metric", choices=("median", "min", "mean"), default="median", help="Statistic to compare (default: median)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        output = args.output or f"benchmark_{get_git_commit() or datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        run_benchmarks(output, args.filter, max(2, args.runs), args.min_time)
+    elif args.command == "compare":
+        sys.exit(1 if compare_results(args.old, args.new, args.threshold, args.metric) else 0)
+    else:
+        parser.print_help(sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+"""
+Author: Michal Szymanski <misiektoja-github@rm-rf.ninja>
+v1.8.1
+
+Local stand-in for the Steam Web API (and the Steam Community endpoints) used by steam_monitor, for testing
+and benchmarks without a real API key:
+https://github.com/misiektoja/steam_monitor/
+
+It serves scripted state timelines of synthetic users, can inject latency, rate limiting (HTTP 429) and server
+errors, and can record real Steam traffic (working as a proxy) to replay it later.
+
+Examples:
+
+steam_fake_api.py --users 100
+steam_fake_api.py --scenario scenario.json --latency 50 --error-rate 0.05 --max-inflight 8
+steam_fake_api.py --record traffic.jsonl
+steam_fake_api.py --replay traffic.jsonl
+
+Then point steam_monitor to it with --api-url http://127.0.0.1:8765 (set STEAM_COMMUNITY_URL to the same URL
+for the persona name history).
+
+Python pip3 requirements:
+
+requests (only for --record)
+"""
+
+VERSION = "1.8.1"
+
+import sys
+
+if sys.version_info < (3, 6):
+    print("* Error: Python version 3.6 or higher required !")
+    sys.exit(1)
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qsl
+
+
+# Steam64 ID of the first synthetic user
+BASE_STEAMID = 76561197960265728
+
+# Games used in generated scenarios
+DEFAULT_APPS = {
+    440: "Team Fortress 2",
+    570: "Dota 2",
+    620: "Portal 2",
+    730: "Counter-Strike 2",
+    292030: "The Witcher 3: Wild Hunt",
+    1091500: "Cyberpunk 2077",
+}
+
+# Number of achievements of every game in generated schemas
+ACHIEVEMENTS_PER_GAME = 10
+
+# Methods served by the fake API: (interface, method, version) -> parameters
+# They are also listed by GetSupportedAPIList, which the steam library's WebAPI client loads at startup
+API_METHODS = {
+    ("ISteamUser", "GetPlayerSummaries", 2): ["steamids"],
+    ("ISteamUser", "GetPlayerBans", 1): ["steamids"],
+    ("ISteamUser", "GetFriendList", 1): ["steamid", "relationship"],
+    ("ISteamUser", "ResolveVanityURL", 1): ["vanityurl", "url_type"],
+    ("IPlayerService", "GetRecentlyPlayedGames", 1): ["steamid", "count"],
+    ("IPlayerService", "GetSteamLevel", 1): ["steamid"],
+    ("IPlayerService", "GetBadges", 1): ["steamid"],
+    ("IPlayerService", "GetOwnedGames", 1): ["steamid", "include_appinfo", "include_played_free_games", "appids_filter", "include_free_sub", "include_extended_appinfo", "language"],
+    ("ISteamUserStats", "GetPlayerAchievements", 1): ["steamid", "appid", "l"],
+    ("ISteamUserStats", "GetSchemaForGame", 2): ["appid", "l"],
+    ("IStoreService", "GetAppList", 1): ["include_games", "include_dlc", "include_software", "max_results", "last_appid"],
+}
+
+API_METHOD_VERSIONS = {(interface, method): version for interface, method, version in API_METHODS}
+
+# Keys of the user state merged (instead of replaced) by timeline entries
+MERGED_STATE_KEYS = ("games", "recent", "achievements", "bans")
+
+
+# Error returned to the client with the given HTTP status code
+class FakeApiError(Exception):
+    def __init__(self, status, body=None, headers=None):
+        super().__init__(status)
+        self.status = status
+        self.body = body if body is not None else {}
+        self.headers = headers or {}
+
+
+# Generates a scenario with the given number of synthetic users, each with gaming sessions over the duration
+# (in seconds) of the timeline: going online, playing a game, unlocking achievements and going offline
+def generate_scenario(users, duration=86400, seed=None):
+    rnd = random.Random(seed)
+    steamids = [str(BASE_STEAMID + i + 1) for i in range(users)]
+    scenario = {"users": {}, "vanity": {}, "apps": {str(appid): name for appid, name in DEFAULT_APPS.items()}}
+
+    for i, steamid in enumerate(steamids):
+        games = {str(appid): rnd.randint(0, 50000) for appid in rnd.sample(sorted(DEFAULT_APPS), rnd.randint(1, len(DEFAULT_APPS)))}
+        friends = rnd.sample([sid for sid in steamids if sid != steamid], min(len(steamids) - 1, rnd.randint(0, 20)))
+        profile = {
+            "personaname": f"user{i + 1}",
+            "personastate": 0,
+            "communityvisibilitystate": 3,
+            "timecreated": 1262304000 + rnd.randint(0, 400000000),
+            "lastlogoff": 1700000000,
+            "level": rnd.randint(0, 100),
+            "xp": rnd.randint(0, 100000),
+            "friends": friends,
+            "games": games,
+            "achievements": {},
+            "aliases": [f"user{i + 1}_old"],
+        }
+
+        timeline = []
+        unlocked = {}
+        at = rnd.randint(0, 3600)
+        while at < duration:
+            appid = rnd.choice(sorted(games))
+            minutes = rnd.randint(5, 180)
+            timeline.append({"at": at, "personastate": 1})
+            timeline.append({"at": at + 60, "gameid": appid, "gameextrainfo": DEFAULT_APPS[int(appid)]})
+            games[appid] += minutes
+            session = {"at": at + minutes * 60, "gameid": None, "gameextrainfo": None, "games": {appid: games[appid]}, "recent": {appid: minutes}}
+            next_achievement = len(unlocked.setdefault(appid, []))
+            if next_achievement < ACHIEVEMENTS_PER_GAME and rnd.random() < 0.5:
+                unlocked[appid].append(f"ACH_{next_achievement + 1}")
+                session["achievements"] = {appid: {f"ACH_{next_achievement + 1}": None}}
+            timeline.append(session)
+            timeline.append({"at": at + minutes * 60 + rnd.randint(60, 600), "personastate": 0})
+            at += minutes * 60 + rnd.randint(3600, 6 * 3600)
+
+        scenario["users"][steamid] = {"profile": profile, "timeline": timeline}
+        scenario["vanity"][f"user{i + 1}"] = steamid
+    return scenario
+
+
+# State of the synthetic user; timeline entries are applied as the fake API's clock passes their time
+class FakeUser(object):
+    def __init__(self, steamid, profile, timeline, start_ts):
+        self.steamid = steamid
+        self.start_ts = start_ts
+        self.state = {"personaname": steamid, "personastate": 0, "communityvisibilitystate": 3, "games": {}, "recent": {}, "achievements": {}, "bans": {}}
+        self.timeline = sorted(timeline, key=lambda entry: entry.get("at", 0))
+        self.applied = 0
+        self.lock = threading.Lock()
+        self._apply(dict(profile), start_ts)
+
+    def _apply(self, entry, ts):
+        for key, value in entry.items():
+            if key == "at":
+                continue
+            if key == "achievements":
+                for appid, achievements in value.items():
+                    unlocks = self.state["achievements"].setdefault(str(appid), {})
+                    for apiname, unlock_ts in achievements.items():
+                        unlocks[apiname] = int(unlock_ts or ts)
+            elif key in MERGED_STATE_KEYS:
+                self.state[key].update({str(k): v for k, v in value.items()})
+            elif value is None:
+                self.state.pop(key, None)
+            else:
+                self.state[key] = value
+
+    # Returns the state of the user at the given time
+    def get_state(self, now):
+        with self.lock:
+            elapsed = now - self.start_ts
+            while self.applied < len(self.timeline) and self.timeline[self.applied].get("at", 0) <= elapsed:
+                entry = self.timeline[self.applied]
+                self._apply(entry, int(self.start_ts + entry.get("at", 0)))
+                self.applied += 1
+            return self.state
+
+
+# Fake Steam Web API: serves responses computed from the scenario and injects faults
+#   latency       - added delay of every request in milliseconds (plus random jitter of up to 50%)
+#   error_rate    - fraction of requests failing with HTTP 500
+#   rate_limit    - maximum number of requests per second, requests above it get HTTP 429
+#   max_inflight  - maximum number of requests processed concurrently, requests above it get HTTP 429
+#   clock         - function returning the current time (scenario timelines start at the first call of it)
+#   sleep         - function used to wait for the injected latency
+#   monotonic     - function used to measure the rate limit windows
+class FakeSteamApi(object):
+    def __init__(self, scenario, latency=0, error_rate=0.0, rate_limit=0, max_inflight=0, speed=1.0, clock=time.time, seed=None, sleep=time.sleep, monotonic=time.monotonic):
+        self.clock = clock
+        self.sleep = sleep
+        self.monotonic = monotonic
+        self.speed = speed
+        self.start_ts = clock()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.max_inflight = max_inflight
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.window_start = 0.0
+        self.window_count = 0
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0}
+        self.apps = {int(appid): name for appid, name in scenario.get("apps", {}).items()} or dict(DEFAULT_APPS)
+        self.vanity = {name.lower(): str(steamid) for name, steamid in scenario.get("vanity", {}).items()}
+        self.users = {str(steamid): FakeUser(str(steamid), user.get("profile", {}), user.get("timeline", []), self.start_ts) for steamid, user in scenario.get("users", {}).items()}
+
+    # Returns the scenario time (timeline runs speed times faster than the clock)
+    def now(self):
+        return self.start_ts + (self.clock() - self.start_ts) * self.speed
+
+    def get_user_state(self, steamid):
+        user = self.users.get(str(steamid))
+        return user.get_state(self.now()) if user else None
+
+    # Handles the request and returns (HTTP status, JSON body, headers)
+    def handle(self, path, params):
+        with self.lock:
+            self.stats["requests"] += 1
+            now = self.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            throttled = (self.rate_limit and self.window_count > self.rate_limit) or (self.max_inflight and self.in_flight >= self.max_inflight)
+            if throttled:
+                self.stats["throttled"] += 1
+            else:
+                self.in_flight += 1
+            failed = not throttled and self.error_rate and self.random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+
+        if throttled:
+            return 429, {}, {"Retry-After": "1"}
+        try:
+            if self.latency:
+                self.sleep(self.latency * (1 + self.random.random() * 0.5) / 1000.0)
+            if failed:
+                return 500, {}, {}
+            return 200, self.route(path, params), {}
+        except FakeApiError as e:
+            return e.status, e.body, e.headers
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def route(self, path, params):
+        parts = [part for part in path.split("/") if part]
+        if len(parts) == 3 and parts[0] == "profiles" and parts[2] == "ajaxaliases":
+            return self.ajaxaliases(parts[1])
+        if len(parts) == 3 and parts[:2] == ["ISteamWebAPIUtil", "GetSupportedAPIList"]:
+            return self.supported_api_list()
+        if len(parts) != 3 or not params.get("key"):
+            raise FakeApiError(403 if len(parts) == 3 else 404)
+        handler = getattr(self, f"{parts[0]}_{parts[1]}", None)
+        if handler is None:
+            raise FakeApiError(404)
+        return handler(params)
+
+    def supported_api_list(self):
+        interfaces = {}
+        for (interface, method, version), param_names in API_METHODS.items():
+            parameters = [{"name": "key", "type": "string", "optional": False, "description": "access key"}]
+            parameters += [{"name": name, "type": "string", "optional": True, "description": ""} for name in param_names]
+            interfaces.setdefault(interface, []).append({"name": method, "version": version, "httpmethod": "GET", "parameters": parameters})
+        return {"apilist": {"interfaces": [{"name": name, "methods": methods} for name, methods in interfaces.items()]}}
+
+    def require_user(self, params, name="steamid"):
+        state = self.get_user_state(params.get(name, ""))
+        if state is None:
+            raise FakeApiError(400 if name == "steamid" else 404)
+        return state
+
+    # Whether the user's game details and friends list are hidden by privacy settings
+    def is_private(self, state):
+        return state.get("communityvisibilitystate", 3) != 3
+
+    def ISteamUser_GetPlayerSummaries(self, params):
+        players = []
+        for steamid in params.get("steamids", "").split(","):
+            state = self.get_user_state(steamid.strip())
+            if state is None:
+                continue
+            player = {"steamid": steamid.strip(), "profileurl": f"https://steamcommunity.com/profiles/{steamid.strip()}/"}
+            for key in ("personaname", "personastate", "communityvisibilitystate", "realname", "loccountrycode", "locstatecode", "timecreated", "lastlogoff", "gameid", "gameextrainfo", "avatarfull"):
+                if state.get(key) is not None:
+                    player[key] = state[key]
+            players.append(player)
+        return {"response": {"players": players}}
+
+    def ISteamUser_GetPlayerBans(self, params):
+        players = []
+        for steamid in params.get("steamids", "").split(","):
+            state = self.get_user_state(steamid.strip())
+            if state is None:
+                continue
+            ban = {"SteamId": steamid.strip(), "CommunityBanned": False, "VACBanned": False, "NumberOfVACBans": 0, "DaysSinceLastBan": 0, "NumberOfGameBans": 0, "EconomyBan": "none"}
+            ban.update(state.get("bans", {}))
+            players.append(ban)
+        return {"players": players}
+
+    def ISteamUser_GetFriendList(self, params):
+        state = self.require_user(params)
+        if self.is_private(state):
+            raise FakeApiError(401)
+        return {"friendslist": {"friends": [{"steamid": str(friend), "relationship": "friend", "friend_since": 1600000000} for friend in state.get("friends", [])]}}
+
+    def ISteamUser_ResolveVanityURL(self, params):
+        steamid = self.vanity.get(params.get("vanityurl", "").lower())
+        if steamid is None:
+            return {"response": {"success": 42, "message": "No match"}}
+        return {"response": {"steamid": steamid, "success": 1}}
+
+    def IPlayerService_GetRecentlyPlayedGames(self, params):
+        state = self.require_user(params)
+        if self.is_private(state):
+            return {"response": {}}
+        recent = sorted(state.get("recent", {}).items(), key=lambda item: item[1], reverse=True)
+        count = int(params.get("count") or 0)
+        games = [{"appid": int(appid), "name": self.apps.get(int(appid), f"App {appid}"), "playtime_2weeks": minutes, "playtime_forever": state.get("games", {}).get(appid, minutes)} for appid, minutes in recent]
+        return {"response": {"total_count": len(games), "games": games[:count] if count else games}}
+
+    def IPlayerService_GetSteamLevel(self, params):
+        state = self.require_user(params)
+        return {"response": {"player_level": state.get("level", 0)}}
+
+    def IPlayerService_GetBadges(self, params):
+        state = self.require_user(params)
+        xp = state.get("xp", 0)
+        return {"response": {"badges": [], "player_xp": xp, "player_level": state.get("level", 0), "player_xp_needed_to_level_up": 100 - xp % 100, "player_xp_needed_current_level": xp - xp % 100}}
+
+    def IPlayerService_GetOwnedGames(self, params):
+        state = self.require_user(params)
+        if self.is_private(state):
+            return {"response": {}}
+        include_appinfo = str(params.get("include_appinfo", "0")) in ("1", "true")
+        games = []
+        for appid, minutes in sorted(state.get("games", {}).items(), key=lambda item: int(item[0])):
+            game = {"appid": int(appid), "playtime_forever": minutes}
+            if include_appinfo:
+                game["name"] = self.apps.get(int(appid), f"App {appid}")
+            games.append(game)
+        return {"response": {"game_count": len(games), "games": games}}
+
+    def ISteamUserStats_GetPlayerAchievements(self, params):
+        state = self.require_user(params)
+        appid = str(params.get("appid", ""))
+        if self.is_private(state):
+            raise FakeApiError(403, {"playerstats": {"error": "Profile is not public", "success": False}})
+        if appid not in state.get("games", {}):
+            raise FakeApiError(400, {"playerstats": {"error": "Requested app has no stats", "success": False}})
+        unlocks = state.get("achievements", {}).get(appid, {})
+        achievements = [{"apiname": f"ACH_{i}", "achieved": 1 if f"ACH_{i}" in unlocks else 0, "unlocktime": unlocks.get(f"ACH_{i}", 0)} for i in range(1, ACHIEVEMENTS_PER_GAME + 1)]
+        achievements += [{"apiname": apiname, "achieved": 1, "unlocktime": unlock_ts} for apiname, unlock_ts in unlocks.items() if not apiname.startswith("ACH_")]
+        return {"playerstats": {"steamID": params.get("steamid"), "gameName": self.apps.get(int(appid), ""), "achievements": achievements, "success": True}}
+
+    def ISteamUserStats_GetSchemaForGame(self, params):
+        appid = int(params.get("appid") or 0)
+        name = self.apps.get(appid, f"App {appid}")
+        achievements = [{"name": f"ACH_{i}", "displayName": f"{name} achievement {i}", "description": f"Achievement {i} of {name}"} for i in range(1, ACHIEVEMENTS_PER_GAME + 1)]
+        return {"game": {"gameName": name, "gameVersion": "1", "availableGameStats": {"achievements": achievements}}}
+
+    def IStoreService_GetAppList(self, params):
+        last_appid = int(params.get("last_appid") or 0)
+        max_results = int(params.get("max_results") or 10000)
+        apps = [{"appid": appid, "name": name} for appid, name in sorted(self.apps.items()) if appid > last_appid]
+        response = {"apps": apps[:max_results]}
+        if len(apps) > max_results:
+            response.update({"have_more_results": True, "last_appid": apps[max_results - 1]["appid"]})
+        return {"response": response}
+
+    def ajaxaliases(self, steamid):
+        state = self.get_user_state(steamid)
+        if state is None:
+            return []
+        return [{"newname": name, "timechanged": "1 Jan, 2024 @ 12:00am"} for name in state.get("aliases", [])]
+
+
+# Serves responses recorded by RecordingProxy; responses recorded for the same request are replayed in order
+# (the last one is repeated), requests which were not recorded get HTTP 404
+class ReplayApi(object):
+    def __init__(self, records):
+        self.lock = threading.Lock()
+        self.responses = {}
+        for record in records:
+            self.responses.setdefault(request_key(record["path"], record["params"]), []).append((record["status"], record["body"]))
+        self.positions = {}
+
+    def handle(self, path, params):
+        key = request_key(path, params)
+        with self.lock:
+            responses = self.responses.get(key)
+            if not responses:
+                return 404, {}, {}
+            position = self.positions.get(key, 0)
+            self.positions[key] = min(position + 1, len(responses) - 1)
+        status, body = responses[position]
+        return status, body, {}
+
+
+# Forwards requests to the real Steam Web API / Steam Community and records responses (without the API key)
+# to a JSON lines file for ReplayApi
+class RecordingProxy(object):
+    def __init__(self, record_file, api_url="https://api.steampowered.com", community_url="https://steamcommunity.com"):
+        import requests
+        self.session = requests.Session()
+        self.api_url = api_url.rstrip("/")
+        self.community_url = community_url.rstrip("/")
+        self.lock = threading.Lock()
+        self.record_file = open(record_file, "a", encoding="utf-8")
+
+    def handle(self, path, params):
+        base_url = self.community_url if path.startswith("/profiles/") else self.api_url
+        resp = self.session.get(base_url + path, params=params, timeout=30)
+        try:
+            body = resp.json()
+        except ValueError:
+            body = resp.text
+        record = {"path": path, "params": {k: v for k, v in params.items() if k != "key"}, "status": resp.status_code, "body": body}
+        with self.lock:
+            self.record_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.record_file.flush()
+        headers = {"Retry-After": resp.headers["Retry-After"]} if "Retry-After" in resp.headers else {}
+        return resp.status_code, body, headers
+
+    # Closes the record file and the HTTP session; called on server shutdown
+    def close(self):
+        with self.lock:
+            self.record_file.close()
+        self.session.close()
+
+
+# Stand-in for the steam library's WebAPI client which calls the fake (or replayed) API in-process, without HTTP;
+# used by steam_monitor's simulation mode (--simulate). Parameters are serialized like the real client does and
+# error responses are raised as requests' HTTPError
+class LocalWebAPI(object):
+    def __init__(self, api, key="simulation"):
+        self.api = api
+        self.key = key
+
+    def call(self, method_path, **kwargs):
+        path, params = webapi_request(method_path, kwargs)
+        params["key"] = self.key
+
+        status, body, headers = self.api.handle(path, params)
+        if status >= 400:
+            import requests
+            response = requests.models.Response()
+            response.status_code = status
+            response.headers.update(headers)
+            response.url = path
+            raise requests.exceptions.HTTPError(f"{status} Error for url: {path}", response=response)
+        return body
+
+
+# Returns the URL path and query parameters (without the API key) of a Steam Web API call, serialized the way
+# the steam library's WebAPI client sends them
+def webapi_request(method_path, kwargs):
+    interface, method = method_path.split(".", 1)
+    path = f"/{interface}/{method}/v{API_METHOD_VERSIONS.get((interface, method), 1)}/"
+    params = {"format": "json"}
+    for name, value in kwargs.items():
+        if isinstance(value, bool):
+            params[name] = "1" if value else "0"
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                params[f"{name}[{i}]"] = str(item)
+        else:
+            params[name] = str(value)
+    return path, params
+
+
+# Returns the key identifying the recorded request (path and parameters without the API key)
+def request_key(path, params):
+    return path, tuple(sorted((k, str(v)) for k, v in params.items() if k != "key"))
+
+
+class FakeApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        status, body, headers = self.server.api.handle(parsed.path, dict(parse_qsl(parsed.query, keep_blank_values=True)))
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeApiServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, api, host="127.0.0.1", port=0, verbose=False):
+        super().__init__((host, port), FakeApiRequestHandler)
+        self.api = api
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+
+# Starts the server in a background thread and returns it (port 0 picks a free port, see server.url)
+# Stop it with server.shutdown() and server.server_close()
+def start_server(api, host="127.0.0.1", port=0, verbose=False):
+    server = FakeApiServer(api, host, port, verbose)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="steam_fake_api",
+        description="Local stand-in for the Steam Web API used by steam_monitor for testing and benchmarks [ https://github.com/misiektoja/steam_monitor/ ]"
+    )
+    parser.add_argument("--version", action="version", version=f"%(prog)s v{VERSION}")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+
+    source = parser.add_argument_group("Data source")
+    source.add_argument("--scenario", metavar="FILE", help="Serve users and timelines from the JSON scenario file")
+    source.add_argument("--users", metavar="NUMBER", type=int, default=10, help="Number of generated synthetic users when no scenario is given (default: 10)")
+    source.add_argument("--duration", metavar="SECONDS", type=int, default=86400, help="Length of generated timelines (default: 86400)")
+    source.add_argument("--seed", type=int, help="Random seed for generated scenarios and injected faults")
+    source.add_argument("--save-scenario", metavar="FILE", help="Save the generated scenario to the file and exit")
+    source.add_argument("--speed", type=float, default=1.0, help="Timeline speed factor, e.g. 60 plays a minute of the timeline per second (default: 1)")
+    source.add_argument("--record", metavar="FILE", help="Work as a proxy to the real Steam Web API and record responses to the file")
+    source.add_argument("--replay", metavar="FILE", help="Replay responses recorded with --record")
+
+    faults = parser.add_argument_group("Fault injection")
+    faults.add_argument("--latency", metavar="MS", type=float, default=0, help="Added latency of every request in milliseconds")
+    faults.add_argument("--error-rate", metavar="FRACTION", type=float, default=0, help="Fraction of requests failing with HTTP 500")
+    faults.add_argument("--rate-limit", metavar="RPS", type=int, default=0, help="Requests per second above which HTTP 429 is returned")
+    faults.add_argument("--max-inflight", metavar="NUMBER", type=int, default=0, help="Concurrent requests above which HTTP 429 is returned")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    if args.record:
+        api = RecordingProxy(args.record)
+        print(f"* Recording Steam Web API traffic to '{args.record}'")
+    elif args.replay:
+        with open(args.replay, "r", encoding="utf-8") as f:
+            api = ReplayApi(json.loads(line) for line in f if line.strip())
+        print(f"* Replaying Steam Web API traffic from '{args.replay}'")
+    else:
+        if args.scenario:
+            with open(args.scenario, "r", encoding="utf-8") as f:
+                scenario = json.load(f)
+        else:
+            scenario = generate_scenario(args.users, args.duration, args.seed)
+        if args.save_scenario:
+            with open(args.save_scenario, "w", encoding="utf-8") as f:
+                json.dump(scenario, f, indent=2)
+            print(f"* Scenario with {len(scenario['users'])} users saved to '{args.save_scenario}'")
+            sys.exit(0)
+        api = FakeSteamApi(scenario, latency=args.latency, error_rate=args.error_rate, rate_limit=args.rate_limit, max_inflight=args.max_inflight, speed=args.speed, seed=args.seed)
+        print(f"* Serving {len(api.users)} users (first Steam64 ID: {min(api.users) if api.users else 'n/a'})")
+
+    server = FakeApiServer(api, args.host, args.port, args.verbose)
+    print(f"* Fake Steam Web API listening on {server.url} (use: steam_monitor --api-url {server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if isinstance(api, RecordingProxy):
+            api.close()
+        if isinstance(api, FakeSteamApi):
+            print(f"\n* Requests: {api.stats['requests']}, throttled: {api.stats['throttled']}, errors: {api.stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -88,6 +88,48 @@ FRIENDS_CHECK = False
 # Requires FRIENDS_CHECK to be enabled; can also be enabled via the --notify-friends flag
 FRIENDS_NOTIFICATION = False
 
+# Location of the cache file for profile details (display name, real name, avatar) of other Steam users
+# It is used to describe added/removed friends and the friends list (--list-friends) without repeating API calls
+# Empty by default (cache disabled); set it to a file name, e.g. "steam_monitor_profiles_cache.json", to enable it
+PROFILE_CACHE_FILE = ""
+
+# How long cached profile details are considered up to date; in seconds
+PROFILE_CACHE_TTL = 86400  # 24 hours
+
+# Maximum number of profiles kept in the cache (the least recently used ones are evicted first)
+PROFILE_CACHE_MAX_ENTRIES = 10000
+
+# Maximum number of users collected when crawling the friends graph (--crawl-friends)
+# Crawling stops expanding the graph once this limit is reached; set to 0 for no limit
+CRAWL_MAX_NODES = 20000
+
+# Location of the cache file for achievement scan results (per user and game) used by --achievements
+# Games whose total playtime has not changed since the last scan are not queried again
+# Set to empty string to disable the cache
+ACHIEVEMENTS_CACHE_FILE = "steam_monitor_achievements_cache.json"
+
+# Maximum number of user/game entries kept in the achievements cache (the least recently used ones are evicted first)
+ACHIEVEMENTS_CACHE_MAX_ENTRIES = 50000
+
+# Location of the cache file for game schemas (achievement names and descriptions, via GetSchemaForGame)
+# The cache can be shared by all monitored users and running copies of the tool
+# Set to empty string to disable the cache
+SCHEMA_CACHE_FILE = "steam_monitor_schema_cache.json"
+
+# How long cached game schemas are considered up to date; in seconds
+# Schemas are also refreshed earlier when a user unlocks an achievement missing in the cached schema
+SCHEMA_CACHE_TTL = 604800  # 7 days
+
+# Location of the cache file for resolved Steam community vanity URLs (/id/<name>)
+# Set to empty string to disable the cache
+VANITY_CACHE_FILE = "steam_monitor_vanity_cache.json"
+
+# How long resolved vanity names are cached; in seconds
+VANITY_CACHE_TTL = 2592000  # 30 days
+
+# How long vanity names which could not be found are cached; in seconds
+VANITY_CACHE_NEGATIVE_TTL = 86400  # 1 day
+
 # Whether to periodically check the user's games library (game count and list) for changes
 # Uses a minimal API call (no names/icons)
 # Can also be enabled via the --check-games flag
@@ -97,6 +139,28 @@ GAMES_LIBRARY_CHECK = False
 # Requires GAMES_LIBRARY_CHECK to be enabled; can also be enabled via the --notify-games flag
 GAMES_LIBRARY_NOTIFICATION = False
 
+# Location of the local AppID to game name index used to show names of added/removed games
+# It is built (and refreshed) with the --update-app-index flag, no extra API calls are made while monitoring
+# Set to empty string to show AppIDs only
+APP_INDEX_FILE = "steam_monitor_app_index.bin"
+
+# Whether to track achievements unlocked by the user
+# Achievements are re-checked only for games whose playtime changed in the recently played games list
+# (so the extra API usage is proportional to actual play time, not the library size)
+# Can also be enabled via the --check-achievements flag
+ACHIEVEMENTS_CHECK = False
+
+# Whether to send an email when the user unlocks an achievement
+# Requires ACHIEVEMENTS_CHECK to be enabled; can also be enabled via the --notify-achievements flag
+ACHIEVEMENTS_NOTIFICATION = False
+
+# Whether to track per-game playtime changes (eg. "played Dota 2 for 45 minutes")
+# Playtime is compared between polls using data which is already fetched (recently played games and, if
+# GAMES_LIBRARY_CHECK is enabled, the games library), so it also reveals sessions shorter than the polling
+# interval or played while appearing offline/invisible; no extra API calls are made
+# Can also be enabled via the --check-playtime flag
+PLAYTIME_CHECK = False
+
 # How often to check for player activity when the user is offline; in seconds
 # Can also be set using the -c flag
 STEAM_CHECK_INTERVAL = 120  # 2 min
@@ -123,9 +187,44 @@ LIVENESS_CHECK_INTERVAL = 43200  # 12 hours
 # URL used to verify internet connectivity at startup
 CHECK_INTERNET_URL = 'https://api.steampowered.com/'
 
+# Base URLs of the Steam Web API and the Steam Community site (used for persona name history)
+# Change them to use a local stand-in server, e.g. steam_fake_api.py for testing; the API URL can also be set
+# via the --api-url flag
+STEAM_API_URL = 'https://api.steampowered.com'
+STEAM_COMMUNITY_URL = 'https://steamcommunity.com'
+
 # Timeout used when checking initial internet connectivity; in seconds
 CHECK_INTERNET_TIMEOUT = 5
 
+# Maximum number of Steam Web API requests issued concurrently by batch operations
+# (e.g. fetching profile details of many friends at once)
+# The actual limit adapts to the API's condition (AIMD): it is halved on HTTP 429, 5xx errors or latency spikes
+# and raised back gradually while requests succeed
+API_MAX_CONCURRENCY = 8
+
+# Request latency (compared to the median of recent requests) treated as a latency spike by the adaptive
+# concurrency limit; eg. 3 means 3 times slower than usual
+API_LATENCY_SPIKE_FACTOR = 3
+
+# Maximum number of Steam Web API requests per second issued by batch operations
+# (e.g. the friends graph crawler); set to 0 to disable the limit
+API_RATE_LIMIT = 10
+
+# How often to fetch the user's recently played games while monitoring, when no enabled feature needs them in
+# every poll (achievements/playtime tracking); they are also fetched whenever the user's game changes; in seconds
+# Set to 0 to fetch them only on game changes
+RECENTLY_PLAYED_CHECK_INTERVAL = 3600  # 1 hour
+
+# Number of consecutive transient errors (HTTP 5xx, connection errors, timeouts) after which requests to the Steam
+# Web API endpoint are paused (circuit breaker opens); HTTP 429 (rate limit) pauses the endpoint immediately
+# Every endpoint has its own circuit breaker, so failures of optional endpoints do not delay status polling
+API_BREAKER_FAILURE_THRESHOLD = 3
+
+# Initial and maximum pause of the failing endpoint; in seconds
+# Pauses grow exponentially with random (decorrelated) jitter, so many copies of the tool do not retry in lockstep
+API_BACKOFF_BASE = 30
+API_BACKOFF_MAX = 1800  # 30 mins
+
 # CSV file to write all status & game changes
 # Can also be set using the -b flag
 CSV_FILE = ""
@@ -134,6 +233,36 @@ CSV_FILE = ""
 # Can also be set using the --profile-csv-file flag
 PROFILE_CSV_FILE = ""
 
+# Optional file to record raw Steam Web API responses of every request to (for debugging missed events or for
+# replaying them later with --simulate); responses are delta encoded against the previous response to the same
+# request and compressed in blocks, with a time index kept in <file>.idx
+# Can also be set using the --snapshot-file flag
+SNAPSHOT_FILE = ""
+
+# Number of responses compressed together in one block of the snapshot file
+# A block is also written once SNAPSHOT_FLUSH_INTERVAL passes since its first response, which limits the data
+# lost if the tool is killed
+SNAPSHOT_BLOCK_RECORDS = 500
+SNAPSHOT_FLUSH_INTERVAL = 300  # 5 mins
+
+# Port of the optional built-in HTTP endpoint serving metrics in Prometheus text format at /metrics (Steam Web API
+# requests, errors and latencies per endpoint, poll lag, events by type, email notification latency, CSV/log write
+# latency and process memory usage); set to 0 to disable
+# Can also be set using the --metrics-port flag
+METRICS_PORT = 0
+
+# Address the metrics endpoint listens on; keep it on localhost unless access to it is restricted by other means
+METRICS_HOST = "127.0.0.1"
+
+# Port of the optional built-in HTTP control endpoint (JSON) allowing to query the monitoring state, toggle email
+# notifications, change polling intervals, force an immediate poll and add or remove monitored users at runtime,
+# without restarting the tool; set to 0 to disable
+# Can also be set using the --control-port flag
+CONTROL_PORT = 0
+
+# Address the control endpoint listens on; it has no authentication, so keep it on localhost
+CONTROL_HOST = "127.0.0.1"
+
 # Location of the optional dotenv file which can keep secrets
 # If not specified it will try to auto-search for .env files
 # To disable auto-search, set this to the literal string "none"
@@ -229,9 +358,31 @@ STEAM_LEVEL_XP_CHECK = False
 STEAM_LEVEL_XP_NOTIFICATION = False
 FRIENDS_CHECK = False
 FRIENDS_NOTIFICATION = False
+PROFILE_CACHE_FILE = ""
+PROFILE_CACHE_TTL = 0
+PROFILE_CACHE_MAX_ENTRIES = 0
+CRAWL_MAX_NODES = 0
+ACHIEVEMENTS_CACHE_FILE = ""
+ACHIEVEMENTS_CACHE_MAX_ENTRIES = 0
+SCHEMA_CACHE_FILE = ""
+SCHEMA_CACHE_TTL = 0
+VANITY_CACHE_FILE = ""
+VANITY_CACHE_TTL = 0
+VANITY_CACHE_NEGATIVE_TTL = 0
 GAMES_LIBRARY_CHECK = False
 GAMES_LIBRARY_NOTIFICATION = False
+APP_INDEX_FILE = ""
+ACHIEVEMENTS_CHECK = False
+ACHIEVEMENTS_NOTIFICATION = False
+PLAYTIME_CHECK = False
 PROFILE_CSV_FILE = ""
+SNAPSHOT_FILE = ""
+SNAPSHOT_BLOCK_RECORDS = 0
+SNAPSHOT_FLUSH_INTERVAL = 0
+METRICS_PORT = 0
+METRICS_HOST = ""
+CONTROL_PORT = 0
+CONTROL_HOST = ""
 STEAM_CHECK_INTERVAL = 0
 STEAM_ACTIVE_CHECK_INTERVAL = 0
 OFFLINE_INTERRUPT = 0
@@ -240,6 +391,15 @@ STEAM_SNOOZE_INACTIVITY_THRESHOLD = 0
 LIVENESS_CHECK_INTERVAL = 0
 CHECK_INTERNET_URL = ""
 CHECK_INTERNET_TIMEOUT = 0
+STEAM_API_URL = ""
+STEAM_COMMUNITY_URL = ""
+API_MAX_CONCURRENCY = 0
+API_LATENCY_SPIKE_FACTOR = 0
+API_RATE_LIMIT = 0
+RECENTLY_PLAYED_CHECK_INTERVAL = 0
+API_BREAKER_FAILURE_THRESHOLD = 0
+API_BACKOFF_BASE = 0
+API_BACKOFF_MAX = 0
 CSV_FILE = ""
 DOTENV_FILE = ""
 FILE_SUFFIX = ""
@@ -259,15 +419,34 @@ DEFAULT_CONFIG_FILENAME = "steam_monitor.conf"
 # List of secret keys to load from env/config
 SECRET_KEYS = ("STEAM_API_KEY", "SMTP_PASSWORD")
 
+# Settings read only at startup, so their changes in the config file are not applied by a config reload (SIGHUP)
+CONFIG_RESTART_KEYS = ("METRICS_PORT", "METRICS_HOST", "CONTROL_PORT", "CONTROL_HOST", "SNAPSHOT_FILE", "SNAPSHOT_BLOCK_RECORDS", "SNAPSHOT_FLUSH_INTERVAL", "DOTENV_FILE", "FILE_SUFFIX", "ST_LOGFILE", "DISABLE_LOGGING", "STEAM_API_URL", "CHECK_INTERNET_URL", "CHECK_INTERNET_TIMEOUT", "PROFILE_CACHE_FILE", "PROFILE_CACHE_TTL", "PROFILE_CACHE_MAX_ENTRIES", "ACHIEVEMENTS_CACHE_FILE", "ACHIEVEMENTS_CACHE_MAX_ENTRIES", "SCHEMA_CACHE_FILE", "SCHEMA_CACHE_TTL", "VANITY_CACHE_FILE", "VANITY_CACHE_TTL", "VANITY_CACHE_NEGATIVE_TTL")
+
+# Settings which can be changed at runtime with the control endpoint, with their types
+CONTROL_SETTINGS = {
+    "ACTIVE_INACTIVE_NOTIFICATION": bool,
+    "GAME_CHANGE_NOTIFICATION": bool,
+    "STATUS_NOTIFICATION": bool,
+    "NAME_CHANGE_NOTIFICATION": bool,
+    "STEAM_LEVEL_XP_NOTIFICATION": bool,
+    "FRIENDS_NOTIFICATION": bool,
+    "GAMES_LIBRARY_NOTIFICATION": bool,
+    "ACHIEVEMENTS_NOTIFICATION": bool,
+    "ERROR_NOTIFICATION": bool,
+    "STEAM_CHECK_INTERVAL": int,
+    "STEAM_ACTIVE_CHECK_INTERVAL": int,
+}
+
 LIVENESS_CHECK_COUNTER = LIVENESS_CHECK_INTERVAL / STEAM_CHECK_INTERVAL
 
 stdout_bck = None
 csvfieldnames = ['Date', 'Status', 'Game name', 'Game ID']
 
-profile_csvfieldnames = ['Date', 'Event', 'OldValue', 'NewValue', 'Delta', 'FriendSteamID', 'FriendPersona', 'FriendRealName']
+profile_csvfieldnames = ['Date', 'Event', 'OldValue', 'NewValue', 'Delta', 'FriendSteamID', 'FriendPersona', 'FriendRealName', 'AppID', 'GameName']
 
 steam_personastates = ["offline", "online", "busy", "away", "snooze", "looking to trade", "looking to play"]
 steam_visibilitystates = ["private", "private", "private", "public"]
+steam_community_hosts = ("steamcommunity.com", "www.steamcommunity.com")
 
 CLI_CONFIG_PATH = None
 
@@ -283,40 +462,73 @@ if sys.version_info < (3, 6):
 
 import time
 import string
+import io
 import json
 import os
 from datetime import datetime
-from dateutil import relativedelta
 import calendar
-import requests as req
+import importlib
 import signal
-import smtplib
-import ssl
-from email.header import Header
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 import argparse
 import csv
 import platform
 from platform import system
 import re
-import ipaddress
 from urllib.parse import unquote, urlparse
+import threading
+import mmap
+import bisect
+import heapq
+import random
+import struct
+import zlib
+import copy
+import atexit
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
     from colorama import init as colorama_init  # type: ignore[import]
 except ImportError:
     colorama_init = None
 
-try:
-    import steam.steamid
-    import steam.webapi
-except ModuleNotFoundError:
-    raise SystemExit("Error: Couldn't find the Steam library !\n\nTo install it, run:\n    pip3 install \"steam[client]\"\n\nOnce installed, re-run this tool. For more help, visit:\nhttps://github.com/ValvePython/steam/")
 import shutil
 from pathlib import Path
 
 
+# Module imported on first attribute access, so one-shot modes (--version, --generate-config, -i etc.) do not pay
+# for heavy modules they never use; the listed submodules are imported along with it and error_message is shown
+# instead of a traceback if it is not installed
+class LazyModule(object):
+    def __init__(self, name, submodules=(), error_message=None):
+        self._name = name
+        self._submodules = submodules
+        self._error_message = error_message
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            try:
+                module = importlib.import_module(self._name)
+                for submodule in self._submodules:
+                    importlib.import_module(f"{self._name}.{submodule}")
+            except ImportError:
+                if self._error_message:
+                    raise SystemExit(self._error_message)
+                raise
+            self._module = module
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+steam = LazyModule("steam", ("steamid", "webapi"), "Error: Couldn't find the Steam library !\n\nTo install it, run:\n    pip3 install \"steam[client]\"\n\nOnce installed, re-run this tool. For more help, visit:\nhttps://github.com/ValvePython/steam/")
+req = LazyModule("requests")
+relativedelta = LazyModule("dateutil.relativedelta")
+
+
 # ANSI escape sequence helper used for colouring and stripping colour codes
 ANSI_ESCAPE_RE = re.compile(r"\x1B[@-_][0-?]*[ -/]*[@-~]")
 
@@ -383,37 +595,57 @@ _STYLE_CODES = {
     "bright_white": "97",
 }
 
-# Pre-compiled regexes used for line-level colourisation
-_TIMESTAMP_LINE_RE = re.compile(r"^(Timestamp:\s+)(.*)$")
-_STATUS_LINE_RE = re.compile(r"^(Status:\s+)([A-Za-z ]+)$")
-_DISPLAY_NAME_RE = re.compile(r"^(Display name:\s+)(.*)$")
-# 'Steam user <display name> ...' where name can contain spaces
-_STEAM_USER_LINE_RE = re.compile(
-    r"^(Steam user )(.+?)( (?:changed status|started playing|stopped playing|changed game from|now plays).*)$"
-)
-_USER_IN_GAME_RE = re.compile(r"^(User is currently in-game:\s+)(.*)$")
-# Long date in format returned by get_date_from_ts, e.g. 'Sun 21 Apr 2024, 15:08:45'
-_LONG_DATE_RE = re.compile(r"\b\w{3}\s+\d{1,2}\s+\w{3}\s+\d{4},\s+\d{2}:\d{2}:\d{2}\b")
-# Short range date in parentheses, e.g. '(Sat 22 Nov 16:54 - 17:58)'
-_SHORT_RANGE_DATE_RE = re.compile(
-    r"\(\w{3}\s+\d{1,2}\s+\w{3}\s+\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\)"
-)
-# Date range without year, e.g. 'Sat 22 Nov 03:24 - 08:28'
-_DATE_RANGE_RE = re.compile(
-    r"\b\w{3}\s+\d{1,2}\s+\w{3}\s+\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\b"
-)
-_STATUS_CHANGE_RE = re.compile(
-    r"^(Steam user .+? changed status from\s+)([a-zA-Z ]+)(\s+to\s+)([a-zA-Z ]+)(.*)$"
-)
-_DURATION_RE = re.compile(
-    r"(\d+\s+(seconds?|minutes?|hours?|days?|weeks?|months?|years?))", re.IGNORECASE
-)
-_ONLINE_WORD_RE = re.compile(r"(?i)( online| appeared |\bYes\b)")
-_OFFLINE_WORD_RE = re.compile(r"(?i)( offline| away| snooze|\bNo\b)")
-_BOOLEAN_TRUE_RE = re.compile(r"\bTrue\b")
-_BOOLEAN_FALSE_RE = re.compile(r"\bFalse\b")
-# Game names in quotes, but exclude file paths (containing underscores followed by more text, dots, or slashes)
-_GAME_NAME_QUOTED_RE = re.compile(r"(['\"])((?![^'\"]*[._/])[^'\"]+)\1")
+# Regexes used for line-level colourisation, compiled by _compile_color_regexes() once colour is enabled
+_TIMESTAMP_LINE_RE = None
+_STATUS_LINE_RE = None
+_DISPLAY_NAME_RE = None
+_STEAM_USER_LINE_RE = None
+_USER_IN_GAME_RE = None
+_LONG_DATE_RE = None
+_SHORT_RANGE_DATE_RE = None
+_DATE_RANGE_RE = None
+_STATUS_CHANGE_RE = None
+_DURATION_RE = None
+_ONLINE_WORD_RE = None
+_OFFLINE_WORD_RE = None
+_BOOLEAN_TRUE_RE = None
+_BOOLEAN_FALSE_RE = None
+_GAME_NAME_QUOTED_RE = None
+
+
+# Compiles the regexes used for line-level colourisation (_GAME_NAME_QUOTED_RE is set last, so it marks completion)
+def _compile_color_regexes():
+    global _TIMESTAMP_LINE_RE, _STATUS_LINE_RE, _DISPLAY_NAME_RE, _STEAM_USER_LINE_RE, _USER_IN_GAME_RE, _LONG_DATE_RE, _SHORT_RANGE_DATE_RE, _DATE_RANGE_RE, _STATUS_CHANGE_RE, _DURATION_RE, _ONLINE_WORD_RE, _OFFLINE_WORD_RE, _BOOLEAN_TRUE_RE, _BOOLEAN_FALSE_RE, _GAME_NAME_QUOTED_RE
+    _TIMESTAMP_LINE_RE = re.compile(r"^(Timestamp:\s+)(.*)$")
+    _STATUS_LINE_RE = re.compile(r"^(Status:\s+)([A-Za-z ]+)$")
+    _DISPLAY_NAME_RE = re.compile(r"^(Display name:\s+)(.*)$")
+    # 'Steam user <display name> ...' where name can contain spaces
+    _STEAM_USER_LINE_RE = re.compile(
+        r"^(Steam user )(.+?)( (?:changed status|started playing|stopped playing|changed game from|now plays).*)$"
+    )
+    _USER_IN_GAME_RE = re.compile(r"^(User is currently in-game:\s+)(.*)$")
+    # Long date in format returned by get_date_from_ts, e.g. 'Sun 21 Apr 2024, 15:08:45'
+    _LONG_DATE_RE = re.compile(r"\b\w{3}\s+\d{1,2}\s+\w{3}\s+\d{4},\s+\d{2}:\d{2}:\d{2}\b")
+    # Short range date in parentheses, e.g. '(Sat 22 Nov 16:54 - 17:58)'
+    _SHORT_RANGE_DATE_RE = re.compile(
+        r"\(\w{3}\s+\d{1,2}\s+\w{3}\s+\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\)"
+    )
+    # Date range without year, e.g. 'Sat 22 Nov 03:24 - 08:28'
+    _DATE_RANGE_RE = re.compile(
+        r"\b\w{3}\s+\d{1,2}\s+\w{3}\s+\d{2}:\d{2}\s*-\s*\d{2}:\d{2}\b"
+    )
+    _STATUS_CHANGE_RE = re.compile(
+        r"^(Steam user .+? changed status from\s+)([a-zA-Z ]+)(\s+to\s+)([a-zA-Z ]+)(.*)$"
+    )
+    _DURATION_RE = re.compile(
+        r"(\d+\s+(seconds?|minutes?|hours?|days?|weeks?|months?|years?))", re.IGNORECASE
+    )
+    _ONLINE_WORD_RE = re.compile(r"(?i)( online| appeared |\bYes\b)")
+    _OFFLINE_WORD_RE = re.compile(r"(?i)( offline| away| snooze|\bNo\b)")
+    _BOOLEAN_TRUE_RE = re.compile(r"\bTrue\b")
+    _BOOLEAN_FALSE_RE = re.compile(r"\bFalse\b")
+    # Game names in quotes, but exclude file paths (containing underscores followed by more text, dots, or slashes)
+    _GAME_NAME_QUOTED_RE = re.compile(r"(['\"])((?![^'\"]*[._/])[^'\"]+)\1")
 
 
 # Builds ANSI escape sequence from a style description string
@@ -468,6 +700,9 @@ def init_color_output(stream):
         _COLOR_STYLES = {}
         return
 
+    if _GAME_NAME_QUOTED_RE is None:
+        _compile_color_regexes()
+
     user_theme = globals().get("COLOR_THEME") if isinstance(globals().get("COLOR_THEME"), dict) else {}
     theme = {**DEFAULT_COLOR_THEME, **(user_theme or {})}
 
@@ -507,6 +742,8 @@ def colorize_status(status_text):
 
 # Applies colour rules to a single output line
 def _colorize_line(line):
+    if _GAME_NAME_QUOTED_RE is None:
+        _compile_color_regexes()
     original = line
 
     # Timestamp lines
@@ -627,12 +864,16 @@ class Logger(object):
         self.strip_ansi = strip_ansi
 
     def write(self, message):
+        render_start_ts = time.perf_counter() if phase_profiler else 0
         coloured = apply_color_to_text(message)
+        if phase_profiler:
+            phase_profiler.add("render", time.perf_counter() - render_start_ts)
         self.terminal.write(coloured)
 
         # Expand tabs for file output (stdout remains untouched)
         expanded_message = message.expandtabs(8)
 
+        start_ts = time.perf_counter()
         if self.strip_ansi:
             clean = ANSI_ESCAPE_RE.sub("", expanded_message)
             self.logfile.write(clean)
@@ -640,6 +881,10 @@ class Logger(object):
             self.logfile.write(expanded_message)
         self.terminal.flush()
         self.logfile.flush()
+        elapsed = time.perf_counter() - start_ts
+        file_write_latency.observe(elapsed, ("log",))
+        if phase_profiler:
+            phase_profiler.add("log", elapsed)
 
     def flush(self):
         self.terminal.flush()
@@ -653,7 +898,10 @@ class ColorStream(object):
         self.terminal = stream
 
     def write(self, message):
+        render_start_ts = time.perf_counter() if phase_profiler else 0
         coloured = apply_color_to_text(message)
+        if phase_profiler:
+            phase_profiler.add("render", time.perf_counter() - render_start_ts)
         self.terminal.write(coloured)
         self.terminal.flush()
 
@@ -678,15 +926,27 @@ def check_internet(url=CHECK_INTERNET_URL, timeout=CHECK_INTERNET_TIMEOUT):
         return False
 
 
+# Returns True if the vanity name can be resolved from the cache: a cached Steam64 ID or a name cached as not found
+# within VANITY_CACHE_NEGATIVE_TTL
+def is_vanity_cached(cache, vanity_name):
+    if not cache:
+        return False
+    cached = cache.get(vanity_name.lower())
+    if cached is None:
+        return False
+    return cached != "" or cache.get(vanity_name.lower(), ttl=VANITY_CACHE_NEGATIVE_TTL) is not None
+
+
 # Resolves a Steam community user URL to a Steam64 ID through the Steam Web API
-def resolve_steam_community_url(community_url, api_key, timeout=30):
+# If cache is passed, vanity names are looked up there first and results (including names not found) are stored in it
+def resolve_steam_community_url(community_url, api_key, timeout=30, cache=None):
     try:
         parsed_url = urlparse(community_url)
         hostname = (parsed_url.hostname or "").lower()
     except (AttributeError, ValueError):
         raise ValueError("Invalid Steam community URL") from None
 
-    if parsed_url.scheme not in ("http", "https") or hostname not in ("steamcommunity.com", "www.steamcommunity.com"):
+    if parsed_url.scheme not in ("http", "https") or hostname not in steam_community_hosts:
         raise ValueError("Invalid Steam community URL")
 
     path_parts = [unquote(part) for part in parsed_url.path.split("/") if part]
@@ -711,7 +971,15 @@ def resolve_steam_community_url(community_url, api_key, timeout=30):
     if profile_type != "id":
         raise ValueError("Only Steam user profile URLs are supported")
 
-    resolver_url = "https://api.steampowered.com/ISteamUser/ResolveVanityURL/v1/"
+    # Vanity names are case-insensitive; empty value marks a name which could not be found
+    cache_key = profile_name.lower()
+    if is_vanity_cached(cache, profile_name):
+        cached = cache.get(cache_key)
+        if cached:
+            return int(cached)
+        raise ValueError("Steam community URL could not be resolved: No match")
+
+    resolver_url = f"{STEAM_API_URL.rstrip('/')}/ISteamUser/ResolveVanityURL/v1/"
     try:
         response = req.get(resolver_url, params={"key": api_key, "vanityurl": profile_name, "url_type": 1}, timeout=timeout)
     except req.Timeout:
@@ -736,6 +1004,8 @@ def resolve_steam_community_url(community_url, api_key, timeout=30):
         raise ValueError("Steam Web API returned an invalid response")
 
     if str(result.get("success")) != "1":
+        if cache and str(result.get("success")) == "42":
+            cache.set(cache_key, "")
         message = result.get("message")
         if message:
             raise ValueError(f"Steam community URL could not be resolved: {message}")
@@ -744,9 +1014,63 @@ def resolve_steam_community_url(community_url, api_key, timeout=30):
     resolved_id = steam.steamid.SteamID(result.get("steamid", ""))
     if not resolved_id.is_valid() or resolved_id.type != steam.steamid.EType.Individual:
         raise ValueError("Steam Web API returned an invalid Steam64 ID")
+    if cache:
+        cache.set(cache_key, str(resolved_id.as_64))
     return int(resolved_id.as_64)
 
 
+_vanity_cache = None
+
+
+# Returns the cache of resolved vanity URLs or None if it is disabled
+def get_vanity_cache():
+    global _vanity_cache
+    if not VANITY_CACHE_FILE:
+        return None
+    if _vanity_cache is None:
+        _vanity_cache = DiskCache(os.path.expanduser(VANITY_CACHE_FILE), ttl=VANITY_CACHE_TTL)
+    return _vanity_cache
+
+
+# Resolves many Steam community URLs concurrently (vanity names via the cache and under the API rate limit)
+# Returns two dicts: {url: Steam64 ID} for resolved URLs and {url: error message} for the rest
+def resolve_steam_community_urls(community_urls, api_key, executor=None):
+    cache = get_vanity_cache()
+    resolved = {}
+    errors = {}
+
+    # Resolves the URL, waiting for the rate limiter only when a request will be sent (valid /id/ URL with the
+    # vanity name not cached, including names cached as not found)
+    def resolve(url):
+        try:
+            parsed_url = urlparse(url)
+            hostname = (parsed_url.hostname or "").lower()
+        except (AttributeError, ValueError):
+            hostname = ""
+        if hostname in steam_community_hosts and parsed_url.scheme in ("http", "https"):
+            path_parts = [unquote(part) for part in parsed_url.path.split("/") if part]
+            if len(path_parts) >= 2 and path_parts[0].lower() == "id" and not is_vanity_cached(cache, path_parts[1]):
+                get_api_rate_limiter().acquire()
+        return resolve_steam_community_url(url, api_key, cache=cache)
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(1, API_MAX_CONCURRENCY))
+    try:
+        futures = {executor.submit(resolve, url): url for url in dict.fromkeys(community_urls)}
+        for future in as_completed(futures):
+            try:
+                resolved[futures[future]] = future.result()
+            except Exception as e:
+                errors[futures[future]] = str(e)
+    finally:
+        if own_executor:
+            executor.shutdown()
+    if cache:
+        cache.save()
+    return resolved, errors
+
+
 # Clears the terminal screen
 def clear_screen(enabled=True):
     if not enabled:
@@ -858,6 +1182,13 @@ def calculate_timespan(timestamp1, timestamp2, show_weeks=True, show_hours=True,
 
 # Sends email notification
 def send_email(subject, body, body_html, use_ssl, smtp_timeout=15):
+    import ipaddress
+    import smtplib
+    import ssl
+    from email.header import Header
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     fqdn_re = re.compile(r'(?=^.{4,253}$)(^((?!-)[a-zA-Z0-9-]{1,63}(?<!-)\.)+[a-zA-Z]{2,63}\.?$)')
     email_re = re.compile(r'[^@]+@[^@]+\.[^@]+')
 
@@ -892,6 +1223,8 @@ def send_email(subject, body, body_html, use_ssl, smtp_timeout=15):
         print("Error sending email - SMTP settings are incorrect (body and body_html cannot be empty at the same time)")
         return 1
 
+    start_ts = time.perf_counter()
+    notifications_in_flight.add(1)
     try:
         if use_ssl:
             ssl_context = ssl.create_default_context()
@@ -918,8 +1251,14 @@ def send_email(subject, body, body_html, use_ssl, smtp_timeout=15):
         smtpObj.sendmail(SENDER_EMAIL, RECEIVER_EMAIL, email_msg.as_string())
         smtpObj.quit()
     except Exception as e:
+        notification_latency.observe(time.perf_counter() - start_ts, ("error",))
         print(f"Error sending email: {e}")
         return 1
+    finally:
+        notifications_in_flight.add(-1)
+        if phase_profiler:
+            phase_profiler.add("notify", time.perf_counter() - start_ts)
+    notification_latency.observe(time.perf_counter() - start_ts, ("sent",))
     return 0
 
 
@@ -937,39 +1276,61 @@ def init_csv_file(csv_file_name):
 # Writes CSV entry
 def write_csv_entry(csv_file_name, timestamp, status, gamename, gameid):
     try:
-
+        start_ts = time.perf_counter()
         with open(csv_file_name, 'a', newline='', buffering=1, encoding="utf-8") as csv_file:
             csvwriter = csv.DictWriter(csv_file, fieldnames=csvfieldnames, quoting=csv.QUOTE_NONNUMERIC)
             csvwriter.writerow({'Date': timestamp, 'Status': status, 'Game name': gamename, 'Game ID': gameid})
-
+        elapsed = time.perf_counter() - start_ts
+        file_write_latency.observe(elapsed, ("csv",))
+        if phase_profiler:
+            phase_profiler.add("csv", elapsed)
     except Exception as e:
         raise RuntimeError(f"Failed to write to CSV file '{csv_file_name}': {e}")
 
 
 # Initializes the profile CSV file
+# Files created by older versions (without game related columns) get their header and rows upgraded
 def init_profile_csv_file(csv_file_name):
     try:
         if not os.path.isfile(csv_file_name) or os.path.getsize(csv_file_name) == 0:
             with open(csv_file_name, 'a', newline='', buffering=1, encoding="utf-8") as f:
                 writer = csv.DictWriter(f, fieldnames=profile_csvfieldnames, quoting=csv.QUOTE_NONNUMERIC)
                 writer.writeheader()
+            return
+
+        with open(csv_file_name, 'r', newline='', encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        header = rows[0] if rows else []
+        if header != profile_csvfieldnames and header == profile_csvfieldnames[:len(header)]:
+            # The upgraded file is written atomically, so a crash cannot lose the existing history
+            output = io.StringIO(newline='')
+            writer = csv.writer(output, quoting=csv.QUOTE_NONNUMERIC)
+            writer.writerow(profile_csvfieldnames)
+            for row in rows[1:]:
+                writer.writerow(row + [""] * (len(profile_csvfieldnames) - len(row)))
+            save_file_atomically(csv_file_name, output.getvalue().encode("utf-8"))
     except Exception as e:
         raise RuntimeError(f"Could not initialize profile CSV file '{csv_file_name}': {e}")
 
 
 # Writes profile CSV entry
-def write_profile_csv_entry(csv_file_name, date, event, old_value=None, new_value=None, delta=None, friend_steamid=None, friend_persona=None, friend_realname=None):
+def write_profile_csv_entry(csv_file_name, date, event, old_value=None, new_value=None, delta=None, friend_steamid=None, friend_persona=None, friend_realname=None, appid=None, game_name=None):
     try:
+        start_ts = time.perf_counter()
         with open(csv_file_name, 'a', newline='', buffering=1, encoding="utf-8") as csv_file:
             csvwriter = csv.DictWriter(csv_file, fieldnames=profile_csvfieldnames, quoting=csv.QUOTE_NONNUMERIC)
-            csvwriter.writerow({'Date': str(date), 'Event': event, 'OldValue': old_value if old_value is not None else "", 'NewValue': new_value if new_value is not None else "", 'Delta': delta if delta is not None else "", 'FriendSteamID': friend_steamid if friend_steamid is not None else "", 'FriendPersona': friend_persona if friend_persona is not None else "", 'FriendRealName': friend_realname if friend_realname is not None else ""})
+            csvwriter.writerow({'Date': str(date), 'Event': event, 'OldValue': old_value if old_value is not None else "", 'NewValue': new_value if new_value is not None else "", 'Delta': delta if delta is not None else "", 'FriendSteamID': friend_steamid if friend_steamid is not None else "", 'FriendPersona': friend_persona if friend_persona is not None else "", 'FriendRealName': friend_realname if friend_realname is not None else "", 'AppID': appid if appid is not None else "", 'GameName': game_name if game_name is not None else ""})
+        elapsed = time.perf_counter() - start_ts
+        file_write_latency.observe(elapsed, ("profile_csv",))
+        if phase_profiler:
+            phase_profiler.add("profile csv", elapsed)
     except Exception as e:
         raise RuntimeError(f"Failed to write to profile CSV file '{csv_file_name}': {e}")
 
 
 # Returns the current date/time in human readable format; eg. Sun 21 Apr 2024, 15:08:45
 def get_cur_ts(ts_str=""):
-    return (f'{ts_str}{calendar.day_abbr[(datetime.fromtimestamp(int(time.time()))).weekday()]} {datetime.fromtimestamp(int(time.time())).strftime("%d %b %Y, %H:%M:%S")}')
+    return (f'{ts_str}{calendar.day_abbr[(datetime.fromtimestamp(int(clock.time()))).weekday()]} {datetime.fromtimestamp(int(clock.time())).strftime("%d %b %Y, %H:%M:%S")}')
 
 
 # Prints the current date/time in human readable format with separator; eg. Sun 21 Apr 2024, 15:08:45
@@ -1156,38 +1517,189 @@ def decrease_active_check_signal_handler(sig, frame):
     print_cur_ts("Timestamp:\t\t\t")
 
 
-# Signal handler for SIGHUP allowing to reload secrets from .env
-def reload_secrets_signal_handler(sig, frame):
-    sig_name = signal.Signals(sig).name
-    print(f"* Signal {sig_name} received")
+# Config file and the settings loaded from it at startup, and the validated changes of the last reload waiting for
+# the next poll (see reload_config_signal_handler())
+config_file_path = None
+loaded_config = {}
+pending_config = None
+pending_config_lock = threading.Lock()
+
 
+# Reloads the dotenv file (DOTENV_FILE or the auto-searched .env) into the environment and returns its path, or None
+def reload_dotenv():
     # disable autoscan if DOTENV_FILE set to none
     if DOTENV_FILE and DOTENV_FILE.lower() == 'none':
-        env_path = None
-    else:
-        # reload .env if python-dotenv is installed
-        try:
-            from dotenv import load_dotenv, find_dotenv
-            if DOTENV_FILE:
-                env_path = DOTENV_FILE
-            else:
-                env_path = find_dotenv()
-            if env_path:
-                load_dotenv(env_path, override=True)
-            else:
-                print("* No .env file found, skipping env-var reload")
-        except ImportError:
-            env_path = None
-            print("* python-dotenv not installed, skipping env-var reload")
-
+        return None
+    # reload .env if python-dotenv is installed
+    try:
+        from dotenv import load_dotenv, find_dotenv
+        if DOTENV_FILE:
+            env_path = DOTENV_FILE
+        else:
+            env_path = find_dotenv()
+        if env_path:
+            load_dotenv(env_path, override=True)
+        else:
+            print("* No .env file found, skipping env-var reload")
+        return env_path or None
+    except ImportError:
+        print("* python-dotenv not installed, skipping env-var reload")
+        return None
+
+
+# Returns the settings defined in CONFIG_BLOCK with their default values
+def get_config_defaults():
+    defaults = {}
+    exec(CONFIG_BLOCK, defaults)
+    return {name: value for name, value in defaults.items() if name.isupper()}
+
+
+# Returns the settings from CONFIG_BLOCK defaults overridden by the config file (if any) and by secrets from the
+# environment (if a dotenv file was loaded), the same way main() applies them at startup
+def read_config(cfg_path, env_path):
+    defaults = get_config_defaults()
+    namespace = dict(globals())
+    namespace.update(defaults)
+    if cfg_path:
+        with open(cfg_path, "r") as cf:
+            exec(cf.read(), namespace)
+    config = {name: namespace[name] for name in defaults}
     if env_path:
         for secret in SECRET_KEYS:
-            old_val = globals().get(secret)
             val = os.getenv(secret)
-            if val is not None and val != old_val:
-                globals()[secret] = val
-                print(f"* Reloaded {secret} from {env_path}")
+            if val is not None:
+                config[secret] = val
+    return config
+
+
+# Remembers the config file and the settings loaded from it at startup; config reloads apply only settings changed
+# in the file since then, so values given by command line flags or changed at runtime are kept otherwise
+def remember_loaded_config(cfg_path):
+    global config_file_path, loaded_config
+    config_file_path = cfg_path
+    loaded_config = {name: copy.deepcopy(globals()[name]) for name in get_config_defaults()}
+
+
+# Returns the list of problems found in the settings changes ({name: value}) on top of the current settings
+def validate_config_changes(changes):
+    defaults = get_config_defaults()
+    errors = []
+    for name, value in changes.items():
+        default = defaults[name]
+        if isinstance(default, bool):
+            valid_type = isinstance(value, bool)
+        elif isinstance(default, (int, float)):
+            valid_type = isinstance(value, (int, float)) and not isinstance(value, bool)
+        else:
+            valid_type = isinstance(value, type(default))
+        if not valid_type:
+            errors.append(f"{name} must be {type(default).__name__}, not {type(value).__name__}")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and value < 0:
+            errors.append(f"{name} must not be negative")
+    if errors:
+        return errors
+
+    config = {name: changes.get(name, globals()[name]) for name in defaults}
+    for name in ("STEAM_CHECK_INTERVAL", "STEAM_ACTIVE_CHECK_INTERVAL"):
+        if config[name] < 1:
+            errors.append(f"{name} must be at least 1")
+    if not config["STEAM_API_KEY"] or config["STEAM_API_KEY"] == "your_steam_web_api_key":
+        errors.append("STEAM_API_KEY is empty or incorrect")
+    if config["SMTP_HOST"].startswith("your_smtp_server_"):
+        for name in changes:
+            if name.endswith("_NOTIFICATION") and config[name]:
+                errors.append(f"{name} needs SMTP settings to be configured")
+    for part, style in config["COLOR_THEME"].items():
+        if not isinstance(style, str) or any(word not in _STYLE_CODES for word in re.split(r"[+ ]+", style.strip().lower()) if word):
+            errors.append(f"COLOR_THEME['{part}'] has invalid style {style!r}")
+    for name in ("CSV_FILE", "PROFILE_CSV_FILE"):
+        if changes.get(name):
+            try:
+                with open(os.path.expanduser(changes[name]), 'a', newline='', buffering=1, encoding="utf-8") as _:
+                    pass
+            except Exception as e:
+                errors.append(f"{name} cannot be opened for writing: {e}")
+    return errors
+
+
+# Signal handler for SIGHUP reloading the config file and secrets from the dotenv file
+# Changed settings are validated as a whole and applied together before the next poll (see apply_pending_config());
+# an invalid config is rejected and the current settings are kept
+def reload_config_signal_handler(sig, frame):
+    global pending_config
+    sig_name = signal.Signals(sig).name
+    print(f"* Signal {sig_name} received")
+
+    env_path = reload_dotenv()
+    try:
+        new_config = read_config(config_file_path, env_path)
+    except Exception as e:
+        print(f"* Error: Cannot reload config file '{config_file_path}', keeping the current configuration: {e}")
+        print_cur_ts("Timestamp:\t\t\t")
+        return
+
+    changes = {}
+    for name, value in new_config.items():
+        if name in loaded_config and value == loaded_config[name]:
+            continue
+        if name in CONFIG_RESTART_KEYS:
+            print(f"* {name} changed in the config file, restart the tool to apply it")
+            continue
+        changes[name] = value
+
+    errors = validate_config_changes(changes)
+    if errors:
+        print("* Error: Config reload rejected, keeping the current configuration:")
+        for error in errors:
+            print(f"*   {error}")
+    elif changes:
+        pending_config = changes
+        print(f"* Config reloaded from '{config_file_path or 'defaults'}'" + (f" and '{env_path}'" if env_path else "") + f", {len(changes)} changed settings are applied before the next poll")
+    else:
+        print("* Config reloaded, no changed settings")
+    print_cur_ts("Timestamp:\t\t\t")
+
+
+# Applies the settings changes of the last config reload all together and prints them; returns True if anything
+# has been applied. Called by the monitoring loop before each poll, so no poll sees half of the changes
+def apply_pending_config():
+    global pending_config, LIVENESS_CHECK_COUNTER
+    with pending_config_lock:
+        changes, pending_config = pending_config, None
+    if not changes:
+        return False
+
+    for name, value in changes.items():
+        old_value = globals()[name]
+        new_value = os.path.expanduser(value) if name in ("CSV_FILE", "PROFILE_CSV_FILE") and value else value
+        globals()[name] = new_value
+        loaded_config[name] = copy.deepcopy(value)
+        if name in SECRET_KEYS:
+            print(f"* Config: {name} changed")
+        elif isinstance(old_value, dict) and isinstance(new_value, dict):
+            for key in sorted(set(old_value) | set(new_value)):
+                if old_value.get(key) != new_value.get(key):
+                    print(f"* Config: {name}[{key!r}] changed from {old_value.get(key)!r} to {new_value.get(key)!r}")
+        else:
+            print(f"* Config: {name} changed from {old_value!r} to {new_value!r}")
+
+    LIVENESS_CHECK_COUNTER = LIVENESS_CHECK_INTERVAL / STEAM_CHECK_INTERVAL
+    if "COLORED_OUTPUT" in changes or "COLOR_THEME" in changes:
+        init_color_output(stdout_bck)
+    if "STEAM_CHECK_INTERVAL" in changes or "STEAM_ACTIVE_CHECK_INTERVAL" in changes:
+        with monitor_targets_lock:
+            targets = list(monitor_targets.values())
+        for target in targets:
+            target.notify(interval_changed=True)
+    print_cur_ts("Timestamp:\t\t\t")
+    return True
+
 
+# Signal handler for SIGPROF saving a snapshot of the cProfile statistics collected so far (--profile-dump)
+def dump_cprofile_signal_handler(sig, frame):
+    sig_name = signal.Signals(sig).name
+    print(f"* Signal {sig_name} received")
+    dump_cprofile_stats()
     print_cur_ts("Timestamp:\t\t\t")
 
 
@@ -1229,6 +1741,1185 @@ def resolve_executable(path):
     raise FileNotFoundError(f"Could not find executable '{path}'")
 
 
+# Writes data to a file atomically (via temporary file + rename), so readers never see a partially written file
+def save_file_atomically(filename, data):
+    tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    mode = "wb" if isinstance(data, (bytes, bytearray, memoryview)) else "w"
+    encoding = None if mode == "wb" else "utf-8"
+    try:
+        with open(tmp_filename, mode, encoding=encoding) as f:
+            f.write(data)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+# Persistent key-value cache stored as a JSON file, with TTL based expiry and LRU eviction
+# Entries are kept as [fetch_timestamp, value] pairs in least-recently-used first order
+# Saving merges the changes with the current file contents, so the cache can be shared by several processes
+class DiskCache(object):
+    def __init__(self, filename, ttl=0, max_entries=0):
+        self.filename = filename
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = self._read_entries()
+        self.changed = set()
+        self.touched = set()
+
+    def _read_entries(self):
+        entries = OrderedDict()
+        if not self.filename or not os.path.isfile(self.filename):
+            return entries
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, entry in data.get("entries", {}).items():
+                if isinstance(entry, list) and len(entry) == 2:
+                    entries[key] = entry
+        except Exception as e:
+            print(f"* Cannot load cache from '{self.filename}' file: {e}")
+        return entries
+
+    # Returns cached value or default if it is missing or older than ttl (the cache's TTL by default)
+    def get(self, key, default=None, ttl=None, allow_stale=False):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            ttl = self.ttl if ttl is None else ttl
+            if not allow_stale and ttl and clock.time() - entry[0] > ttl:
+                return default
+            self.entries.move_to_end(key)
+            self.touched.add(key)
+            return entry[1]
+
+    def set(self, key, value, ts=None):
+        with self.lock:
+            self.entries[key] = [int(ts if ts is not None else clock.time()), value]
+            self.entries.move_to_end(key)
+            self.changed.add(key)
+            self._evict(self.entries)
+
+    def _evict(self, entries):
+        if self.max_entries:
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def save(self):
+        with self.lock:
+            if not (self.changed or self.touched) or not self.filename:
+                return
+            merged = self._read_entries()
+            for key, entry in self.entries.items():
+                if key in self.changed and (key not in merged or merged[key][0] <= entry[0]):
+                    merged[key] = entry
+                if key in merged and (key in self.changed or key in self.touched):
+                    merged.move_to_end(key)
+            self._evict(merged)
+            try:
+                save_file_atomically(self.filename, json.dumps({"entries": merged}, separators=(",", ":")))
+            except Exception as e:
+                print(f"* Cannot save cache to '{self.filename}' file: {e}")
+                return
+            self.entries = merged
+            self.changed = set()
+            self.touched = set()
+
+
+# Saves an array of unsigned integers to a binary file in little-endian byte order
+def save_array(filename, arr):
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    save_file_atomically(filename, arr.tobytes())
+
+
+# Saves unsigned 64-bit integers (e.g. Steam64 IDs) as a sorted array in a binary file
+# The file is a plain little-endian uint64 array, so it can be memory-mapped directly
+def save_u64_array(filename, values):
+    save_array(filename, array('Q', sorted(values)))
+
+
+# Loads an array of unsigned 64-bit integers saved by save_u64_array()
+def load_u64_array(filename):
+    arr = array('Q')
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if len(data) % arr.itemsize:
+        raise ValueError(f"invalid file size ({len(data)} bytes)")
+    arr.frombytes(data)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+# Memory-maps an array file saved by save_array() and returns a read-only view of it
+# (on big-endian platforms the data is copied and byte-swapped instead)
+def map_array(filename, typecode):
+    with open(filename, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size % array(typecode).itemsize:
+            raise ValueError(f"invalid size of '{filename}' file ({size} bytes)")
+        if size == 0:
+            return array(typecode)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm).cast(typecode)
+    if sys.byteorder != "little":
+        arr = array(typecode, view)
+        arr.byteswap()
+        return arr
+    return view
+
+
+# Releases the array returned by map_array() and closes its memory map
+def unmap_array(arr):
+    if isinstance(arr, memoryview):
+        mm = arr.obj
+        arr.release()
+        mm.close()
+
+
+# Returns (added, removed) values between two sorted sequences using a single linear merge
+def diff_sorted_ids(old_ids, new_ids):
+    added = []
+    removed = []
+    i = j = 0
+    old_len = len(old_ids)
+    new_len = len(new_ids)
+    while i < old_len and j < new_len:
+        old_id = old_ids[i]
+        new_id = new_ids[j]
+        if old_id == new_id:
+            i += 1
+            j += 1
+        elif old_id < new_id:
+            removed.append(old_id)
+            i += 1
+        else:
+            added.append(new_id)
+            j += 1
+    removed.extend(old_ids[i:])
+    added.extend(new_ids[j:])
+    return added, removed
+
+
+# Raised by VirtualClock when the simulated time reaches the end of the simulation
+class SimulationFinished(Exception):
+    pass
+
+
+# Clock used instead of the time module in simulation mode (--simulate): sleeping only advances the virtual time,
+# so days of monitoring run at full CPU speed; sleeping past end_ts raises SimulationFinished
+class VirtualClock(object):
+    def __init__(self, start_ts, end_ts=None):
+        self.lock = threading.Lock()
+        self.start_ts = float(start_ts)
+        self.ts = float(start_ts)
+        self.end_ts = end_ts
+
+    def time(self):
+        with self.lock:
+            return self.ts
+
+    # Seconds since the start of the simulation (like time.monotonic() it is only meaningful for intervals)
+    def monotonic(self):
+        with self.lock:
+            return self.ts - self.start_ts
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.ts += max(0, seconds)
+            finished = self.end_ts is not None and self.ts >= self.end_ts
+        if finished:
+            raise SimulationFinished()
+
+
+# Clock and sleeper of the monitoring loop, timestamps, notifications and API throttling (time(), sleep(), monotonic())
+# It is the time module unless replaced with VirtualClock in simulation mode
+clock = time
+
+# Steam Web API client used instead of the real one in simulation mode (see run_simulation())
+simulated_webapi = None
+
+
+# Token bucket rate limiter shared by Steam Web API requests issued from multiple threads
+class RateLimiter(object):
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.lock = threading.Lock()
+        self.next_ts = 0.0
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        interval = 1.0 / self.rate
+        with self.lock:
+            now = clock.monotonic()
+            self.next_ts = max(self.next_ts, now - (self.burst - 1) * interval)
+            wait = self.next_ts - now
+            self.next_ts += interval
+        if wait > 0:
+            clock.sleep(wait)
+
+
+_api_rate_limiter = None
+
+
+# Returns the rate limiter for Steam Web API requests (API_RATE_LIMIT requests per second)
+def get_api_rate_limiter():
+    global _api_rate_limiter
+    if _api_rate_limiter is None or _api_rate_limiter.rate != API_RATE_LIMIT:
+        _api_rate_limiter = RateLimiter(API_RATE_LIMIT, burst=API_MAX_CONCURRENCY)
+    return _api_rate_limiter
+
+
+# Raised instead of calling the Steam Web API endpoint whose circuit breaker is open
+class CircuitOpenError(Exception):
+    pass
+
+
+# Circuit breaker of a single Steam Web API endpoint
+#   closed    - requests are allowed, consecutive transient errors are counted
+#   open      - requests fail immediately until the backoff delay passes
+#   half-open - a single probe request is allowed; success closes the circuit, failure opens it again
+# Backoff delays use decorrelated jitter: delay = min(max, random(base, previous delay * 3))
+class CircuitBreaker(object):
+    def __init__(self, name, failure_threshold=3, base_delay=30, max_delay=1800):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_delay = base_delay
+        self.max_delay = max(base_delay, max_delay)
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.delay = 0
+        self.open_until = 0.0
+        self.probe_in_flight = False
+
+    # Returns True if the request can be made now
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and clock.time() >= self.open_until:
+                self.state = "half-open"
+                self.probe_in_flight = False
+            if self.state == "half-open" and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.delay = 0
+            self.probe_in_flight = False
+
+    # Lets another request probe the endpoint after a non-transient error, which says nothing about its health
+    def release_probe(self):
+        with self.lock:
+            self.probe_in_flight = False
+
+    # Records a transient error; the circuit opens when the threshold is reached, on a failed probe or on a rate limit
+    def record_failure(self, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == "half-open" or self.failures >= self.failure_threshold or retry_after is not None:
+                self.delay = min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, self.delay * 3)))
+                self.open_until = clock.time() + max(self.delay, retry_after or 0)
+                self.state = "open"
+
+    # Returns number of seconds until the next request is allowed (0 if the circuit is not open)
+    def retry_in(self):
+        with self.lock:
+            if self.state != "open":
+                return 0
+            return max(0, self.open_until - clock.time())
+
+
+circuit_breakers = {}
+circuit_breakers_lock = threading.Lock()
+
+
+# Returns the circuit breaker of the Steam Web API endpoint
+def get_circuit_breaker(method_path):
+    with circuit_breakers_lock:
+        breaker = circuit_breakers.get(method_path)
+        if breaker is None:
+            breaker = CircuitBreaker(method_path, API_BREAKER_FAILURE_THRESHOLD, API_BACKOFF_BASE, API_BACKOFF_MAX)
+            circuit_breakers[method_path] = breaker
+        return breaker
+
+
+# Returns states of circuit breakers which are not closed as a string (empty if all endpoints are healthy)
+def format_circuit_breakers():
+    with circuit_breakers_lock:
+        breakers = list(circuit_breakers.values())
+    states = []
+    for breaker in breakers:
+        if breaker.state == "closed":
+            continue
+        retry_in = breaker.retry_in()
+        retry_str = f", retry in {display_time(int(retry_in) or 1)}" if retry_in else ""
+        states.append(f"{breaker.name.split('.')[-1]}: {breaker.state}{retry_str}")
+    return ", ".join(states)
+
+
+# Returns True for errors which indicate the Steam Web API is overloaded or unavailable (not client errors)
+# along with the Retry-After value for rate limit errors
+def get_transient_api_error(e):
+    response = e.response if isinstance(e, req.exceptions.HTTPError) else None
+    if response is not None:
+        if response.status_code == 429:
+            try:
+                return True, int(response.headers.get('Retry-After') or 0)
+            except ValueError:
+                return True, 0
+        return response.status_code >= 500, None
+    return isinstance(e, req.exceptions.RequestException), None
+
+
+# Adaptive (AIMD) limit of Steam Web API requests in flight
+# The limit grows additively (by 1 per limit's worth of successful requests) up to max_limit and is cut in half
+# (at most once per cooldown) on overload: HTTP 429, 5xx errors, timeouts or latency spikes
+class AdaptiveConcurrencyLimiter(object):
+    def __init__(self, max_limit, min_limit=1, spike_factor=3, window=200):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.spike_factor = spike_factor
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+        self.last_decrease_ts = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    # Releases the slot and adjusts the limit based on the request's latency (in seconds) and outcome
+    def release(self, latency, overloaded=False):
+        with self.condition:
+            self.in_flight -= 1
+            if not overloaded:
+                if self.spike_factor and len(self.latencies) >= 20:
+                    overloaded = latency > self.spike_factor * self._percentile(50)
+                self.latencies.append(latency)
+            if not overloaded:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            else:
+                now = clock.monotonic()
+                if now - self.last_decrease_ts >= max(1.0, self._percentile(50)):
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.last_decrease_ts = now
+            self.condition.notify_all()
+
+    def _percentile(self, percent):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    # Returns {"p50": ..., "p90": ..., "p99": ...} latencies of recent successful requests (in seconds)
+    def latency_percentiles(self):
+        with self.condition:
+            return {f"p{percent}": self._percentile(percent) for percent in (50, 90, 99)}
+
+
+_concurrency_limiter = None
+
+
+# Returns the adaptive limit of concurrent Steam Web API requests (up to API_MAX_CONCURRENCY)
+def get_concurrency_limiter():
+    global _concurrency_limiter
+    if _concurrency_limiter is None or _concurrency_limiter.max_limit != max(1, API_MAX_CONCURRENCY):
+        _concurrency_limiter = AdaptiveConcurrencyLimiter(API_MAX_CONCURRENCY, spike_factor=API_LATENCY_SPIKE_FACTOR)
+    return _concurrency_limiter
+
+
+# Returns the current concurrency limit and latency percentiles of Steam Web API requests as a string
+def format_concurrency_stats():
+    limiter = get_concurrency_limiter()
+    latencies = limiter.latency_percentiles()
+    return f"{int(limiter.limit)}/{limiter.max_limit} (latency p50: {latencies['p50'] * 1000:.0f} ms, p90: {latencies['p90'] * 1000:.0f} ms, p99: {latencies['p99'] * 1000:.0f} ms)"
+
+
+# Returns a Steam Web API client for STEAM_API_KEY and STEAM_API_URL (or the simulated one in simulation mode)
+def create_webapi():
+    if simulated_webapi is not None:
+        return simulated_webapi
+    api_url = urlparse(STEAM_API_URL)
+    return steam.webapi.WebAPI(key=STEAM_API_KEY, apihost=api_url.netloc, https=api_url.scheme != "http")
+
+
+api_call_counts = {}
+api_call_counts_lock = threading.Lock()
+
+
+# Calls the Steam Web API method, respecting the configured request rate limit, the adaptive concurrency limit
+# and the endpoint's circuit breaker
+# Every request is counted per endpoint (see format_api_call_stats())
+def api_call(s_api, method_path, **kwargs):
+    breaker = get_circuit_breaker(method_path)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Steam Web API endpoint {method_path} is paused after errors, retry in {display_time(int(breaker.retry_in()) or 1)}")
+    get_api_rate_limiter().acquire()
+    with api_call_counts_lock:
+        api_call_counts[method_path] = api_call_counts.get(method_path, 0) + 1
+    limiter = get_concurrency_limiter()
+    limiter.acquire()
+    recorder = get_snapshot_recorder()
+    fetch_start_ts = time.perf_counter() if phase_profiler else 0
+    start_ts = clock.monotonic()
+    try:
+        result = s_api.call(method_path, **kwargs)
+    except Exception as e:
+        if phase_profiler:
+            phase_profiler.add(f"fetch {method_path}", time.perf_counter() - fetch_start_ts)
+        latency = clock.monotonic() - start_ts
+        transient, retry_after = get_transient_api_error(e)
+        limiter.release(latency, overloaded=transient)
+        api_request_latency.observe(latency, (method_path,))
+        response = getattr(e, "response", None)
+        api_request_errors.inc((method_path, str(getattr(response, "status_code", None) or type(e).__name__)))
+        if transient:
+            breaker.record_failure(retry_after)
+        else:
+            breaker.release_probe()
+        if recorder:
+            recorder.record(method_path, kwargs, error=e)
+        raise
+    if phase_profiler:
+        phase_profiler.add(f"fetch {method_path}", time.perf_counter() - fetch_start_ts)
+    latency = clock.monotonic() - start_ts
+    limiter.release(latency)
+    api_request_latency.observe(latency, (method_path,))
+    breaker.record_success()
+    if recorder:
+        recorder.record(method_path, kwargs, result)
+    return result
+
+
+# Returns the number of Steam Web API requests made so far (total, per poll and per endpoint) as a string
+def format_api_call_stats(polls=0):
+    with api_call_counts_lock:
+        counts = sorted(api_call_counts.items(), key=lambda item: item[1], reverse=True)
+    total = sum(count for _, count in counts)
+    per_poll = f" ({total / polls:.2f} per poll)" if polls else ""
+    endpoints = ", ".join(f"{method_path.split('.')[-1]}: {count}" for method_path, count in counts)
+    return f"{total}{per_poll}" + (f" [{endpoints}]" if endpoints else "")
+
+
+# Accumulates wall time spent in the phases of the poll cycle (--profile) and formats it as a table
+# Instrumented code checks the phase_profiler global first, so the timers cost next to nothing when disabled
+class PhaseProfiler(object):
+    def __init__(self, report_interval):
+        self.report_interval = report_interval
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.window_start_ts = clock.time()
+
+    def add(self, phase, elapsed):
+        with self.lock:
+            stats = self.phases.get(phase)
+            if stats is None:
+                stats = self.phases[phase] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+
+    # Returns the breakdown table of the current reporting window and starts a new one
+    # (None if the window has not passed yet); phases are sorted by total time
+    def take_report(self, force=False):
+        now = clock.time()
+        if not force and now - self.window_start_ts < self.report_interval:
+            return None
+        with self.lock:
+            phases = self.phases
+            self.phases = {}
+        window = now - self.window_start_ts
+        self.window_start_ts = now
+
+        polls = phases.get("poll", (0,))[0]
+        lines = [f"* Poll phase timings over the last {display_time(int(window)) or '0 seconds'} ({polls} polls):"]
+        lines.append(f"{'Phase':<50} {'Calls':>7} {'Total ms':>11} {'Avg ms':>10} {'Max ms':>10} {'ms/poll':>10}")
+        for phase, (calls, total, longest) in sorted(phases.items(), key=lambda item: item[1][1], reverse=True):
+            per_poll = f"{total * 1000 / polls:.2f}" if polls else "-"
+            lines.append(f"{phase:<50} {calls:>7} {total * 1000:>11.2f} {total * 1000 / calls:>10.2f} {longest * 1000:>10.2f} {per_poll:>10}")
+        return "\n".join(lines)
+
+
+phase_profiler = None
+cprofile_profiler = None
+cprofile_dump_file = ""
+
+
+# Writes the cProfile statistics collected so far (--profile-dump) to a new <file>_<date>_<time>.pstats file
+def dump_cprofile_stats():
+    filename = f"{cprofile_dump_file}_{datetime.fromtimestamp(int(time.time())).strftime('%Y%m%d_%H%M%S')}.pstats"
+    try:
+        # dump_stats() stops the profiler, so it is enabled again afterwards
+        cprofile_profiler.dump_stats(filename)
+        print(f"* cProfile statistics saved to '{filename}' (view with: python3 -m pstats {filename})")
+    except Exception as e:
+        print(f"* Error: Cannot save cProfile statistics: {e}")
+    finally:
+        cprofile_profiler.enable()
+
+
+# Monotonically increasing counter with labels (a counter without labels starts at 0)
+class MetricCounter(object):
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.lock = threading.Lock()
+        self.values = {} if label_names else {(): 0}
+
+    def inc(self, labels=(), value=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, labels, value) for labels, value in sorted(self.values.items())]
+
+
+# Gauge (a value which can go up and down) with labels
+class MetricGauge(MetricCounter):
+    def add(self, value, labels=()):
+        self.inc(labels, value)
+
+
+# Histogram of observed values with labels; counts are kept per bucket and made cumulative only on export,
+# so an observation is a bisect and an increment
+class MetricHistogram(object):
+    def __init__(self, name, help_text, label_names=(), buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, value, labels=()):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def samples(self):
+        with self.lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in sorted(self.series.items())]
+        samples = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", labels + ("+Inf" if bound == float("inf") else repr(float(bound)),), cumulative))
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+
+api_request_latency = MetricHistogram("steam_monitor_api_request_duration_seconds", "Steam Web API request latency", ("endpoint",))
+api_request_errors = MetricCounter("steam_monitor_api_request_errors_total", "Failed Steam Web API requests by HTTP status code or error type", ("endpoint", "code"))
+poll_lag = MetricHistogram("steam_monitor_poll_lag_seconds", "Delay of polls behind their schedule", buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300))
+events_emitted = MetricCounter("steam_monitor_events_total", "Monitoring events emitted by type", ("type",))
+notification_latency = MetricHistogram("steam_monitor_notification_duration_seconds", "Email notification delivery time", ("result",))
+notifications_in_flight = MetricGauge("steam_monitor_notifications_in_flight", "Email notifications being delivered (notifications are sent synchronously, so this is the queue depth)")
+file_write_latency = MetricHistogram("steam_monitor_file_write_duration_seconds", "CSV and log file write latency", ("file",), buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1))
+
+
+# Returns the resident set size of the process in bytes or None if it cannot be determined
+# (the peak value is used where the current one is not available)
+def get_process_rss():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        pass
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if platform.system() == "Darwin" else rss * 1024
+    except Exception:
+        return None
+
+
+# Escapes a label value for the Prometheus text format
+def escape_metric_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+# Returns all metrics in the Prometheus text exposition format
+def format_metrics():
+    with api_call_counts_lock:
+        request_counts = sorted(api_call_counts.items())
+    api_requests = MetricCounter("steam_monitor_api_requests_total", "Steam Web API requests by endpoint", ("endpoint",))
+    api_requests.values = {(method_path,): count for method_path, count in request_counts}
+    rss = MetricGauge("process_resident_memory_bytes", "Resident memory size in bytes")
+    rss_bytes = get_process_rss()
+    rss.values = {(): rss_bytes} if rss_bytes is not None else {}
+
+    lines = []
+    for metric, metric_type in ((api_requests, "counter"), (api_request_errors, "counter"), (api_request_latency, "histogram"), (poll_lag, "histogram"), (events_emitted, "counter"), (notification_latency, "histogram"), (notifications_in_flight, "gauge"), (file_write_latency, "histogram"), (rss, "gauge")):
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric_type}")
+        label_names = metric.label_names + (("le",) if metric_type == "histogram" else ())
+        for name, labels, value in metric.samples():
+            labels_str = ",".join(f'{label_name}="{escape_metric_label(label)}"' for label_name, label in zip(label_names, labels))
+            lines.append(f"{name}{{{labels_str}}} {value}" if labels_str else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Starts the metrics endpoint in a background thread and returns the server (port 0 picks a free port)
+def start_metrics_server(host, port):
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            data = format_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    class MetricsServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    server = MetricsServer((host, port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# User monitored in a background thread when the control endpoint is enabled; the monitoring loop waits for the next
+# poll on it, so the wait can be cut short to force a poll or to stop monitoring, and re-timed when intervals change
+class MonitorTarget(object):
+    def __init__(self, steamid):
+        self.steamid = steamid
+        self.condition = threading.Condition()
+        self.poll_requested = False
+        self.stop_requested = False
+        self.interval_changed = False
+        self.state = None
+        self.polls = 0
+        self.last_poll_ts = 0
+        self.next_poll_ts = 0
+        self.exit_code = 0
+        self.thread = None
+
+    # Waits the given number of seconds (or the new polling interval if it changes meanwhile); returns False if the
+    # monitoring of the user should stop
+    def wait(self, seconds):
+        start_ts = time.time()
+        deadline = start_ts + seconds
+        with self.condition:
+            self.next_poll_ts = deadline
+            while not self.poll_requested and not self.stop_requested:
+                if self.interval_changed:
+                    self.interval_changed = False
+                    status = self.state["status"] if self.state else 0
+                    deadline = start_ts + (STEAM_ACTIVE_CHECK_INTERVAL if status > 0 else STEAM_CHECK_INTERVAL)
+                    self.next_poll_ts = deadline
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            self.poll_requested = False
+            return not self.stop_requested
+
+    def notify(self, poll=False, stop=False, interval_changed=False):
+        with self.condition:
+            self.poll_requested = self.poll_requested or poll
+            self.stop_requested = self.stop_requested or stop
+            self.interval_changed = self.interval_changed or interval_changed
+            self.condition.notify_all()
+
+    # Returns the monitoring state of the user as a JSON-serializable dict
+    def info(self):
+        info = {"steamid": str(self.steamid), "polls": self.polls, "last_poll": self.last_poll_ts or None, "next_poll": int(self.next_poll_ts) or None}
+        state = self.state
+        if state:
+            info.update(
+                username=state["username"],
+                status=steam_personastates[state["status"]],
+                status_since=state["status_ts_old"] or None,
+                online_since=state["status_online_start_ts"] or None,
+                game=state["gamename"] or None if state["gameid"] else None,
+                game_since=state["game_ts_old"] or None if state["gameid"] else None,
+            )
+        return info
+
+
+monitor_targets = {}
+monitor_targets_lock = threading.Lock()
+monitor_targets_done = threading.Event()
+
+
+# Waits sleep_interval seconds before the next poll of the user (on the MonitorTarget if the user is a control endpoint
+# target); returns False if the monitoring of the user has been stopped
+def wait_for_next_poll(target, sleep_interval):
+    if target is None:
+        clock.sleep(sleep_interval)
+        return True
+    return target.wait(sleep_interval)
+
+
+# Starts monitoring of the user in a background thread and registers it in monitor_targets
+def start_monitor_target(steamid, csv_file_name=None, profile_csv_file_name=None):
+    with monitor_targets_lock:
+        if steamid in monitor_targets:
+            raise ValueError(f"user {steamid} is already monitored")
+        target = MonitorTarget(steamid)
+        monitor_targets[steamid] = target
+
+    def run():
+        try:
+            steam_monitor_user(steamid, csv_file_name, profile_csv_file_name, target=target)
+        except SystemExit as e:
+            target.exit_code = e.code
+        except Exception as e:
+            print(f"* Error: Monitoring of user {steamid} stopped: {e}")
+            target.exit_code = 1
+        finally:
+            with monitor_targets_lock:
+                if monitor_targets.get(steamid) is target:
+                    del monitor_targets[steamid]
+                if not monitor_targets:
+                    monitor_targets_done.set()
+
+    target.thread = threading.Thread(target=run, name=f"monitor-{steamid}", daemon=True)
+    target.thread.start()
+    return target
+
+
+# Validates the settings changes ({name: value}) and applies all of them or none; returns {name: (old, new)}
+def apply_control_settings(changes):
+    global LIVENESS_CHECK_COUNTER
+    if not isinstance(changes, dict):
+        raise ValueError("settings must be a JSON object")
+    for name, value in changes.items():
+        value_type = CONTROL_SETTINGS.get(name)
+        if value_type is None:
+            raise ValueError(f"unknown setting '{name}'")
+        if type(value) is not value_type:
+            raise ValueError(f"setting '{name}' must be {'true/false' if value_type is bool else 'an integer'}")
+        if value_type is int and value < 1:
+            raise ValueError(f"setting '{name}' must be at least 1")
+
+    applied = {}
+    for name, value in changes.items():
+        if globals()[name] != value:
+            applied[name] = (globals()[name], value)
+            globals()[name] = value
+    if "STEAM_CHECK_INTERVAL" in applied:
+        LIVENESS_CHECK_COUNTER = LIVENESS_CHECK_INTERVAL / STEAM_CHECK_INTERVAL
+    if "STEAM_CHECK_INTERVAL" in applied or "STEAM_ACTIVE_CHECK_INTERVAL" in applied:
+        with monitor_targets_lock:
+            targets = list(monitor_targets.values())
+        for target in targets:
+            target.notify(interval_changed=True)
+    return applied
+
+
+# Returns the current settings and monitored users as a JSON-serializable dict (GET /state of the control endpoint)
+def get_control_state():
+    with monitor_targets_lock:
+        targets = list(monitor_targets.values())
+    return {
+        "settings": {name: globals()[name] for name in CONTROL_SETTINGS},
+        "targets": [target.info() for target in targets],
+        "api_requests": format_api_call_stats(),
+    }
+
+
+# Starts the control endpoint in a background thread and returns the server (port 0 picks a free port)
+# GET /state returns the settings and monitored users, POST /settings changes settings ({name: value}), POST /poll
+# forces an immediate poll (of all users or {"steamid": ...}), POST /targets adds a monitored user ({"steamid": ...,
+# "csv_file": ..., "profile_csv_file": ...}) and DELETE /targets/<steamid> stops monitoring of the user
+def start_control_server(host, port):
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+    class ControlRequestHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, data):
+            body = json.dumps(data, indent=2).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length).decode("utf-8")) if length else {}
+
+        # Returns the monitored user given by its Steam64 ID, or None if not found
+        def find_target(self, steamid):
+            with monitor_targets_lock:
+                return monitor_targets.get(int(steamid))
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/state":
+                self.send_json(404, {"error": "not found"})
+                return
+            self.send_json(200, get_control_state())
+
+        def do_POST(self):
+            path = self.path.split("?")[0]
+            try:
+                data = self.read_json()
+                if path == "/settings":
+                    applied = apply_control_settings(data)
+                    for name, (old_value, new_value) in applied.items():
+                        print(f"* Control: {name} changed from {old_value} to {new_value}")
+                    if applied:
+                        print_cur_ts("Timestamp:\t\t\t")
+                    self.send_json(200, {"changed": sorted(applied), "settings": get_control_state()["settings"]})
+                elif path == "/poll":
+                    if data.get("steamid"):
+                        target = self.find_target(data["steamid"])
+                        if not target:
+                            self.send_json(404, {"error": f"user {data['steamid']} is not monitored"})
+                            return
+                        targets = [target]
+                    else:
+                        with monitor_targets_lock:
+                            targets = list(monitor_targets.values())
+                    for target in targets:
+                        target.notify(poll=True)
+                    self.send_json(200, {"polled": [str(target.steamid) for target in targets]})
+                elif path == "/targets":
+                    steamid = int(data.get("steamid") or 0)
+                    if not steamid:
+                        raise ValueError("steamid is missing")
+                    start_monitor_target(steamid, data.get("csv_file"), data.get("profile_csv_file"))
+                    print(f"* Control: monitoring of user {steamid} added")
+                    print_cur_ts("Timestamp:\t\t\t")
+                    self.send_json(200, {"added": str(steamid)})
+                else:
+                    self.send_json(404, {"error": "not found"})
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+
+        def do_DELETE(self):
+            path = self.path.split("?")[0]
+            if not path.startswith("/targets/"):
+                self.send_json(404, {"error": "not found"})
+                return
+            steamid = path[len("/targets/"):]
+            target = self.find_target(steamid) if steamid.isdigit() else None
+            if not target:
+                self.send_json(404, {"error": f"user {steamid} is not monitored"})
+                return
+            target.notify(stop=True)
+            print(f"* Control: monitoring of user {steamid} removed")
+            print_cur_ts("Timestamp:\t\t\t")
+            self.send_json(200, {"removed": steamid})
+
+        def log_message(self, format, *args):
+            pass
+
+    class ControlServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    server = ControlServer((host, port), ControlRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Returns the list of changes turning old JSON data into new: [path, value] sets a dict key or a list item
+# (appending when the index equals the list length), [path] removes a dict key or truncates a list at the index
+def diff_json(old, new, path=()):
+    if type(old) is not type(new) or not isinstance(new, (dict, list)):
+        return [] if old == new and type(old) is type(new) else [[list(path), new]]
+    changes = []
+    if isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                changes.append([list(path) + [key], value])
+            elif old[key] != value:
+                changes.extend(diff_json(old[key], value, tuple(path) + (key,)))
+        changes.extend([list(path) + [key]] for key in old if key not in new)
+        return changes
+    common = min(len(old), len(new))
+    for i in range(common):
+        if old[i] != new[i]:
+            changes.extend(diff_json(old[i], new[i], tuple(path) + (i,)))
+    changes.extend([list(path) + [i], new[i]] for i in range(common, len(new)))
+    if len(old) > len(new):
+        changes.append([list(path) + [len(new)]])
+    return changes
+
+
+# Applies changes returned by diff_json() to the data (modified in place) and returns the result
+def apply_json_diff(data, changes):
+    for change in changes:
+        path = change[0]
+        if not path:
+            data = change[1]
+            continue
+        parent = data
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+        if len(change) == 1:
+            if isinstance(parent, list):
+                del parent[key:]
+            else:
+                del parent[key]
+        elif isinstance(parent, list) and key == len(parent):
+            parent.append(change[1])
+        else:
+            parent[key] = change[1]
+    return data
+
+
+SNAPSHOT_BLOCK_MAGIC = b"SMS1"
+SNAPSHOT_BLOCK_HEADER = struct.Struct("<4sI")
+SNAPSHOT_INDEX_ENTRY = struct.Struct("<ddQI")
+
+
+# Append-only recorder of raw Steam Web API responses
+# Every response is stored in full or as a diff_json() delta against the previous response to the same request
+# (method and parameters); records are compressed with zlib in blocks which decode independently, each block is
+# listed in the <file>.idx time index as (first timestamp, last timestamp, offset, size)
+class SnapshotRecorder(object):
+    def __init__(self, filename, block_records=500, flush_interval=300):
+        self.filename = filename
+        self.index_filename = filename + ".idx"
+        self.block_records = max(1, block_records)
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.records = []
+        self.bases = {}
+        self.block_start_ts = self.block_end_ts = 0.0
+        self.data_file = open(filename, "ab")
+        self.index_file = open(self.index_filename, "ab")
+        self.recover()
+
+    # Drops a trailing block missing in the time index (e.g. the tool was killed while writing it)
+    def recover(self):
+        index_size = self.index_file.tell()
+        end = 0
+        if index_size >= SNAPSHOT_INDEX_ENTRY.size:
+            self.index_file.truncate(index_size - index_size % SNAPSHOT_INDEX_ENTRY.size)
+            with open(self.index_filename, "rb") as f:
+                f.seek(-SNAPSHOT_INDEX_ENTRY.size, os.SEEK_END)
+                _, _, offset, size = SNAPSHOT_INDEX_ENTRY.unpack(f.read(SNAPSHOT_INDEX_ENTRY.size))
+            end = offset + SNAPSHOT_BLOCK_HEADER.size + size
+        else:
+            self.index_file.truncate(0)
+        if self.data_file.tell() != end:
+            self.data_file.truncate(end)
+        self.data_file.seek(end)
+
+    # Records the response (or the error) of the Steam Web API request
+    def record(self, method_path, params, result=None, error=None):
+        ts = clock.time()
+        record = {"t": round(ts, 3), "m": method_path, "p": params}
+        with self.lock:
+            key = (method_path, json.dumps(params, sort_keys=True, default=str))
+            if error is not None:
+                status = getattr(getattr(error, "response", None), "status_code", None)
+                record["e"] = str(error)
+                if status is not None:
+                    record["s"] = status
+            else:
+                base = self.bases.get(key)
+                if base is not None and base == result:
+                    record["d"] = []
+                else:
+                    body = json.dumps(result, separators=(",", ":"), default=str)
+                    changes = diff_json(base, result) if base is not None else None
+                    if changes is not None and len(json.dumps(changes, separators=(",", ":"), default=str)) < len(body):
+                        record["d"] = changes
+                    else:
+                        record["f"] = result
+                    self.bases[key] = json.loads(body)
+            if not self.records:
+                self.block_start_ts = ts
+            self.block_end_ts = ts
+            self.records.append(json.dumps(record, separators=(",", ":"), default=str))
+            if len(self.records) >= self.block_records or ts - self.block_start_ts >= self.flush_interval:
+                self.write_block()
+
+    # Compresses the buffered records and appends them as a new block; deltas restart with the next block
+    def write_block(self):
+        if not self.records:
+            return
+        data = zlib.compress("\n".join(self.records).encode("utf-8"))
+        offset = self.data_file.tell()
+        self.data_file.write(SNAPSHOT_BLOCK_HEADER.pack(SNAPSHOT_BLOCK_MAGIC, len(data)) + data)
+        self.data_file.flush()
+        self.index_file.write(SNAPSHOT_INDEX_ENTRY.pack(self.block_start_ts, self.block_end_ts, offset, len(data)))
+        self.index_file.flush()
+        self.records = []
+        self.bases = {}
+
+    def flush(self):
+        with self.lock:
+            self.write_block()
+
+    def close(self):
+        with self.lock:
+            if self.data_file.closed:
+                return
+            self.write_block()
+            self.data_file.close()
+            self.index_file.close()
+
+
+_snapshot_recorder = None
+_snapshot_recorder_lock = threading.Lock()
+
+
+# Returns the recorder of Steam Web API responses or None if recording is disabled
+def get_snapshot_recorder():
+    global _snapshot_recorder
+    if not SNAPSHOT_FILE:
+        return None
+    if _snapshot_recorder is None:
+        with _snapshot_recorder_lock:
+            if _snapshot_recorder is None:
+                recorder = SnapshotRecorder(os.path.expanduser(SNAPSHOT_FILE), SNAPSHOT_BLOCK_RECORDS, SNAPSHOT_FLUSH_INTERVAL)
+                atexit.register(recorder.close)
+                _snapshot_recorder = recorder
+    return _snapshot_recorder
+
+
+# Reads responses recorded by SnapshotRecorder between the timestamps (inclusive, None means no limit) and yields
+# dicts with ts, method, params and either response or error (plus status for HTTP errors)
+# Only the blocks overlapping the time range are read, found via the time index
+def read_snapshots(filename, start_ts=None, end_ts=None):
+    with open(filename + ".idx", "rb") as f:
+        index = f.read()
+    entries = [entry for entry in SNAPSHOT_INDEX_ENTRY.iter_unpack(index[:len(index) - len(index) % SNAPSHOT_INDEX_ENTRY.size])]
+    first = bisect.bisect_left([entry[1] for entry in entries], start_ts) if start_ts is not None else 0
+
+    with open(filename, "rb") as f:
+        for block_start_ts, _, offset, size in entries[first:]:
+            if end_ts is not None and block_start_ts > end_ts:
+                break
+            f.seek(offset)
+            magic, _ = SNAPSHOT_BLOCK_HEADER.unpack(f.read(SNAPSHOT_BLOCK_HEADER.size))
+            if magic != SNAPSHOT_BLOCK_MAGIC:
+                raise ValueError(f"invalid block at offset {offset} of '{filename}'")
+            bases = {}
+            for line in zlib.decompress(f.read(size)).decode("utf-8").split("\n"):
+                record = json.loads(line)
+                key = (record["m"], json.dumps(record["p"], sort_keys=True))
+                if "e" in record:
+                    snapshot = {"error": record["e"]}
+                    if "s" in record:
+                        snapshot["status"] = record["s"]
+                else:
+                    if "f" in record:
+                        bases[key] = record["f"]
+                    else:
+                        bases[key] = apply_json_diff(copy.deepcopy(bases[key]), record["d"])
+                    snapshot = {"response": bases[key]}
+                if (start_ts is None or record["t"] >= start_ts) and (end_ts is None or record["t"] <= end_ts):
+                    snapshot.update(ts=record["t"], method=record["m"], params=record["p"])
+                    yield snapshot
+
+
+# Converts responses recorded by SnapshotRecorder to steam_fake_api.py ReplayApi records (HTTP errors included,
+# other errors skipped)
+def snapshot_replay_records(filename, start_ts=None, end_ts=None):
+    import steam_fake_api
+
+    for snapshot in read_snapshots(filename, start_ts, end_ts):
+        if "response" not in snapshot and "status" not in snapshot:
+            continue
+        path, params = steam_fake_api.webapi_request(snapshot["method"], snapshot["params"])
+        yield {"ts": snapshot["ts"], "path": path, "params": params, "status": snapshot.get("status", 200), "body": snapshot.get("response", {})}
+
+
+_profile_cache = None
+
+
+# Returns the shared cache of other users' profile details or None if it is disabled
+def get_profile_cache():
+    global _profile_cache
+    if not PROFILE_CACHE_FILE:
+        return None
+    if _profile_cache is None:
+        _profile_cache = DiskCache(os.path.expanduser(PROFILE_CACHE_FILE), ttl=PROFILE_CACHE_TTL, max_entries=PROFILE_CACHE_MAX_ENTRIES)
+    return _profile_cache
+
+
+# Fetches profile details (display name, real name, avatar) for the given Steam64 IDs
+# Fresh entries are served from the profile cache, only cache misses are requested via GetPlayerSummaries
+# in parallel chunks of 100 IDs (API limit); if a chunk fails, stale cached entries are used instead
+def fetch_player_summaries(s_api, steamids, cache=None):
+    profiles = {}
+    missing = []
+    for sid in dict.fromkeys(str(s) for s in steamids):
+        cached = cache.get(sid) if cache else None
+        if cached is not None:
+            profiles[sid] = cached
+        else:
+            missing.append(sid)
+
+    if not missing:
+        return profiles
+
+    chunk_size = 100
+    chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+
+    def _fetch_chunk(chunk):
+        resp = api_call(s_api, 'ISteamUser.GetPlayerSummaries', steamids=",".join(chunk))
+        return resp.get('response', {}).get('players', [])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(API_MAX_CONCURRENCY, len(chunks)))) as executor:
+        futures = [executor.submit(_fetch_chunk, chunk) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                players = future.result()
+            except Exception as e:
+                print(f"* Cannot fetch profile details of {len(chunk)} users (cached details are used if available): {e}")
+                players = []
+            for p in players:
+                sid = str(p.get('steamid', ''))
+                if not sid:
+                    continue
+                profile = {"personaname": p.get('personaname') or "", "realname": p.get('realname') or "", "avatar": p.get('avatarfull') or p.get('avatar') or ""}
+                profiles[sid] = profile
+                if cache:
+                    cache.set(sid, profile)
+            if cache:
+                for sid in chunk:
+                    if sid not in profiles:
+                        stale = cache.get(sid, allow_stale=True)
+                        if stale is not None:
+                            profiles[sid] = stale
+
+    if cache:
+        cache.save()
+    return profiles
+
+
 # Prints country/region using raw Steam fields
 def print_country_region(player):
     country_code = player.get('loccountrycode')
@@ -1243,6 +2934,167 @@ def print_country_region(player):
         print(f"City ID (Steam):\t\t{city_id}")
 
 
+# Returns unlocked achievements of the user in the given game (raises an exception on API errors)
+# Only the minimal per-player payload is requested (API names and unlock times), display names and
+# descriptions are joined locally from the game schema cache by describe_achievements()
+def fetch_game_achievements(s_api, steamid, appid):
+    stats = api_call(s_api, "ISteamUserStats.GetPlayerAchievements", steamid=steamid, appid=appid)
+
+    playerstats = stats.get("playerstats", {}) if isinstance(stats, dict) else {}
+    ach_list = playerstats.get("achievements", []) if isinstance(playerstats, dict) else []
+
+    achievements = []
+    for ach in ach_list:
+        try:
+            if not isinstance(ach, dict):
+                continue
+            if ach.get("achieved") not in (1, True):
+                continue
+            unlock_ts = ach.get("unlocktime") or ach.get("unlock_time") or 0
+            if not unlock_ts:
+                continue
+
+            achievements.append(
+                {
+                    "apiname": ach.get("apiname") or ach.get("name") or "",
+                    "unlocktime": int(unlock_ts),
+                }
+            )
+        except Exception:
+            continue
+    return achievements
+
+
+_schema_cache = None
+
+
+# Returns the shared cache of game schemas (achievement names and descriptions) or None if it is disabled
+def get_schema_cache():
+    global _schema_cache
+    if not SCHEMA_CACHE_FILE:
+        return None
+    if _schema_cache is None:
+        _schema_cache = DiskCache(os.path.expanduser(SCHEMA_CACHE_FILE), ttl=SCHEMA_CACHE_TTL)
+    return _schema_cache
+
+
+# Returns {apiname: [display name, description]} for achievements of the game
+# The schema (GetSchemaForGame) is served from the shared cache and fetched again when it expires or when
+# it does not know some of the requested achievements (a sign of a new game/schema version)
+def get_game_achievement_schema(s_api, appid, apinames=()):
+    cache = get_schema_cache()
+    key = str(appid)
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        known = cached.get("achievements", {})
+        # Do not refetch the schema more often than once per hour because of achievements missing in it
+        if all(name in known for name in apinames) or cache.get(key, ttl=3600) is not None:
+            return known
+
+    try:
+        resp = api_call(s_api, "ISteamUserStats.GetSchemaForGame", appid=appid, l="english")
+        game = resp.get("game", {}) if isinstance(resp, dict) else {}
+        game_stats = game.get("availableGameStats", {}) or {}
+        achievements = {a["name"]: [a.get("displayName") or "", a.get("description") or ""] for a in game_stats.get("achievements", []) if a.get("name")}
+    except Exception:
+        stale = cache.get(key, allow_stale=True) if cache else None
+        return stale.get("achievements", {}) if stale else {}
+
+    if cache:
+        cache.set(key, {"achievements": achievements})
+    return achievements
+
+
+# Joins display names and descriptions from the game schema into achievements of the given game
+def describe_achievements(s_api, appid, achievements):
+    schema = get_game_achievement_schema(s_api, appid, [a.get("apiname") for a in achievements if a.get("apiname")])
+    described = []
+    for ach in achievements:
+        apiname = ach.get("apiname") or ""
+        display_name, description = schema.get(apiname, ["", ""])
+        described.append(dict(ach, name=display_name or ach.get("name") or apiname, description=description or ach.get("description") or ""))
+    return described
+
+
+_achievements_cache = None
+
+
+# Returns the cache of per-game achievement scan results or None if it is disabled
+def get_achievements_cache():
+    global _achievements_cache
+    if not ACHIEVEMENTS_CACHE_FILE:
+        return None
+    if _achievements_cache is None:
+        _achievements_cache = DiskCache(os.path.expanduser(ACHIEVEMENTS_CACHE_FILE), max_entries=ACHIEVEMENTS_CACHE_MAX_ENTRIES)
+    return _achievements_cache
+
+
+# Returns {appid: (name, playtime_2weeks, playtime_forever)} for games in the GetRecentlyPlayedGames response
+def get_recent_games_playtimes(s_played):
+    games = s_played.get("response", {}).get("games", []) if isinstance(s_played, dict) else []
+    return {g.get("appid"): (g.get("name") or f"AppID {g.get('appid')}", g.get("playtime_2weeks", 0) or 0, g.get("playtime_forever", 0) or 0) for g in games if g.get("appid")}
+
+
+# Returns {appid: playtime_forever} for games in the GetRecentlyPlayedGames or GetOwnedGames response
+def get_games_playtimes(s_games):
+    games = s_games.get("response", {}).get("games", []) if isinstance(s_games, dict) else []
+    return {g.get("appid"): g.get("playtime_forever", 0) or 0 for g in games if g.get("appid")}
+
+
+# Compares total per-game playtimes (in minutes) with the previous poll and returns [(appid, old, new)] for games
+# played in the meantime along with the updated playtimes (games missing in the current data keep their last value)
+# Games without a previous value which newly appear in recently played games (recent_playtimes, {appid: playtime_2weeks})
+# are reported too, with their last 2 weeks playtime as the time played
+# last_playtimes is not modified; it is returned as is when nothing changed, otherwise a copy is made
+def diff_games_playtimes(last_playtimes, current_playtimes, recent_playtimes=None):
+    played = []
+    updated = None
+    for appid, playtime in current_playtimes.items():
+        old_playtime = last_playtimes.get(appid)
+        if old_playtime is not None and playtime > old_playtime:
+            played.append((appid, old_playtime, playtime))
+        elif old_playtime is None and recent_playtimes and recent_playtimes.get(appid):
+            played.append((appid, max(0, playtime - recent_playtimes[appid]), playtime))
+        if old_playtime is None or playtime > old_playtime:
+            if updated is None:
+                updated = dict(last_playtimes)
+            updated[appid] = playtime
+    return played, (last_playtimes if updated is None else updated)
+
+
+# Checks achievements in games whose playtime changed and returns the ones unlocked after the per-game watermark
+# (unlock timestamp of the last reported achievement, or the monitoring start time) along with appids that failed
+def fetch_new_achievements(s_api, steamid, changed_games, watermarks, default_watermark):
+    unlocks = []
+    failed = []
+    if not changed_games:
+        return unlocks, failed
+
+    cache = get_achievements_cache()
+    with ThreadPoolExecutor(max_workers=max(1, min(API_MAX_CONCURRENCY, len(changed_games)))) as executor:
+        futures = {executor.submit(fetch_game_achievements, s_api, steamid, appid): appid for appid in changed_games}
+        for future in as_completed(futures):
+            appid = futures[future]
+            game_name, _, playtime_forever = changed_games[appid]
+            try:
+                game_achievements = future.result()
+            except Exception:
+                failed.append(appid)
+                continue
+            if cache:
+                cache.set(f"{steamid}:{appid}", {"playtime": playtime_forever, "achievements": game_achievements})
+            watermark = watermarks.get(appid, default_watermark)
+            new_achievements = sorted((a for a in game_achievements if a["unlocktime"] > watermark), key=lambda a: a["unlocktime"])
+            if new_achievements:
+                for ach in describe_achievements(s_api, appid, new_achievements):
+                    unlocks.append(dict(ach, game=game_name, appid=appid))
+                watermarks[appid] = new_achievements[-1]["unlocktime"]
+    for used_cache in (cache, get_schema_cache()):
+        if used_cache:
+            used_cache.save()
+    return sorted(unlocks, key=lambda a: a["unlocktime"]), failed
+
+
 # Fetches recent achievements for the user
 def fetch_recent_achievements(steamid, s_api, s_played, max_games=15, max_achievements=10, force_use_owned_games=False):
     achievements = []
@@ -1259,7 +3111,8 @@ def fetch_recent_achievements(steamid, s_api, s_played, max_games=15, max_achiev
         try:
             # Call GetOwnedGames with all parameters that the steam.webapi wrapper
             # considers required, to avoid local validation errors before the HTTP call.
-            owned = s_api.call(
+            owned = api_call(
+                s_api,
                 "IPlayerService.GetOwnedGames",
                 steamid=steamid,
                 include_appinfo=1,
@@ -1287,51 +3140,61 @@ def fetch_recent_achievements(steamid, s_api, s_played, max_games=15, max_achiev
     # Limit number of API calls only when we truly have a "recently played" list.
     # For owned-games fallback, consider all games so that low-playtime fresh games
     # (with new achievements) are not missed.
-    for idx, game in enumerate(games):
-        if not games_from_owned and idx >= max_games:
-            break
+    if not games_from_owned:
+        games = games[:max_games]
+
+    cache = get_achievements_cache()
+    to_fetch = []
+    for game in games:
         appid = game.get("appid")
-        game_name = game.get("name") or f"AppID {appid}"
         if not appid:
             continue
+        game_name = game.get("name") or f"AppID {appid}"
+        playtime = game.get("playtime_forever")
 
-        try:
-            stats = s_api.call(
-                "ISteamUserStats.GetPlayerAchievements",
-                steamid=steamid,
-                appid=appid,
-            )
-        except Exception:
-            # Game may not have achievements or the API might not support it
-            continue
-
-        playerstats = stats.get("playerstats", {}) if isinstance(stats, dict) else {}
-        ach_list = playerstats.get("achievements", []) if isinstance(playerstats, dict) else []
-
-        for ach in ach_list:
-            try:
-                if not isinstance(ach, dict):
-                    continue
-                if ach.get("achieved") not in (1, True):
-                    continue
-                unlock_ts = ach.get("unlocktime") or ach.get("unlock_time") or 0
-                if not unlock_ts:
-                    continue
-
-                achievements.append(
-                    {
-                        "game": game_name,
-                        "name": ach.get("name") or ach.get("apiname") or "",
-                        "description": ach.get("description") or "",
-                        "unlocktime": int(unlock_ts),
-                    }
-                )
-            except Exception:
-                continue
+        # Unlocks require playing the game, so results cached for unchanged playtime are still valid
+        cached = cache.get(f"{steamid}:{appid}") if cache else None
+        if cached is not None and playtime is not None and cached.get("playtime") == playtime:
+            achievements.extend(dict(ach, game=game_name, appid=appid) for ach in cached.get("achievements", []))
+        else:
+            to_fetch.append((appid, game_name, playtime))
 
-    # Sort by unlock time (most recent first) and limit to requested number
-    achievements.sort(key=lambda a: a.get("unlocktime", 0), reverse=True)
-    return achievements[:max_achievements]
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max(1, min(API_MAX_CONCURRENCY, len(to_fetch)))) as executor:
+            futures = {executor.submit(fetch_game_achievements, s_api, steamid, appid): (appid, game_name, playtime) for appid, game_name, playtime in to_fetch}
+            for future in as_completed(futures):
+                appid, game_name, playtime = futures[future]
+                try:
+                    game_achievements = future.result()
+                except Exception as e:
+                    # Game may not have achievements (HTTP 400) or the API might not support it
+                    response = getattr(e, "response", None)
+                    if response is None or response.status_code != 400:
+                        continue
+                    game_achievements = []
+                if cache and playtime is not None:
+                    cache.set(f"{steamid}:{appid}", {"playtime": playtime, "achievements": game_achievements})
+                achievements.extend(dict(ach, game=game_name, appid=appid) for ach in game_achievements)
+
+        if cache:
+            cache.save()
+
+    # Select the most recent achievements (by unlock time) up to the requested number
+    recent = heapq.nlargest(max_achievements, achievements, key=lambda a: a.get("unlocktime", 0))
+
+    # Join display names and descriptions from the game schemas, only for the selected achievements
+    by_appid = OrderedDict()
+    for ach in recent:
+        by_appid.setdefault(ach["appid"], []).append(ach)
+    described = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(API_MAX_CONCURRENCY, len(by_appid)))) as executor:
+        for appid, game_achievements in zip(by_appid, executor.map(lambda item: describe_achievements(s_api, item[0], item[1]), by_appid.items())):
+            for ach in game_achievements:
+                described[(appid, ach.get("apiname"), ach.get("unlocktime"))] = ach
+    schema_cache = get_schema_cache()
+    if schema_cache:
+        schema_cache.save()
+    return [described.get((a["appid"], a.get("apiname"), a.get("unlocktime")), a) for a in recent]
 
 
 # Fetches and displays recent achievements for a Steam user
@@ -1366,7 +3229,7 @@ def display_recent_achievements(steamid, s_api, s_played, max_games=15, max_achi
 
 # Fetches the persona (display) name history from Steam's public ajaxaliases endpoint
 def fetch_persona_name_history(steamid, timeout=15):
-    url = f"https://steamcommunity.com/profiles/{steamid}/ajaxaliases"
+    url = f"{STEAM_COMMUNITY_URL.rstrip('/')}/profiles/{steamid}/ajaxaliases"
     headers = {"User-Agent": "Mozilla/5.0 (compatible; steam_monitor)"}
     try:
         resp = req.get(url, headers=headers, timeout=timeout)
@@ -1389,10 +3252,11 @@ def fetch_persona_name_history(steamid, timeout=15):
     return history
 
 
-# Fetches and displays the persona name history for a Steam user
-def display_persona_name_history(steamid):
+# Fetches (unless already fetched) and displays the persona name history for a Steam user
+def display_persona_name_history(steamid, history=None):
     print(f"\n* Fetching persona name history...")
-    history = fetch_persona_name_history(steamid)
+    if history is None:
+        history = fetch_persona_name_history(steamid)
 
     if not history:
         print("* No persona name history found or access is restricted by the user's privacy settings.")
@@ -1414,9 +3278,23 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
     print(f"* Fetching details for Steam user with ID '{steamid_coloured}'...\n")
 
     try:
-        s_api = steam.webapi.WebAPI(key=STEAM_API_KEY)
-        s_user = s_api.call('ISteamUser.GetPlayerSummaries', steamids=str(steamid))
-        s_played = s_api.call('IPlayerService.GetRecentlyPlayedGames', steamid=steamid, count=5)
+        s_api = create_webapi()
+    except Exception as e:
+        print(f"* Error: {e}")
+        sys.exit(1)
+
+    # Fetches the friends list together with profile details of friends (if they are to be listed)
+    def fetch_friends():
+        friends = api_call(s_api, 'ISteamUser.GetFriendList', steamid=steamid, relationship='friend')
+        profiles = {}
+        if list_friends:
+            friend_ids = [f.get('steamid') for f in friends.get('friendslist', {}).get('friends', []) if f.get('steamid')]
+            if friend_ids:
+                profiles = fetch_player_summaries(s_api, friend_ids, get_profile_cache())
+        return friends, profiles
+
+    try:
+        s_user = api_call(s_api, 'ISteamUser.GetPlayerSummaries', steamids=str(steamid))
     except Exception as e:
         print(f"* Error: {e}")
         sys.exit(1)
@@ -1427,6 +3305,27 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
         print(f"* Error: User with Steam64 ID {steamid} does not exist!")
         sys.exit(1)
 
+    # Once the user is known to exist, the remaining independent requests are issued concurrently
+    # and their results are printed in the usual order
+    executor = ThreadPoolExecutor(max_workers=max(1, API_MAX_CONCURRENCY))
+    results = {
+        "played": executor.submit(api_call, s_api, 'IPlayerService.GetRecentlyPlayedGames', steamid=steamid, count=5),
+        "level": executor.submit(api_call, s_api, 'IPlayerService.GetSteamLevel', steamid=steamid),
+        "badges": executor.submit(api_call, s_api, 'IPlayerService.GetBadges', steamid=steamid),
+        "bans": executor.submit(api_call, s_api, 'ISteamUser.GetPlayerBans', steamids=str(steamid)),
+        "friends": executor.submit(fetch_friends),
+        "owned": executor.submit(api_call, s_api, 'IPlayerService.GetOwnedGames', steamid=steamid, include_appinfo=1, include_played_free_games=1),
+    }
+    if show_name_history:
+        results["name_history"] = executor.submit(fetch_persona_name_history, steamid)
+    executor.shutdown(wait=False)
+
+    try:
+        s_played = results["played"].result()
+    except Exception as e:
+        print(f"* Error: {e}")
+        sys.exit(1)
+
     status = int(s_user["response"]["players"][0].get("personastate"))
     visibilitystate = int(s_user["response"]["players"][0].get("communityvisibilitystate"))
     realname = s_user["response"]["players"][0].get("realname", "")
@@ -1436,7 +3335,7 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
     gameid = s_user["response"]["players"][0].get("gameid")
     gamename = s_user["response"]["players"][0].get("gameextrainfo", "")
 
-    status_ts_old = int(time.time())
+    status_ts_old = int(clock.time())
     status_ts_old_bck = status_ts_old
     last_status_ts = 0
     last_status = -1
@@ -1482,14 +3381,14 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
 
     s_level_displayed = False
     try:
-        s_level = s_api.call('IPlayerService.GetSteamLevel', steamid=steamid)
+        s_level = results["level"].result()
         print(f"\nSteam level:\t\t\t{s_level['response'].get('player_level', 'n/a')}")
         s_level_displayed = True
     except Exception:
         pass
 
     try:
-        badges = s_api.call('IPlayerService.GetBadges', steamid=steamid)
+        badges = results["badges"].result()
         player_xp = badges['response'].get('player_xp', 0)
         xp_to_level = badges['response'].get('player_xp_needed_to_level_up', 0)
         xp_current_level = badges['response'].get('player_xp_needed_current_level', 0)
@@ -1505,7 +3404,7 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
         pass
 
     try:
-        bans = s_api.call('ISteamUser.GetPlayerBans', steamids=str(steamid))
+        bans = results["bans"].result()
         if bans['players']:
             b = bans['players'][0]
             print(f"\nVAC banned:\t\t\t{b.get('VACBanned')} ({b.get('NumberOfVACBans', 0)})")
@@ -1518,10 +3417,10 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
         pass
 
     if show_name_history:
-        display_persona_name_history(steamid)
+        display_persona_name_history(steamid, results["name_history"].result())
 
     try:
-        friends = s_api.call('ISteamUser.GetFriendList', steamid=steamid, relationship='friend')
+        friends, profiles = results["friends"].result()
         friend_entries = friends.get('friendslist', {}).get('friends', [])
         n_friends = len(friend_entries)
         print(f"\nFriends:\t\t\t{n_friends}")
@@ -1532,30 +3431,22 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
             friend_since_map = {f.get('steamid'): f.get('friend_since') for f in friend_entries if f.get('steamid')}
             print("\nFriends list:")
 
-            # Steam Web API allows up to 100 steamids per GetPlayerSummaries call, so chunk the requests
-            chunk_size = 100
-            for i in range(0, len(friend_ids), chunk_size):
-                chunk = friend_ids[i:i + chunk_size]
-                try:
-                    summaries = s_api.call(
-                        'ISteamUser.GetPlayerSummaries',
-                        steamids=",".join(chunk),
-                    )
-                except Exception as e:
-                    print(f"* Warning: Cannot fetch friend details: {e}")
-                    break
+            for sid in friend_ids:
+                p = profiles.get(sid)
+                if p is None:
+                    continue
+                persona = p.get("personaname", "")
+                real_name = p.get("realname") or ""
+                since_ts = friend_since_map.get(sid)
+                since_str = f" - friend since {get_date_from_ts(int(since_ts))}" if since_ts else ""
+                if real_name:
+                    print(f"- {persona} ({real_name}) [{sid}]{since_str}")
+                else:
+                    print(f"- {persona} [{sid}]{since_str}")
 
-                players = summaries.get("response", {}).get("players", [])
-                for p in players:
-                    persona = p.get("personaname", "")
-                    real_name = p.get("realname") or ""
-                    sid = p.get("steamid", "")
-                    since_ts = friend_since_map.get(sid)
-                    since_str = f" - friend since {get_date_from_ts(int(since_ts))}" if since_ts else ""
-                    if real_name:
-                        print(f"- {persona} ({real_name}) [{sid}]{since_str}")
-                    else:
-                        print(f"- {persona} [{sid}]{since_str}")
+            unresolved = len([sid for sid in friend_ids if sid not in profiles])
+            if unresolved:
+                print(f"* Warning: Cannot fetch details for {unresolved} friend(s)")
     except Exception:
         pass
 
@@ -1563,10 +3454,10 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
         last_status_dt_str = datetime.fromtimestamp(status_ts_old).strftime("%d %b %Y, %H:%M:%S")
         last_status_ts_weekday = str(calendar.day_abbr[(datetime.fromtimestamp(status_ts_old)).weekday()])
         print(f"\n* Last time user was available:\t{last_status_ts_weekday} {last_status_dt_str}")
-        print(f"* User is OFFLINE for:\t\t{calculate_timespan(int(time.time()), int(status_ts_old), show_seconds=False)}")
+        print(f"* User is OFFLINE for:\t\t{calculate_timespan(int(clock.time()), int(status_ts_old), show_seconds=False)}")
 
     try:
-        owned = s_api.call('IPlayerService.GetOwnedGames', steamid=steamid, include_appinfo=1, include_played_free_games=1)
+        owned = results["owned"].result()
         games = owned.get('response', {}).get('games', [])
         if games:
             top = sorted(games, key=lambda g: g.get('playtime_forever', 0), reverse=True)[:5]
@@ -1598,279 +3489,1302 @@ def display_user_info(steamid, list_friends=False, show_name_history=False, show
         display_recent_achievements(steamid, s_api, s_played, max_games=15, max_achievements=max_ach, force_use_owned_games=achievements_use_owned_games)
 
 
-# Main function that monitors gaming activity of the specified Steam user
-def steam_monitor_user(steamid, csv_file_name, profile_csv_file_name=None):
+batch_info_fieldnames = ['SteamID', 'Input', 'Name', 'RealName', 'Status', 'Visibility', 'Country', 'ProfileURL', 'Created', 'LastLogoff', 'GameID', 'Game', 'VACBanned', 'VACBans', 'CommunityBanned', 'EconomyBan', 'DaysSinceLastBan', 'Level', 'Friends', 'GamesOwned', 'Playtime2Weeks', 'Error']
 
-    alive_counter = 0
-    status_ts = 0
-    status_ts_old = 0
-    status_online_start_ts = 0
-    status_online_start_ts_old = 0
-    game_ts = 0
-    game_ts_old = 0
-    status = 0
-    game_total_ts = 0
-    games_number = 0
-    game_total_after_offline_counted = False
-    estimated_last_activity_ts = 0  # Estimated timestamp when user was last active (used for away/snooze calculations)
-    last_steam_level = None
-    last_player_xp = None
-    last_friend_ids = None
-    last_games_count = None
-    last_games_appids = None
 
-    try:
-        if csv_file_name:
-            init_csv_file(csv_file_name)
-    except Exception as e:
-        print(f"* Error: {e}")
+# Reads Steam64 IDs and Steam community URLs (one per line, # starts a comment) for the batch info mode
+def read_batch_info_file(filename):
+    entries = []
+    with open(filename, 'r', encoding="utf-8") as f:
+        for line in f:
+            entry = line.split("#", 1)[0].strip()
+            if entry:
+                entries.append(entry)
+    return entries
 
-    try:
-        if profile_csv_file_name:
-            init_profile_csv_file(profile_csv_file_name)
-    except Exception as e:
-        print(f"* Error: {e}")
 
+# Fetches per-user details which cannot be batched (level, friends, owned and recently played games)
+# Each of them is optional as it depends on the user's privacy settings
+def fetch_batch_user_details(s_api, steamid):
+    details = {'Level': None, 'Friends': None, 'GamesOwned': None, 'Playtime2Weeks': None}
     try:
-        s_api = steam.webapi.WebAPI(key=STEAM_API_KEY)
-        s_user = s_api.call('ISteamUser.GetPlayerSummaries', steamids=str(steamid))
-        s_played = s_api.call('IPlayerService.GetRecentlyPlayedGames', steamid=steamid, count=5)
-    except Exception as e:
-        print(f"* Error: {e}")
-        sys.exit(1)
-
+        details['Level'] = api_call(s_api, 'IPlayerService.GetSteamLevel', steamid=steamid)['response'].get('player_level')
+    except Exception:
+        pass
     try:
-        username = s_user["response"]["players"][0].get("personaname")
+        details['Friends'] = len(fetch_friend_ids(s_api, steamid))
     except Exception:
-        print(f"* Error: User with Steam64 ID {steamid} does not exist!")
-        sys.exit(1)
+        pass
+    try:
+        details['GamesOwned'] = api_call(s_api, 'IPlayerService.GetOwnedGames', steamid=steamid, include_played_free_games=1)['response'].get('game_count')
+    except Exception:
+        pass
+    try:
+        s_played = api_call(s_api, 'IPlayerService.GetRecentlyPlayedGames', steamid=steamid, count=0)
+        if 'total_count' in s_played['response']:
+            details['Playtime2Weeks'] = sum(g.get('playtime_2weeks', 0) or 0 for g in s_played['response'].get('games', []))
+    except Exception:
+        pass
+    return details
+
+
+# Yields batch info records for the given entries, in the order they complete
+# Entries are processed in chunks of 100 users: GetPlayerSummaries and GetPlayerBans are requested once per chunk,
+# per-user endpoints are fanned out to the executor (all requests are subject to the API rate limit)
+def batch_user_info(s_api, entries, executor, chunk_size=100):
+    for i in range(0, len(entries), chunk_size):
+        chunk = entries[i:i + chunk_size]
+
+        resolved = {entry: int(entry) for entry in chunk if entry.isdigit()}
+        urls = [entry for entry in chunk if not entry.isdigit()]
+        if urls:
+            resolved_urls, errors = resolve_steam_community_urls(urls, STEAM_API_KEY, executor)
+            resolved.update(resolved_urls)
+            for entry, error in errors.items():
+                yield {'Input': entry, 'Error': error}
+
+        steamids = list(dict.fromkeys(resolved.values()))
+        if not steamids:
+            continue
+        steamids_str = ",".join(str(sid) for sid in steamids)
+        summaries_future = executor.submit(api_call, s_api, 'ISteamUser.GetPlayerSummaries', steamids=steamids_str)
+        bans_future = executor.submit(api_call, s_api, 'ISteamUser.GetPlayerBans', steamids=steamids_str)
+        try:
+            players = {p.get('steamid'): p for p in summaries_future.result()['response'].get('players', [])}
+        except Exception as e:
+            for entry, sid in resolved.items():
+                yield {'SteamID': sid, 'Input': entry, 'Error': f"GetPlayerSummaries failed: {e}"}
+            continue
+        try:
+            bans = {b.get('SteamId'): b for b in bans_future.result().get('players', [])}
+        except Exception:
+            bans = {}
+
+        records = {}
+        details_futures = {}
+        for entry, sid in resolved.items():
+            player = players.get(str(sid))
+            if not player:
+                yield {'SteamID': sid, 'Input': entry, 'Error': "User does not exist"}
+                continue
+            ban = bans.get(str(sid), {})
+            status = int(player.get('personastate', 0))
+            visibility = int(player.get('communityvisibilitystate', 1))
+            records[entry] = {
+                'SteamID': sid,
+                'Input': entry,
+                'Name': player.get('personaname'),
+                'RealName': player.get('realname'),
+                'Status': steam_personastates[status] if 0 <= status < len(steam_personastates) else status,
+                'Visibility': steam_visibilitystates[visibility] if 0 <= visibility < len(steam_visibilitystates) else visibility,
+                'Country': player.get('loccountrycode'),
+                'ProfileURL': player.get('profileurl'),
+                'Created': player.get('timecreated'),
+                'LastLogoff': player.get('lastlogoff'),
+                'GameID': player.get('gameid'),
+                'Game': player.get('gameextrainfo'),
+                'VACBanned': ban.get('VACBanned'),
+                'VACBans': ban.get('NumberOfVACBans'),
+                'CommunityBanned': ban.get('CommunityBanned'),
+                'EconomyBan': ban.get('EconomyBan'),
+                'DaysSinceLastBan': ban.get('DaysSinceLastBan'),
+            }
+            details_futures[executor.submit(fetch_batch_user_details, s_api, sid)] = entry
+
+        for future in as_completed(details_futures):
+            record = records[details_futures[future]]
+            record.update(future.result())
+            yield record
+
+
+# Runs the batch info mode - writes details of all users from the input file as JSON lines or CSV
+# Records are written (and flushed) as soon as they are available
+def run_batch_info(input_file, output_file, output_format):
+    entries = read_batch_info_file(input_file)
+    print(f"* Fetching details for {len(entries)} Steam user(s) from '{input_file}' to '{output_file}' ({output_format}) ...")
+
+    s_api = create_webapi()
+
+    written = 0
+    failed = 0
+    with open(output_file, 'w', newline='', buffering=1, encoding="utf-8") as f:
+        csvwriter = None
+        if output_format == "csv":
+            csvwriter = csv.DictWriter(f, fieldnames=batch_info_fieldnames, quoting=csv.QUOTE_NONNUMERIC)
+            csvwriter.writeheader()
+        with ThreadPoolExecutor(max_workers=max(1, API_MAX_CONCURRENCY)) as executor:
+            for record in batch_user_info(s_api, entries, executor):
+                if csvwriter:
+                    csvwriter.writerow({field: record.get(field) for field in batch_info_fieldnames})
+                else:
+                    f.write(json.dumps({field: record.get(field) for field in batch_info_fieldnames}, ensure_ascii=False) + "\n")
+                written += 1
+                if record.get('Error'):
+                    failed += 1
+
+    print(f"* Batch info finished: {written} record(s) written, {failed} failed")
+    print(f"* API concurrency limit: {format_concurrency_stats()}")
+
+
+# Returns Steam64 IDs of the user's friends (raises an exception if the friends list is not accessible)
+def fetch_friend_ids(s_api, steamid):
+    friends = api_call(s_api, 'ISteamUser.GetFriendList', steamid=steamid, relationship='friend')
+    friend_entries = friends.get('friendslist', {}).get('friends', []) if isinstance(friends, dict) else []
+    return [int(f.get('steamid')) for f in friend_entries if f.get('steamid')]
+
+
+# Crawls the friends graph around the user (BFS over friends lists up to the given depth)
+# Friends lists are fetched concurrently and the result is saved in graph_dir as a CSR adjacency index:
+#   nodes.bin   - sorted uint64 Steam64 IDs (node index = position in this array)
+#   offsets.bin - uint64 offsets into edges.bin, node i neighbours are edges[offsets[i]:offsets[i + 1]]
+#   edges.bin   - uint32 sorted neighbour node indexes
+#   expanded.bin - sorted uint64 Steam64 IDs of users whose friends lists were fetched; other users (beyond the crawl
+#                 depth or with private friends lists) only have the friendships seen from the expanded users
+#   profiles.json and meta.json - display names of the users and crawl details
+def crawl_friends_graph(steamid, depth, graph_dir):
+    steamid = int(steamid)
+    s_api = create_webapi()
+
+    visited = {steamid}
+    adjacency = {}
+    expanded = []
+    private_count = 0
+    truncated = False
+    frontier = [steamid]
+
+    for level in range(1, depth + 1):
+        if not frontier:
+            break
+        print(f"* Level {level}: fetching friends lists of {len(frontier)} user(s) ...")
+        next_frontier = []
+        with ThreadPoolExecutor(max_workers=max(1, API_MAX_CONCURRENCY)) as executor:
+            futures = {executor.submit(fetch_friend_ids, s_api, sid): sid for sid in frontier}
+            for future in as_completed(futures):
+                sid = futures[future]
+                try:
+                    friend_ids = future.result()
+                    expanded.append(sid)
+                except Exception:
+                    # Friends list is private or not accessible
+                    private_count += 1
+                    friend_ids = []
+                adjacency[sid] = friend_ids
+                for friend_id in friend_ids:
+                    if friend_id in visited:
+                        continue
+                    if CRAWL_MAX_NODES and len(visited) >= CRAWL_MAX_NODES:
+                        truncated = True
+                        continue
+                    visited.add(friend_id)
+                    next_frontier.append(friend_id)
+        frontier = next_frontier
+
+    nodes = array('Q', sorted(visited))
+    node_index = {sid: i for i, sid in enumerate(nodes)}
+    neighbours = [set() for _ in range(len(nodes))]
+    for sid, friend_ids in adjacency.items():
+        i = node_index[sid]
+        for friend_id in friend_ids:
+            j = node_index.get(friend_id)
+            if j is not None and j != i:
+                neighbours[i].add(j)
+                neighbours[j].add(i)
+
+    offsets = array('Q', [0])
+    edges = array('I')
+    for node_neighbours in neighbours:
+        edges.extend(sorted(node_neighbours))
+        offsets.append(len(edges))
+
+    # The profile cache is not used, so crawled users do not evict profiles of the monitored user's friends
+    print(f"* Resolving profile details of {len(nodes)} user(s) ...")
+    profiles = fetch_player_summaries(s_api, nodes)
+
+    os.makedirs(graph_dir, exist_ok=True)
+    save_array(os.path.join(graph_dir, "nodes.bin"), nodes)
+    save_array(os.path.join(graph_dir, "offsets.bin"), offsets)
+    save_array(os.path.join(graph_dir, "edges.bin"), edges)
+    save_array(os.path.join(graph_dir, "expanded.bin"), array('Q', sorted(expanded)))
+    save_file_atomically(os.path.join(graph_dir, "profiles.json"), json.dumps({sid: p.get("personaname", "") for sid, p in profiles.items()}))
+    meta = {"root": steamid, "depth": depth, "created": int(clock.time()), "nodes": len(nodes), "edges": len(edges) // 2, "expanded": len(adjacency), "private": private_count, "truncated": truncated}
+    save_file_atomically(os.path.join(graph_dir, "meta.json"), json.dumps(meta, indent=2))
+    return meta
+
+
+# Loads the friends graph index saved by crawl_friends_graph() (binary arrays are memory-mapped)
+def load_friends_graph(graph_dir):
+    with open(os.path.join(graph_dir, "meta.json"), 'r', encoding="utf-8") as f:
+        meta = json.load(f)
+    try:
+        with open(os.path.join(graph_dir, "profiles.json"), 'r', encoding="utf-8") as f:
+            profiles = json.load(f)
+    except Exception:
+        profiles = {}
+    return {
+        "meta": meta,
+        "profiles": profiles,
+        "nodes": map_array(os.path.join(graph_dir, "nodes.bin"), 'Q'),
+        "offsets": map_array(os.path.join(graph_dir, "offsets.bin"), 'Q'),
+        "edges": map_array(os.path.join(graph_dir, "edges.bin"), 'I'),
+        # Graphs saved by older versions have no list of expanded users
+        "expanded": map_array(os.path.join(graph_dir, "expanded.bin"), 'Q') if os.path.isfile(os.path.join(graph_dir, "expanded.bin")) else None,
+    }
+
+
+# Unmaps the memory-mapped arrays of the friends graph
+def close_friends_graph(graph):
+    for key in ("nodes", "offsets", "edges", "expanded"):
+        unmap_array(graph.get(key))
+        graph[key] = None
+
+
+# Returns True if the friends list of the user was fetched during the crawl, so all their friendships are known
+def graph_is_expanded(graph, steamid):
+    expanded = graph.get("expanded")
+    if expanded is None:
+        return graph_node_index(graph, steamid) is not None
+    i = bisect.bisect_left(expanded, int(steamid))
+    return i < len(expanded) and expanded[i] == int(steamid)
+
+
+# Returns the node index of the Steam64 ID in the friends graph (binary search) or None
+def graph_node_index(graph, steamid):
+    nodes = graph["nodes"]
+    i = bisect.bisect_left(nodes, int(steamid))
+    if i < len(nodes) and nodes[i] == int(steamid):
+        return i
+    return None
 
-    status = int(s_user["response"]["players"][0].get("personastate"))
-    visibilitystate = int(s_user["response"]["players"][0].get("communityvisibilitystate"))
 
-    realname = s_user["response"]["players"][0].get("realname", "")
-    profile_url = s_user["response"]["players"][0].get("profileurl")
-    timecreated = s_user["response"]["players"][0].get("timecreated")
-    lastlogoff = s_user["response"]["players"][0].get("lastlogoff")
-    gameid = s_user["response"]["players"][0].get("gameid")
-    gamename = s_user["response"]["players"][0].get("gameextrainfo", "")
+# Returns sorted neighbour node indexes of the node
+def graph_neighbours(graph, i):
+    return graph["edges"][graph["offsets"][i]:graph["offsets"][i + 1]]
 
-    status_ts_old = int(time.time())
-    status_ts_old_bck = status_ts_old
 
-    if status > 0:
-        status_online_start_ts = status_ts_old
-        status_online_start_ts_old = status_online_start_ts
+# Returns Steam64 IDs of mutual friends of two users in the friends graph (merge of two sorted lists)
+def graph_mutual_friends(graph, steamid1, steamid2):
+    i = graph_node_index(graph, steamid1)
+    j = graph_node_index(graph, steamid2)
+    if i is None or j is None:
+        return []
+    a = graph_neighbours(graph, i)
+    b = graph_neighbours(graph, j)
+    mutual = []
+    x = y = 0
+    while x < len(a) and y < len(b):
+        if a[x] == b[y]:
+            mutual.append(graph["nodes"][a[x]])
+            x += 1
+            y += 1
+        elif a[x] < b[y]:
+            x += 1
+        else:
+            y += 1
+    return mutual
+
+
+# Returns the shortest path of Steam64 IDs between two users in the friends graph (BFS) or None
+def graph_shortest_path(graph, steamid1, steamid2):
+    source = graph_node_index(graph, steamid1)
+    target = graph_node_index(graph, steamid2)
+    if source is None or target is None:
+        return None
+    parents = {source: None}
+    frontier = [source]
+    while frontier and target not in parents:
+        next_frontier = []
+        for i in frontier:
+            for j in graph_neighbours(graph, i):
+                if j not in parents:
+                    parents[j] = i
+                    next_frontier.append(j)
+        frontier = next_frontier
+    if target not in parents:
+        return None
+    path = []
+    i = target
+    while i is not None:
+        path.append(graph["nodes"][i])
+        i = parents[i]
+    return path[::-1]
+
+
+# Formats a Steam64 ID from the friends graph with the user's display name (if known)
+def format_graph_user(graph, steamid):
+    persona = graph["profiles"].get(str(steamid))
+    return f"{persona} [{steamid}]" if persona else f"[{steamid}]"
+
+
+app_index_magic = b"SMAPPIX1"
+
+
+# Saves the app index used to resolve AppIDs to game names:
+#   header      - magic, number of apps and size of the string table (uint32)
+#   AppIDs      - sorted uint32 AppIDs
+#   offsets     - uint32 offsets of names in the string table (number of apps + 1), name i is table[offsets[i]:offsets[i + 1]]
+#   string table - UTF-8 encoded names
+# All numbers are stored in little-endian byte order
+def save_app_index(filename, apps):
+    names = {}
+    for appid, name in apps:
+        appid = int(appid)
+        if name or appid not in names:
+            names[appid] = name or ""
+
+    appids = array('I', sorted(names))
+    offsets = array('I', [0])
+    table = bytearray()
+    for appid in appids:
+        table += names[appid].encode("utf-8")
+        offsets.append(len(table))
+
+    if sys.byteorder != "little":
+        appids.byteswap()
+        offsets.byteswap()
+    save_file_atomically(filename, app_index_magic + struct.pack("<II", len(appids), len(table)) + appids.tobytes() + offsets.tobytes() + bytes(table))
+    return len(appids)
+
+
+# Read-only app index saved by save_app_index(); the file is memory-mapped and names are looked up by binary search,
+# so the catalogue is not loaded into Python objects
+class AppIndex(object):
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = len(app_index_magic) + 8
+        if len(self.mm) < header_size or self.mm[:len(app_index_magic)] != app_index_magic:
+            raise ValueError(f"'{filename}' is not an app index file")
+        count, table_size = struct.unpack_from("<II", self.mm, len(app_index_magic))
+        offsets_start = header_size + 4 * count
+        table_start = offsets_start + 4 * (count + 1)
+        if len(self.mm) != table_start + table_size:
+            raise ValueError(f"invalid size of '{filename}' file ({len(self.mm)} bytes)")
+
+        view = memoryview(self.mm)
+        self.appids = view[header_size:offsets_start].cast('I')
+        self.offsets = view[offsets_start:table_start].cast('I')
+        if sys.byteorder != "little":
+            self.appids = array('I', self.appids)
+            self.appids.byteswap()
+            self.offsets = array('I', self.offsets)
+            self.offsets.byteswap()
+        self.table = view[table_start:]
+
+    def __len__(self):
+        return len(self.appids)
+
+    # Returns the game name for the AppID or default if it is not in the index
+    def get(self, appid, default=None):
+        appid = int(appid)
+        i = bisect.bisect_left(self.appids, appid)
+        if i < len(self.appids) and self.appids[i] == appid:
+            return bytes(self.table[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8", "replace") or default
+        return default
+
+
+_app_index = None
+_app_index_stamp = None
+
+
+# Returns the app index or None if it is disabled or has not been built yet
+# The index is loaded again when its file changes (e.g. refreshed with --update-app-index by another process),
+# so a failed load is also retried once the file is rebuilt
+def get_app_index():
+    global _app_index, _app_index_stamp
+    app_index_file = os.path.expanduser(APP_INDEX_FILE) if APP_INDEX_FILE else ""
+    if not app_index_file:
+        return None
+    try:
+        stat = os.stat(app_index_file)
+        stamp = (app_index_file, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None
+    if stamp != _app_index_stamp:
+        _app_index_stamp = stamp
+        _app_index = None
+        if stamp is not None:
+            try:
+                _app_index = AppIndex(app_index_file)
+            except Exception as e:
+                print(f"* Cannot load app index from '{app_index_file}' file: {e}")
+    return _app_index
 
-    steam_last_status_file = f"steam_{username}_last_status.json"
-    steam_games_file = f"steam_{username}_games.json"
-    last_status_read = []
-    last_status_ts = 0
-    last_status = -1
 
-    if os.path.isfile(steam_last_status_file):
-        try:
-            with open(steam_last_status_file, 'r', encoding="utf-8") as f:
-                last_status_read = json.load(f)
-        except Exception as e:
-            print(f"* Cannot load last status from '{steam_last_status_file}' file: {e}")
-        if last_status_read:
-            last_status_ts = last_status_read[0]
-            last_status = last_status_read[1]
-            # Backward compatibility: check if estimated_last_activity_ts exists (new format has 3 elements)
-            if len(last_status_read) >= 3 and last_status_read[2] is not None:
-                estimated_last_activity_ts = last_status_read[2]
-            steam_last_status_file_mdate_dt = datetime.fromtimestamp(int(os.path.getmtime(steam_last_status_file)))
-            steam_last_status_file_mdate = steam_last_status_file_mdate_dt.strftime("%d %b %Y, %H:%M:%S")
-            steam_last_status_file_mdate_weekday = str(calendar.day_abbr[(steam_last_status_file_mdate_dt).weekday()])
-
-            print(f"* Last status loaded from file '{steam_last_status_file}' ({steam_last_status_file_mdate_weekday} {steam_last_status_file_mdate})")
-
-            if last_status_ts > 0:
-                last_status_dt_str = datetime.fromtimestamp(last_status_ts).strftime("%d %b %Y, %H:%M:%S")
-                last_status_str = str(steam_personastates[last_status]).upper()
-                last_status_ts_weekday = str(calendar.day_abbr[(datetime.fromtimestamp(last_status_ts)).weekday()])
-                print(f"* Last status read from file: {last_status_str} ({last_status_ts_weekday} {last_status_dt_str})")
-
-                if lastlogoff and status == 0 and lastlogoff > last_status_ts:
-                    status_ts_old = lastlogoff
-                elif status == 0:
-                    status_ts_old = last_status_ts
-                if status > 0 and status == last_status:
-                    status_online_start_ts = last_status_ts
-                    status_online_start_ts_old = status_online_start_ts
-                    status_ts_old = last_status_ts
-
-    if GAMES_LIBRARY_CHECK and os.path.isfile(steam_games_file):
+# Returns the game name for the AppID from the app index or None
+def get_app_name(appid):
+    app_index = get_app_index()
+    return app_index.get(appid) if app_index else None
+
+
+# Returns comma separated AppIDs with game names (if known), eg. Dota 2 (570), 12345
+def format_appids(appids):
+    formatted = []
+    for appid in appids:
+        name = get_app_name(appid)
+        formatted.append(f"{name} ({appid})" if name else str(appid))
+    return ", ".join(formatted)
+
+
+# Yields (AppID, name) of all Steam apps listed by IStoreService/GetAppList (paginated)
+def fetch_app_list(s_api):
+    last_appid = 0
+    while True:
+        resp = api_call(s_api, 'IStoreService.GetAppList', include_games=True, include_dlc=True, include_software=True, max_results=50000, last_appid=last_appid)
+        response = resp.get("response", {}) if isinstance(resp, dict) else {}
+        for app in response.get("apps", []):
+            yield app.get("appid"), app.get("name")
+        if not response.get("have_more_results") or not response.get("last_appid"):
+            break
+        last_appid = response["last_appid"]
+
+
+# Yields (AppID, name) of apps from a JSON app list dump (ISteamApps/GetAppList or IStoreService/GetAppList format)
+def read_app_list_dump(filename):
+    with open(filename, 'r', encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = (data.get("applist") or data.get("response") or {}).get("apps", [])
+    for app in data:
+        if isinstance(app, dict) and app.get("appid") is not None:
+            yield app.get("appid"), app.get("name")
+
+
+# Builds the app index from the app list dump (if provided) or from the Steam Web API
+def update_app_index(dump_file=None):
+    if not APP_INDEX_FILE:
+        raise ValueError("APP_INDEX_FILE is empty (the app index is disabled)")
+    app_index_file = os.path.expanduser(APP_INDEX_FILE)
+    if dump_file:
+        print(f"* Building app index from '{dump_file}' file ...")
+        apps = read_app_list_dump(dump_file)
+    else:
+        print("* Downloading list of Steam apps ...")
+        apps = fetch_app_list(create_webapi())
+    count = save_app_index(app_index_file, apps)
+    print(f"* App index with {count} apps saved to '{app_index_file}'")
+
+
+# Saves the friends list baseline as a sorted array of Steam64 IDs
+def save_friends_baseline(steam_friends_file, friend_ids):
+    try:
+        save_u64_array(steam_friends_file, friend_ids)
+    except Exception as e:
+        print(f"* Cannot save friends list to '{steam_friends_file}' file: {e}")
+
+
+# Reports friends list changes to the console, profile CSV and via email notification
+def report_friends_list_change(username, s_api, old_ids, new_ids, added_ids, removed_ids, profile_csv_file_name, since_msg=""):
+    old_count = len(old_ids)
+    new_count = len(new_ids)
+    delta = new_count - old_count
+    print(f"Steam user {username} friends count changed from {old_count} to {new_count} (delta {delta}){since_msg}")
+
+    if profile_csv_file_name:
         try:
-            with open(steam_games_file, 'r', encoding="utf-8") as f:
-                games_data = json.load(f)
-            if isinstance(games_data, dict):
-                last_games_count = games_data.get("game_count")
-                appids_list = games_data.get("appids")
-                if appids_list is not None:
-                    last_games_appids = set(appids_list)
+            write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(clock.time())), event="friends_count_change", old_value=old_count, new_value=new_count, delta=delta,)
         except Exception as e:
-            print(f"* Cannot load games library from '{steam_games_file}': {e}")
+            print(f"* Error writing profile CSV: {e}")
+
+    added_details = []
+    removed_details = []
+
+    try:
+        friend_profiles = fetch_player_summaries(s_api, list(added_ids) + list(removed_ids), get_profile_cache())
+    except Exception:
+        friend_profiles = {}
+
+    for event, id_list, details in (("friend_added", added_ids, added_details), ("friend_removed", removed_ids, removed_details)):
+        for friend_id in id_list:
+            sid = str(friend_id)
+            p = friend_profiles.get(sid, {})
+            persona = p.get('personaname') or ""
+            real = p.get('realname') or ""
+            if profile_csv_file_name:
+                try:
+                    write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(clock.time())), event=event, friend_steamid=sid, friend_persona=persona, friend_realname=real,)
+                except Exception as e:
+                    print(f"* Error writing profile CSV: {e}")
+            if real:
+                details.append(f"- {persona} ({real}) [{sid}]")
+            else:
+                details.append(f"- {persona or sid} [{sid}]")
+
+    if added_details:
+        print("New friends added:")
+        for line in added_details:
+            print(line)
+    if removed_details:
+        print("Friends removed:")
+        for line in removed_details:
+            print(line)
+
+    if FRIENDS_NOTIFICATION:
+        m_subject_friends = f"Steam user {username} friends list changed (now {new_count})"
+        body_lines = [
+            f"Steam user {username} friends count changed from {old_count} to {new_count} (delta {delta}){since_msg}",
+        ]
+        if added_details:
+            body_lines.append("\nNew friends added:")
+            body_lines.extend(added_details)
+        if removed_details:
+            body_lines.append("\nFriends removed:")
+            body_lines.extend(removed_details)
+        m_body_friends = "\n".join(body_lines) + get_cur_ts(nl_ch + nl_ch + "Timestamp: ")
+        print(f"Sending email notification to {RECEIVER_EMAIL}")
+        send_email(m_subject_friends, m_body_friends, "", SMTP_SSL)
+
+    print_cur_ts("Timestamp:\t\t\t")
+
+
+# Converts value to int, returns None if not possible
+def to_int_or_none(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# Returns the initial state of the event-detection engine (see detect_events()) for a user seen at timestamp now
+def new_monitor_state(username, status, gameid=None, gamename="", now=0):
+    return {
+        "username": username,
+        "status": status,
+        "status_ts_old": now,
+        "status_online_start_ts": now if status > 0 else 0,
+        "status_online_start_ts_old": now if status > 0 else 0,
+        "estimated_last_activity_ts": 0,  # Estimated timestamp when user was last active (used for away/snooze calculations)
+        "gameid": gameid,
+        "gamename": gamename,
+        "game_ts_old": now if gameid else 0,
+        "game_total_ts": 0,
+        "games_number": 1 if gameid else 0,
+        "game_total_after_offline_counted": False,
+        "steam_level": None,
+        "player_xp": None,
+        "friend_ids": None,
+        "games_count": None,
+        "games_appids": None,
+        "playtimes": {},
+    }
+
+
+# Pure state transition of the monitoring engine: compares the snapshot of user data fetched in one poll (status,
+# gameid, gamename, username, steam_level, player_xp, friend_ids, games_count, games_appids, playtimes, game_names,
+# recent_playtimes)
+# with the state left by the previous poll and returns (new_state, events); it does no I/O and does not modify its
+# arguments, so recorded snapshots can be replayed at high speed. Missing/None snapshot values were not fetched.
+def detect_events(state, snapshot, now):
+    state = dict(state)
+    events = []
+    username = state["username"]
+
+    status_old = state["status"]
+    status = snapshot["status"]
+    gameid_old = state["gameid"]
+    gameid = snapshot.get("gameid")
+    gamename = snapshot.get("gamename", "")
+
+    # Player status changed
+    if status != status_old:
+        since_ts = state["status_ts_old"]
+        event = {"type": "status_change", "username": username, "old_status": status_old, "status": status, "ts": now, "since_ts": since_ts, "gameid": gameid, "gamename": gamename, "inactivity": None, "active_inactive": False, "short_offline_since": 0, "online_start_ts": 0, "games_number": 0, "game_total_ts": 0}
+
+        # User changed from "online" to "away" - estimate last activity as ~5 minutes before status change
+        if status_old == 1 and status == 3:
+            state["estimated_last_activity_ts"] = now - STEAM_AWAY_INACTIVITY_THRESHOLD
+            online_duration = now - since_ts
+            event["inactivity"] = ("away", max(0, online_duration - STEAM_AWAY_INACTIVITY_THRESHOLD), min(STEAM_AWAY_INACTIVITY_THRESHOLD, online_duration))
+
+        # User changed from "away" to "snooze" - total inactivity is ~5 minutes (before away) + away duration
+        elif status_old == 3 and status == 4:
+            away_duration = now - since_ts
+            if state["estimated_last_activity_ts"] > 0:
+                total_inactivity = now - state["estimated_last_activity_ts"]
+            else:
+                state["estimated_last_activity_ts"] = since_ts - STEAM_AWAY_INACTIVITY_THRESHOLD
+                total_inactivity = away_duration + STEAM_AWAY_INACTIVITY_THRESHOLD
+            event["inactivity"] = ("snooze", total_inactivity, away_duration)
+
+        event["last_activity_ts"] = state["estimated_last_activity_ts"]
+
+        # Player got online (from offline, away, or snooze)
+        if status_old == 0 and status > 0:
+            state["game_total_after_offline_counted"] = False
+            state["estimated_last_activity_ts"] = 0
+            if (now - since_ts) > OFFLINE_INTERRUPT or not state["status_online_start_ts_old"]:
+                state["status_online_start_ts"] = now
+                state["game_total_ts"] = 0
+                state["games_number"] = 0
+            else:
+                state["status_online_start_ts"] = state["status_online_start_ts_old"]
+                event["short_offline_since"] = state["status_online_start_ts_old"]
+            event["active_inactive"] = True
+        elif status_old in (3, 4) and status == 1:
+            state["estimated_last_activity_ts"] = 0
+
+        # Player got offline
+        if status_old > 0 and status == 0:
+            event["online_start_ts"] = state["status_online_start_ts"]
+            if state["games_number"] > 0:
+                if gameid_old and not gameid:
+                    state["game_total_ts"] += now - state["game_ts_old"]
+                    state["game_total_after_offline_counted"] = True
+                event["games_number"] = state["games_number"]
+                event["game_total_ts"] = state["game_total_ts"]
+            state["status_online_start_ts_old"] = state["status_online_start_ts"]
+            state["status_online_start_ts"] = 0
+            event["active_inactive"] = True
+
+        state["status"] = status
+        state["status_ts_old"] = now
+        events.append(event)
+
+    # Player started/stopped/changed the game
+    if (gameid or None) != (gameid_old or None):
+        since_ts = state["game_ts_old"]
+        if gameid_old and gameid:
+            state["game_total_ts"] += now - since_ts
+            state["games_number"] += 1
+        elif gameid:
+            state["games_number"] += 1
+        elif not state["game_total_after_offline_counted"]:
+            state["game_total_ts"] += now - since_ts
+        events.append({"type": "game_change", "username": username, "old_gameid": gameid_old, "old_gamename": state["gamename"], "gameid": gameid, "gamename": gamename, "ts": now, "since_ts": since_ts})
+        state["game_ts_old"] = now
+    state["gameid"] = gameid
+    state["gamename"] = gamename
+
+    # Steam level changed
+    level = to_int_or_none(snapshot.get("steam_level"))
+    xp = to_int_or_none(snapshot.get("player_xp"))
+    if level is not None:
+        if state["steam_level"] is not None and level != state["steam_level"]:
+            events.append({"type": "level_change", "username": username, "old": state["steam_level"], "new": level, "xp": xp})
+        state["steam_level"] = level
+
+    # Total XP changed
+    if xp is not None:
+        if state["player_xp"] is not None and xp != state["player_xp"]:
+            events.append({"type": "xp_change", "username": username, "old": state["player_xp"], "new": xp})
+        state["player_xp"] = xp
+
+    # Friends list changed (the first list fetched becomes the baseline without being treated as a change)
+    friend_ids = snapshot.get("friend_ids")
+    if friend_ids is not None:
+        if state["friend_ids"] is None:
+            events.append({"type": "friends_baseline", "username": username, "friend_ids": friend_ids})
+            state["friend_ids"] = friend_ids
+        else:
+            added_ids, removed_ids = diff_sorted_ids(state["friend_ids"], friend_ids)
+            if added_ids or removed_ids:
+                events.append({"type": "friends_change", "username": username, "old_ids": state["friend_ids"], "new_ids": friend_ids, "added": added_ids, "removed": removed_ids})
+                state["friend_ids"] = friend_ids
+
+    # Games library changed
+    games_count = snapshot.get("games_count")
+    games_appids = snapshot.get("games_appids")
+    if games_count is not None and games_appids is not None:
+        if state["games_count"] is not None and state["games_appids"] is not None and (games_count != state["games_count"] or games_appids != state["games_appids"]):
+            events.append({"type": "library_change", "username": username, "old_count": state["games_count"], "new_count": games_count, "appids": sorted(games_appids), "added": sorted(games_appids - state["games_appids"]), "removed": sorted(state["games_appids"] - games_appids)})
+        state["games_count"] = games_count
+        state["games_appids"] = set(games_appids)
+
+    # Display (persona) name changed - the new name is used for subsequent events
+    new_username = snapshot.get("username")
+    if new_username and new_username != username:
+        events.append({"type": "name_change", "username": username, "old": username, "new": new_username})
+        username = state["username"] = new_username
+
+    # Games played since the last poll (per-game playtime increased)
+    playtimes = snapshot.get("playtimes")
+    if playtimes is not None:
+        played_games, state["playtimes"] = diff_games_playtimes(state["playtimes"], playtimes, snapshot.get("recent_playtimes"))
+        if played_games:
+            events.append({"type": "games_played", "username": username, "status": status, "games": played_games, "game_names": snapshot.get("game_names") or {}})
+
+    return state, events
+
+
+# Performs the side effects of one event returned by detect_events(): console output, last status/games/friends
+# files, profile CSV entries and email notifications
+def dispatch_monitor_event(event, s_api, profile_csv_file_name, monitor_files):
+    event_type = event["type"]
+    username = event["username"]
+
+    if event_type == "status_change":
+        status_old = event["old_status"]
+        status = event["status"]
+        status_ts = event["ts"]
+        status_ts_old = event["since_ts"]
+        status_online_start_ts = event["online_start_ts"]
 
-    if last_status_ts > 0 and status != last_status:
         last_status_to_save = []
-        last_status_to_save.append(status_ts_old)
+        last_status_to_save.append(status_ts)
         last_status_to_save.append(status)
         # Save estimated_last_activity_ts if status is away or snooze, otherwise save None
         if status == 3 or status == 4:  # away (3) or snooze (4)
-            if estimated_last_activity_ts > 0:
-                last_status_to_save.append(estimated_last_activity_ts)
-            else:
-                last_status_to_save.append(None)
+            last_status_to_save.append(event["last_activity_ts"])
         else:
             last_status_to_save.append(None)
         try:
-            with open(steam_last_status_file, 'w', encoding="utf-8") as f:
+            with open(monitor_files["last_status"], 'w', encoding="utf-8") as f:
                 json.dump(last_status_to_save, f, indent=2)
         except Exception as e:
-            print(f"* Cannot save last status to '{steam_last_status_file}' file: {e}")
+            print(f"* Cannot save last status to '{monitor_files['last_status']}' file: {e}")
+
+        print(f"Steam user {username} changed status from {steam_personastates[status_old]} to {steam_personastates[status]}")
+        print(f"User was {steam_personastates[status_old]} for {calculate_timespan(int(status_ts), int(status_ts_old))} ({get_range_of_dates_from_tss(int(status_ts_old), int(status_ts), short=True)})")
+
+        m_subject_was_since = f", was {steam_personastates[status_old]}: {get_range_of_dates_from_tss(int(status_ts_old), int(status_ts), short=True)}"
+        m_subject_after = calculate_timespan(int(status_ts), int(status_ts_old), show_seconds=False)
+        m_body_was_since = f" ({get_range_of_dates_from_tss(int(status_ts_old), int(status_ts), short=True)})"
+
+        m_body_short_offline_msg = ""
+        m_body_inactivity_info = ""
+
+        if event["inactivity"]:
+            kind, first_duration, second_duration = event["inactivity"]
+            if kind == "away":
+                inactivity_msg = f"User was likely active for ~{display_time(first_duration)}, then inactive for ~{display_time(second_duration)} before status changed to away"
+            else:
+                inactivity_msg = f"User was likely inactive for ~{display_time(first_duration)} total before status changed to snooze (including ~{display_time(STEAM_AWAY_INACTIVITY_THRESHOLD)} before away status + {display_time(second_duration)} away)"
+            print(inactivity_msg)
+            print(f"Estimated last activity:\t{get_date_from_ts(event['last_activity_ts'])}")
+            m_body_inactivity_info = f"\n\n{inactivity_msg}\n\nEstimated last activity: {get_date_from_ts(event['last_activity_ts'])}"
+
+        if status_old == 0 and status > 0:
+            print(f"*** User got ACTIVE ! (was offline since {get_date_from_ts(status_ts_old)})")
+            if event["short_offline_since"]:
+                m_body_short_offline_msg = f"\n\nShort offline interruption ({display_time(status_ts - status_ts_old)}), online start timestamp set back to {get_short_date_from_ts(event['short_offline_since'])}"
+                print(f"Short offline interruption ({display_time(status_ts - status_ts_old)}), online start timestamp set back to {get_short_date_from_ts(event['short_offline_since'])}")
+
+        m_body_played_games = ""
+
+        if status_old > 0 and status == 0:
+            if status_online_start_ts > 0:
+                m_subject_after = calculate_timespan(int(status_ts), int(status_online_start_ts), show_seconds=False)
+                online_since_msg = f"(after {calculate_timespan(int(status_ts), int(status_online_start_ts), show_seconds=False)}: {get_range_of_dates_from_tss(int(status_online_start_ts), int(status_ts), short=True)})"
+                m_subject_was_since = f", was available: {get_range_of_dates_from_tss(int(status_online_start_ts), int(status_ts), short=True)}"
+                m_body_was_since = f" ({get_range_of_dates_from_tss(int(status_ts_old), int(status_ts), short=True)})\n\nUser was available for {calculate_timespan(int(status_ts), int(status_online_start_ts), show_seconds=False)} ({get_range_of_dates_from_tss(int(status_online_start_ts), int(status_ts), short=True)})"
+            else:
+                online_since_msg = ""
+            if event["games_number"] > 0:
+                m_body_played_games = f"\n\nUser played {event['games_number']} games for total time of {display_time(event['game_total_ts'])}"
+                print(f"User played {event['games_number']} games for total time of {display_time(event['game_total_ts'])}")
+            print(f"*** User got OFFLINE ! {online_since_msg}")
+
+        m_body_user_in_game = ""
+        if event["gameid"]:
+            print(f"User is currently in-game: {event['gamename']}")
+            m_body_user_in_game = f"\n\nUser is currently in-game: {event['gamename']}"
+
+        m_subject = f"Steam user {username} is now {steam_personastates[status]} (after {m_subject_after}{m_subject_was_since})"
+        m_body = f"Steam user {username} changed status from {steam_personastates[status_old]} to {steam_personastates[status]}\n\nUser was {steam_personastates[status_old]} for {calculate_timespan(int(status_ts), int(status_ts_old))}{m_body_was_since}{m_body_inactivity_info}{m_body_short_offline_msg}{m_body_user_in_game}{m_body_played_games}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
+        if STATUS_NOTIFICATION or (ACTIVE_INACTIVE_NOTIFICATION and event["active_inactive"]):
+            print(f"Sending email notification to {RECEIVER_EMAIL}")
+            send_email(m_subject, m_body, "", SMTP_SSL)
+        print_cur_ts("Timestamp:\t\t\t")
+
+    elif event_type == "game_change":
+        gamename_old = event["old_gamename"]
+        gamename = event["gamename"]
+        game_ts = event["ts"]
+        game_ts_old = event["since_ts"]
+
+        # User changed the game
+        if event["old_gameid"] and event["gameid"]:
+            print(f"Steam user {username} changed game from '{gamename_old}' to '{gamename}' after {calculate_timespan(int(game_ts), int(game_ts_old))}")
+            print(f"User played game from {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True, between_sep=' to ')}")
+            m_subject = f"Steam user {username} changed game to '{gamename}' (after {calculate_timespan(int(game_ts), int(game_ts_old), show_seconds=False)}: {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True)})"
+            m_body = f"Steam user {username} changed game from '{gamename_old}' to '{gamename}' after {calculate_timespan(int(game_ts), int(game_ts_old))}\n\nUser played game from {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True, between_sep=' to ')}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
+
+        # User started playing new game
+        elif event["gameid"]:
+            print(f"Steam user {username} started playing '{gamename}'")
+            m_subject = f"Steam user {username} now plays '{gamename}'"
+            m_body = f"Steam user {username} now plays '{gamename}'{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
+
+        # User stopped playing the game
+        else:
+            print(f"Steam user {username} stopped playing '{gamename_old}' after {calculate_timespan(int(game_ts), int(game_ts_old))}")
+            print(f"User played game from {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True, between_sep=' to ')}")
+            m_subject = f"Steam user {username} stopped playing '{gamename_old}' (after {calculate_timespan(int(game_ts), int(game_ts_old), show_seconds=False)}: {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True)})"
+            m_body = f"Steam user {username} stopped playing '{gamename_old}' after {calculate_timespan(int(game_ts), int(game_ts_old))}\n\nUser played game from {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True, between_sep=' to ')}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
+
+        if GAME_CHANGE_NOTIFICATION:
+            print(f"Sending email notification to {RECEIVER_EMAIL}")
+            send_email(m_subject, m_body, "", SMTP_SSL)
+        print_cur_ts("Timestamp:\t\t\t")
+
+    elif event_type in ("level_change", "xp_change"):
+        old_value = event["old"]
+        new_value = event["new"]
+        delta = new_value - old_value
+        direction = "increased" if delta > 0 else "decreased"
+        if event_type == "level_change":
+            change_msg = f"Steam user {username} level {direction} from {old_value} to {new_value} (delta {delta})"
+            m_subject = f"Steam user {username} level changed to {new_value}"
+            xp_info_str = f"Total XP after level change:\t{event['xp']}" if event["xp"] is not None else ""
+            m_body = f"{change_msg}\n{xp_info_str}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
+            csv_event = "steam_level_change"
+        else:
+            change_msg = f"Steam user {username} total XP {direction} from {old_value} to {new_value} (delta {delta})"
+            m_subject = f"Steam user {username} total XP changed to {new_value}"
+            m_body = f"{change_msg}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
+            csv_event = "total_xp_change"
+        print(change_msg)
+
+        if profile_csv_file_name:
+            try:
+                write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(clock.time())), event=csv_event, old_value=old_value, new_value=new_value, delta=delta,)
+            except Exception as e:
+                print(f"* Error writing profile CSV: {e}")
+
+        if STEAM_LEVEL_XP_NOTIFICATION:
+            print(f"Sending email notification to {RECEIVER_EMAIL}")
+            send_email(m_subject, m_body, "", SMTP_SSL)
+        print_cur_ts("Timestamp:\t\t\t")
+
+    elif event_type == "friends_baseline":
+        save_friends_baseline(monitor_files["friends"], event["friend_ids"])
+
+    elif event_type == "friends_change":
+        report_friends_list_change(username, s_api, event["old_ids"], event["new_ids"], event["added"], event["removed"], profile_csv_file_name)
+        save_friends_baseline(monitor_files["friends"], event["new_ids"])
+
+    elif event_type == "library_change":
+        old_count = event["old_count"]
+        new_count = event["new_count"]
+        delta = new_count - old_count
+        added_appids = event["added"]
+        removed_appids = event["removed"]
+
+        lines = []
+        if delta != 0:
+            delta_str = f"+{delta}" if delta > 0 else str(delta)
+            lines.append(f"Steam user {username} games library changed from {old_count} to {new_count} ({delta_str})")
+        else:
+            lines.append(f"Steam user {username} games library changed (same count: {new_count}, titles changed)")
+        if added_appids:
+            lines.append(f"Added: {format_appids(added_appids)}")
+        if removed_appids:
+            lines.append(f"Removed: {format_appids(removed_appids)}")
+        for line in lines:
+            print(line)
+
+        try:
+            with open(monitor_files["games"], 'w', encoding="utf-8") as f:
+                json.dump({"game_count": new_count, "appids": event["appids"]}, f, indent=2)
+        except Exception as e:
+            print(f"* Cannot save games library to '{monitor_files['games']}': {e}")
+
+        if profile_csv_file_name:
+            try:
+                write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(clock.time())), event="games_library_change", old_value=old_count, new_value=new_count, delta=delta,)
+                for csv_event, appids in (("game_added", added_appids), ("game_removed", removed_appids)):
+                    for appid in appids:
+                        write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(clock.time())), event=csv_event, appid=appid, game_name=get_app_name(appid))
+            except Exception as e:
+                print(f"* Error writing profile CSV: {e}")
+
+        if GAMES_LIBRARY_NOTIFICATION:
+            m_subject_games = f"Steam user {username} games library changed (now {new_count})"
+            m_body_games = "\n".join(lines) + get_cur_ts(nl_ch + nl_ch + "Timestamp: ")
+            print(f"Sending email notification to {RECEIVER_EMAIL}")
+            send_email(m_subject_games, m_body_games, "", SMTP_SSL)
+        print_cur_ts("Timestamp:\t\t\t")
+
+    elif event_type == "name_change":
+        old_name = event["old"]
+        new_name = event["new"]
+        print(f"Steam user {old_name} changed display name to {new_name}")
+
+        if profile_csv_file_name:
+            try:
+                write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(clock.time())), event="name_change", old_value=old_name, new_value=new_name)
+            except Exception as e:
+                print(f"* Error writing profile CSV: {e}")
+
+        if NAME_CHANGE_NOTIFICATION:
+            m_subject_name = f"Steam user {old_name} changed display name to {new_name}"
+            m_body_name = f"Steam user {old_name} changed display name to {new_name}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
+            print(f"Sending email notification to {RECEIVER_EMAIL}")
+            send_email(m_subject_name, m_body_name, "", SMTP_SSL)
+        print_cur_ts("Timestamp:\t\t\t")
 
+    elif event_type == "games_played":
+        for appid, old_playtime, new_playtime in event["games"]:
+            played_name = get_app_name(appid) or event["game_names"].get(appid) or f"AppID {appid}"
+            offline_str = " (while appearing offline)" if event["status"] == 0 else ""
+            print(f"Steam user {username} played '{played_name}' for {new_playtime - old_playtime} minutes{offline_str} (total: {display_time(new_playtime * 60)})")
+
+            if profile_csv_file_name:
+                try:
+                    write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(clock.time())), event="game_played", old_value=old_playtime, new_value=new_playtime, delta=new_playtime - old_playtime, appid=appid, game_name=played_name)
+                except Exception as e:
+                    print(f"* Error writing profile CSV: {e}")
+        print_cur_ts("Timestamp:\t\t\t")
+
+
+# Saves the state of the event-detection engine along with the rest of the per-poll state, so the next --once run
+# can resume where this one stopped; friend IDs are kept in the friends file maintained by dispatch_monitor_event()
+def save_monitor_state(state_file, state, session):
+    state_to_save = dict(state)
+    state_to_save.pop("friend_ids", None)
+    if state_to_save.get("games_appids") is not None:
+        state_to_save["games_appids"] = sorted(state_to_save["games_appids"])
+    data = {"state": state_to_save}
+    data.update(session)
     try:
-        if csv_file_name and (status != last_status):
-            write_csv_entry(csv_file_name, datetime.fromtimestamp(int(time.time())), steam_personastates[status], gamename, gameid)
+        save_file_atomically(state_file, json.dumps(data, separators=(",", ":")))
     except Exception as e:
-        print(f"* Error: {e}")
+        print(f"* Cannot save monitoring state to '{state_file}' file: {e}")
 
-    print(f"\nSteam64 ID:\t\t\t{steamid}")
-    print(f"Display name:\t\t\t{username}")
-    if realname:
-        print(f"Real name:\t\t\t{realname}")
+
+# Loads the state saved by save_monitor_state() and returns (state, session), or None if the file does not exist or
+# cannot be read (JSON object keys are converted back to AppIDs)
+def load_monitor_state(state_file):
+    if not os.path.isfile(state_file):
+        return None
     try:
-        player_obj = s_user["response"]["players"][0]
-        print_country_region(player_obj)
-    except Exception:
-        pass
+        with open(state_file, 'r', encoding="utf-8") as f:
+            data = json.load(f)
+        state = data.pop("state")
+        state["playtimes"] = {int(appid): playtime for appid, playtime in state.get("playtimes", {}).items()}
+        if state.get("games_appids") is not None:
+            state["games_appids"] = set(state["games_appids"])
+        state["friend_ids"] = None
+        friends_file = data["files"]["friends"]
+        if FRIENDS_CHECK and os.path.isfile(friends_file):
+            state["friend_ids"] = load_u64_array(friends_file)
+        data["recent_playtimes"] = {int(appid): tuple(playtimes) for appid, playtimes in data.get("recent_playtimes", {}).items()}
+        data["achievements_watermarks"] = {int(appid): ts for appid, ts in data.get("achievements_watermarks", {}).items()}
+    except Exception as e:
+        print(f"* Cannot load monitoring state from '{state_file}' file: {e}")
+        return None
+    return state, data
 
-    print(f"\nStatus:\t\t\t\t{str(steam_personastates[status]).upper()}")
-    print(f"Profile visibility:\t\t{steam_visibilitystates[visibilitystate]}")
 
-    if timecreated:
-        print(f"\nAccount creation date:\t\t{get_date_from_ts(timecreated)}")
+# Main function that monitors gaming activity of the specified Steam user
+def steam_monitor_user(steamid, csv_file_name, profile_csv_file_name=None, once=False, target=None):
 
-    if profile_url:
-        print(f"\nProfile URL:\t\t\t{profile_url}")
+    status_ts_old = 0
+    status_online_start_ts = 0
+    status_online_start_ts_old = 0
+    game_ts_old = 0
+    status = 0
+    games_number = 0
+    estimated_last_activity_ts = 0  # Estimated timestamp when user was last active (used for away/snooze calculations)
+    last_friend_ids = None
+    startup_friend_ids = None
+    last_games_count = None
+    last_games_appids = None
+    last_games_playtimes = {}
 
-    # Optional level/XP snapshot at monitoring start
-    if STEAM_LEVEL_XP_CHECK:
-        s_level_displayed = False
-        try:
-            s_level = s_api.call('IPlayerService.GetSteamLevel', steamid=steamid)
-            print(f"\nSteam level:\t\t\t{s_level.get('response', {}).get('player_level', 'n/a')}")
-            s_level_displayed = True
-        except Exception:
-            s_level_displayed = False
+    try:
+        if csv_file_name:
+            init_csv_file(csv_file_name)
+    except Exception as e:
+        print(f"* Error: {e}")
 
+    try:
+        if profile_csv_file_name:
+            init_profile_csv_file(profile_csv_file_name)
+    except Exception as e:
+        print(f"* Error: {e}")
+
+    # In --once mode monitoring resumes from the state saved by the previous run, without the startup API requests
+    state_file = f"steam_{steamid}_state.json"
+    resumed = load_monitor_state(state_file) if once else None
+
+    if resumed:
+        state, session = resumed
+        monitor_files = session["files"]
+        username = state["username"]
+        status = state["status"]
+        s_api = create_webapi()
+        s_api_key = STEAM_API_KEY
+        s_played = None
+        recently_played_ts = session.get("recently_played_ts", 0)
+        last_recent_playtimes = session["recent_playtimes"]
+        achievements_watermarks = session["achievements_watermarks"]
+        achievements_start_ts = session.get("achievements_start_ts", int(clock.time()))
+        print(f"* Monitoring state loaded from file '{state_file}' (saved {get_date_from_ts(int(os.path.getmtime(state_file)))})")
+    else:
         try:
-            badges = s_api.call('IPlayerService.GetBadges', steamid=steamid)
-            resp = badges.get('response', {}) if isinstance(badges, dict) else {}
-            player_xp = resp.get('player_xp', 0)
-            xp_to_level = resp.get('player_xp_needed_to_level_up', 0)
-            xp_current_level = resp.get('player_xp_needed_current_level', 0)
-            badge_count = len(resp.get('badges', []))
-
-            if not s_level_displayed:
-                print()
-            print(f"Badges earned:\t\t\t{badge_count}")
-            print(f"Total XP:\t\t\t{player_xp}")
-            print(f"XP to next level:\t\t{xp_to_level}")
-            print(f"XP in current level:\t\t{xp_current_level}")
-        except Exception:
-            pass
+            s_api = create_webapi()
+            s_api_key = STEAM_API_KEY
+            s_user = api_call(s_api, 'ISteamUser.GetPlayerSummaries', steamids=str(steamid))
+            s_played = api_call(s_api, 'IPlayerService.GetRecentlyPlayedGames', steamid=steamid, count=5)
+            recently_played_ts = int(clock.time())
+        except Exception as e:
+            print(f"* Error: {e}")
+            sys.exit(1)
 
-    # Optional friends snapshot at monitoring start
-    if FRIENDS_CHECK:
         try:
-            friends = s_api.call('ISteamUser.GetFriendList', steamid=steamid, relationship='friend')
-            friend_entries = friends.get('friendslist', {}).get('friends', []) if isinstance(friends, dict) else []
-            n_friends = len(friend_entries)
-            print(f"\nFriends:\t\t\t{n_friends}")
+            username = s_user["response"]["players"][0].get("personaname")
         except Exception:
-            # Gracefully indicate that friends data is not accessible (privacy or API limitations)
-            print(f"\nFriends:\t\t\tN/A")
+            print(f"* Error: User with Steam64 ID {steamid} does not exist!")
+            sys.exit(1)
 
-    # Optional games library snapshot at monitoring start
-    if GAMES_LIBRARY_CHECK:
-        try:
-            owned = s_api.call(
-                "IPlayerService.GetOwnedGames",
-                steamid=steamid,
-                include_appinfo=0,
-                include_played_free_games=1,
-                appids_filter=[],
-                include_free_sub=0,
-                include_extended_appinfo=0,
-                language="en",
-            )
-            games_list = owned.get("response", {}).get("games", []) if isinstance(owned, dict) else []
-            current_count = len(games_list)
-            current_appids = sorted(set(g.get("appid") for g in games_list if g.get("appid")))
-            print(f"\nGames in library:\t\t{current_count}")
-            last_games_count = current_count
-            last_games_appids = set(current_appids)
+        status = int(s_user["response"]["players"][0].get("personastate"))
+        visibilitystate = int(s_user["response"]["players"][0].get("communityvisibilitystate"))
+
+        realname = s_user["response"]["players"][0].get("realname", "")
+        profile_url = s_user["response"]["players"][0].get("profileurl")
+        timecreated = s_user["response"]["players"][0].get("timecreated")
+        lastlogoff = s_user["response"]["players"][0].get("lastlogoff")
+        gameid = s_user["response"]["players"][0].get("gameid")
+        gamename = s_user["response"]["players"][0].get("gameextrainfo", "")
+
+        status_ts_old = int(clock.time())
+        status_ts_old_bck = status_ts_old
+
+        if status > 0:
+            status_online_start_ts = status_ts_old
+            status_online_start_ts_old = status_online_start_ts
+
+        steam_last_status_file = f"steam_{username}_last_status.json"
+        steam_games_file = f"steam_{username}_games.json"
+        steam_friends_file = f"steam_{username}_friends.bin"
+        last_status_read = []
+        last_status_ts = 0
+        last_status = -1
+
+        if os.path.isfile(steam_last_status_file):
             try:
-                with open(steam_games_file, 'w', encoding="utf-8") as f:
-                    json.dump({"game_count": current_count, "appids": current_appids}, f, indent=2)
+                with open(steam_last_status_file, 'r', encoding="utf-8") as f:
+                    last_status_read = json.load(f)
             except Exception as e:
-                print(f"* Cannot save games library to '{steam_games_file}': {e}")
-        except Exception as e:
-            print(f"\nGames in library:\tN/A ({e})")
+                print(f"* Cannot load last status from '{steam_last_status_file}' file: {e}")
+            if last_status_read:
+                last_status_ts = last_status_read[0]
+                last_status = last_status_read[1]
+                # Backward compatibility: check if estimated_last_activity_ts exists (new format has 3 elements)
+                if len(last_status_read) >= 3 and last_status_read[2] is not None:
+                    estimated_last_activity_ts = last_status_read[2]
+                steam_last_status_file_mdate_dt = datetime.fromtimestamp(int(os.path.getmtime(steam_last_status_file)))
+                steam_last_status_file_mdate = steam_last_status_file_mdate_dt.strftime("%d %b %Y, %H:%M:%S")
+                steam_last_status_file_mdate_weekday = str(calendar.day_abbr[(steam_last_status_file_mdate_dt).weekday()])
+
+                print(f"* Last status loaded from file '{steam_last_status_file}' ({steam_last_status_file_mdate_weekday} {steam_last_status_file_mdate})")
+
+                if last_status_ts > 0:
+                    last_status_dt_str = datetime.fromtimestamp(last_status_ts).strftime("%d %b %Y, %H:%M:%S")
+                    last_status_str = str(steam_personastates[last_status]).upper()
+                    last_status_ts_weekday = str(calendar.day_abbr[(datetime.fromtimestamp(last_status_ts)).weekday()])
+                    print(f"* Last status read from file: {last_status_str} ({last_status_ts_weekday} {last_status_dt_str})")
+
+                    if lastlogoff and status == 0 and lastlogoff > last_status_ts:
+                        status_ts_old = lastlogoff
+                    elif status == 0:
+                        status_ts_old = last_status_ts
+                    if status > 0 and status == last_status:
+                        status_online_start_ts = last_status_ts
+                        status_online_start_ts_old = status_online_start_ts
+                        status_ts_old = last_status_ts
 
-    if last_status_ts == 0:
-        if lastlogoff and status == 0:
-            status_ts_old = lastlogoff
-        last_status_to_save = []
-        last_status_to_save.append(status_ts_old)
-        last_status_to_save.append(status)
-        # Save estimated_last_activity_ts if status is away or snooze, otherwise save None
-        if status == 3 or status == 4:  # away (3) or snooze (4)
-            if estimated_last_activity_ts > 0:
-                last_status_to_save.append(estimated_last_activity_ts)
+        if GAMES_LIBRARY_CHECK and os.path.isfile(steam_games_file):
+            try:
+                with open(steam_games_file, 'r', encoding="utf-8") as f:
+                    games_data = json.load(f)
+                if isinstance(games_data, dict):
+                    last_games_count = games_data.get("game_count")
+                    appids_list = games_data.get("appids")
+                    if appids_list is not None:
+                        last_games_appids = set(appids_list)
+            except Exception as e:
+                print(f"* Cannot load games library from '{steam_games_file}': {e}")
+
+        friends_baseline_ts = 0
+        if FRIENDS_CHECK and os.path.isfile(steam_friends_file):
+            try:
+                last_friend_ids = load_u64_array(steam_friends_file)
+                friends_baseline_ts = int(os.path.getmtime(steam_friends_file))
+            except Exception as e:
+                print(f"* Cannot load friends list from '{steam_friends_file}' file: {e}")
+
+        if last_status_ts > 0 and status != last_status:
+            last_status_to_save = []
+            last_status_to_save.append(status_ts_old)
+            last_status_to_save.append(status)
+            # Save estimated_last_activity_ts if status is away or snooze, otherwise save None
+            if status == 3 or status == 4:  # away (3) or snooze (4)
+                if estimated_last_activity_ts > 0:
+                    last_status_to_save.append(estimated_last_activity_ts)
+                else:
+                    last_status_to_save.append(None)
             else:
                 last_status_to_save.append(None)
-        else:
-            last_status_to_save.append(None)
+            try:
+                with open(steam_last_status_file, 'w', encoding="utf-8") as f:
+                    json.dump(last_status_to_save, f, indent=2)
+            except Exception as e:
+                print(f"* Cannot save last status to '{steam_last_status_file}' file: {e}")
+
         try:
-            with open(steam_last_status_file, 'w', encoding="utf-8") as f:
-                json.dump(last_status_to_save, f, indent=2)
+            if csv_file_name and (status != last_status):
+                write_csv_entry(csv_file_name, datetime.fromtimestamp(int(clock.time())), steam_personastates[status], gamename, gameid)
         except Exception as e:
-            print(f"* Cannot save last status to '{steam_last_status_file}' file: {e}")
+            print(f"* Error: {e}")
 
-    if status_ts_old != status_ts_old_bck:
-        if status == 0:
-            last_status_dt_str = datetime.fromtimestamp(status_ts_old).strftime("%d %b %Y, %H:%M:%S")
-            last_status_str = str(steam_personastates[last_status]).upper()
-            last_status_ts_weekday = str(calendar.day_abbr[(datetime.fromtimestamp(status_ts_old)).weekday()])
-            print(f"\n* Last time user was available:\t{last_status_ts_weekday} {last_status_dt_str}")
-        print(f"\n* User is {str(steam_personastates[status]).upper()} for:\t\t{calculate_timespan(int(time.time()), int(status_ts_old), show_seconds=False)}")
+        print(f"\nSteam64 ID:\t\t\t{steamid}")
+        print(f"Display name:\t\t\t{username}")
+        if realname:
+            print(f"Real name:\t\t\t{realname}")
+        try:
+            player_obj = s_user["response"]["players"][0]
+            print_country_region(player_obj)
+        except Exception:
+            pass
 
-    if gameid:
-        print(f"\nUser is currently in-game:\t{gamename}")
-        game_ts_old = int(time.time())
-        games_number += 1
+        print(f"\nStatus:\t\t\t\t{str(steam_personastates[status]).upper()}")
+        print(f"Profile visibility:\t\t{steam_visibilitystates[visibilitystate]}")
 
-    if "games" in s_played["response"].keys() and s_played["response"]["games"]:
-        print(f"\nList of recently played games:")
-        for i, game in enumerate(s_played["response"]["games"]):
-            name = game.get('name')
-            mins_2w = game.get('playtime_2weeks', 0) or 0
-            mins_total = game.get('playtime_forever', 0) or 0
-            hrs_2w = mins_2w // 60
-            hrs_total = mins_total // 60
-            print(f"{i + 1} {name} (last 2w: {hrs_2w}h, total: {hrs_total}h)")
+        if timecreated:
+            print(f"\nAccount creation date:\t\t{get_date_from_ts(timecreated)}")
 
-    status_old = status
-    gameid_old = gameid
-    gamename_old = gamename
+        if profile_url:
+            print(f"\nProfile URL:\t\t\t{profile_url}")
 
-    print_cur_ts("\nTimestamp:\t\t\t")
+        # Optional level/XP snapshot at monitoring start
+        if STEAM_LEVEL_XP_CHECK:
+            s_level_displayed = False
+            try:
+                s_level = api_call(s_api, 'IPlayerService.GetSteamLevel', steamid=steamid)
+                print(f"\nSteam level:\t\t\t{s_level.get('response', {}).get('player_level', 'n/a')}")
+                s_level_displayed = True
+            except Exception:
+                s_level_displayed = False
+
+            try:
+                badges = api_call(s_api, 'IPlayerService.GetBadges', steamid=steamid)
+                resp = badges.get('response', {}) if isinstance(badges, dict) else {}
+                player_xp = resp.get('player_xp', 0)
+                xp_to_level = resp.get('player_xp_needed_to_level_up', 0)
+                xp_current_level = resp.get('player_xp_needed_current_level', 0)
+                badge_count = len(resp.get('badges', []))
+
+                if not s_level_displayed:
+                    print()
+                print(f"Badges earned:\t\t\t{badge_count}")
+                print(f"Total XP:\t\t\t{player_xp}")
+                print(f"XP to next level:\t\t{xp_to_level}")
+                print(f"XP in current level:\t\t{xp_current_level}")
+            except Exception:
+                pass
+
+        # Optional friends snapshot at monitoring start
+        if FRIENDS_CHECK:
+            try:
+                friends = api_call(s_api, 'ISteamUser.GetFriendList', steamid=steamid, relationship='friend')
+                friend_entries = friends.get('friendslist', {}).get('friends', []) if isinstance(friends, dict) else []
+                n_friends = len(friend_entries)
+                print(f"\nFriends:\t\t\t{n_friends}")
+                startup_friend_ids = array('Q', sorted(int(f.get('steamid')) for f in friend_entries if f.get('steamid')))
+            except Exception:
+                # Gracefully indicate that friends data is not accessible (privacy or API limitations)
+                print(f"\nFriends:\t\t\tN/A")
+
+        # Optional games library snapshot at monitoring start
+        if GAMES_LIBRARY_CHECK:
+            try:
+                owned = api_call(
+                    s_api,
+                    "IPlayerService.GetOwnedGames",
+                    steamid=steamid,
+                    include_appinfo=0,
+                    include_played_free_games=1,
+                    appids_filter=[],
+                    include_free_sub=0,
+                    include_extended_appinfo=0,
+                    language="en",
+                )
+                games_list = owned.get("response", {}).get("games", []) if isinstance(owned, dict) else []
+                current_count = len(games_list)
+                current_appids = sorted(set(g.get("appid") for g in games_list if g.get("appid")))
+                print(f"\nGames in library:\t\t{current_count}")
+                last_games_count = current_count
+                last_games_appids = set(current_appids)
+                last_games_playtimes.update(get_games_playtimes(owned))
+                try:
+                    with open(steam_games_file, 'w', encoding="utf-8") as f:
+                        json.dump({"game_count": current_count, "appids": current_appids}, f, indent=2)
+                except Exception as e:
+                    print(f"* Cannot save games library to '{steam_games_file}': {e}")
+            except Exception as e:
+                print(f"\nGames in library:\tN/A ({e})")
+
+        if last_status_ts == 0:
+            if lastlogoff and status == 0:
+                status_ts_old = lastlogoff
+            last_status_to_save = []
+            last_status_to_save.append(status_ts_old)
+            last_status_to_save.append(status)
+            # Save estimated_last_activity_ts if status is away or snooze, otherwise save None
+            if status == 3 or status == 4:  # away (3) or snooze (4)
+                if estimated_last_activity_ts > 0:
+                    last_status_to_save.append(estimated_last_activity_ts)
+                else:
+                    last_status_to_save.append(None)
+            else:
+                last_status_to_save.append(None)
+            try:
+                with open(steam_last_status_file, 'w', encoding="utf-8") as f:
+                    json.dump(last_status_to_save, f, indent=2)
+            except Exception as e:
+                print(f"* Cannot save last status to '{steam_last_status_file}' file: {e}")
+
+        if status_ts_old != status_ts_old_bck:
+            if status == 0:
+                last_status_dt_str = datetime.fromtimestamp(status_ts_old).strftime("%d %b %Y, %H:%M:%S")
+                last_status_str = str(steam_personastates[last_status]).upper()
+                last_status_ts_weekday = str(calendar.day_abbr[(datetime.fromtimestamp(status_ts_old)).weekday()])
+                print(f"\n* Last time user was available:\t{last_status_ts_weekday} {last_status_dt_str}")
+            print(f"\n* User is {str(steam_personastates[status]).upper()} for:\t\t{calculate_timespan(int(clock.time()), int(status_ts_old), show_seconds=False)}")
+
+        if gameid:
+            print(f"\nUser is currently in-game:\t{gamename}")
+            game_ts_old = int(clock.time())
+            games_number += 1
+
+        if "games" in s_played["response"].keys() and s_played["response"]["games"]:
+            print(f"\nList of recently played games:")
+            for i, game in enumerate(s_played["response"]["games"]):
+                name = game.get('name')
+                mins_2w = game.get('playtime_2weeks', 0) or 0
+                mins_total = game.get('playtime_forever', 0) or 0
+                hrs_2w = mins_2w // 60
+                hrs_total = mins_total // 60
+                print(f"{i + 1} {name} (last 2w: {hrs_2w}h, total: {hrs_total}h)")
+
+        last_recent_playtimes = get_recent_games_playtimes(s_played)
+        last_games_playtimes.update(get_games_playtimes(s_played))
+        achievements_watermarks = {}
+        achievements_start_ts = int(clock.time())
+
+        print_cur_ts("\nTimestamp:\t\t\t")
+
+        # Report friends list changes made while the tool was not running and refresh the baseline
+        if startup_friend_ids is not None:
+            if last_friend_ids is not None:
+                added_ids, removed_ids = diff_sorted_ids(last_friend_ids, startup_friend_ids)
+                if added_ids or removed_ids:
+                    report_friends_list_change(username, s_api, last_friend_ids, startup_friend_ids, added_ids, removed_ids, profile_csv_file_name, since_msg=f" while the tool was not running (baseline from {get_date_from_ts(friends_baseline_ts)})")
+            if last_friend_ids is None or last_friend_ids != startup_friend_ids:
+                save_friends_baseline(steam_friends_file, startup_friend_ids)
+            last_friend_ids = startup_friend_ids
+
+        # State of the event-detection engine, advanced by detect_events() with the snapshot fetched in each poll
+        state = new_monitor_state(username, status, gameid, gamename)
+        state.update(status_ts_old=status_ts_old, status_online_start_ts=status_online_start_ts, status_online_start_ts_old=status_online_start_ts_old, estimated_last_activity_ts=estimated_last_activity_ts, game_ts_old=game_ts_old, games_number=games_number, friend_ids=last_friend_ids, games_count=last_games_count, games_appids=last_games_appids, playtimes=last_games_playtimes)
+        monitor_files = {"last_status": steam_last_status_file, "games": steam_games_file, "friends": steam_friends_file}
+
+    if target:
+        target.state = state
 
     alive_counter = 0
+    polls = 0
     email_sent = False
 
     m_subject = m_body = ""
@@ -1880,36 +4794,75 @@ def steam_monitor_user(steamid, csv_file_name, profile_csv_file_name=None):
     else:
         sleep_interval = STEAM_CHECK_INTERVAL
 
-    time.sleep(sleep_interval)
+    # The first --once run only saves the state fetched above as the baseline for the next run
+    if once and not resumed:
+        save_monitor_state(state_file, state, {"files": monitor_files, "recently_played_ts": recently_played_ts, "recent_playtimes": last_recent_playtimes, "achievements_watermarks": achievements_watermarks, "achievements_start_ts": achievements_start_ts})
+        return
+
+    poll_due_ts = clock.time()
+    if not once:
+        poll_due_ts += sleep_interval
+        if not wait_for_next_poll(target, sleep_interval):
+            return
+
+    config_csv_files = (CSV_FILE, PROFILE_CSV_FILE)
 
     # Main loop
     while True:
+        # Config changes reloaded with SIGHUP are applied between polls; CSV files changed by them are followed
+        # unless the user is monitored with other files
+        apply_pending_config()
+        if (CSV_FILE, PROFILE_CSV_FILE) != config_csv_files:
+            try:
+                if csv_file_name == config_csv_files[0]:
+                    csv_file_name = CSV_FILE
+                    if csv_file_name:
+                        init_csv_file(csv_file_name)
+                if profile_csv_file_name == config_csv_files[1]:
+                    profile_csv_file_name = PROFILE_CSV_FILE
+                    if profile_csv_file_name:
+                        init_profile_csv_file(profile_csv_file_name)
+            except Exception as e:
+                print(f"* Error: {e}")
+            config_csv_files = (CSV_FILE, PROFILE_CSV_FILE)
+
+        poll_lag.observe(max(0, clock.time() - poll_due_ts))
+        poll_start_ts = time.perf_counter() if phase_profiler else 0
         current_steam_level = None
         current_player_xp = None
         current_friend_ids = None
         current_games_count = None
         current_games_appids = None
+        current_games_playtimes = None
         current_username = None
+        polls += 1
         try:
-            s_api = steam.webapi.WebAPI(key=STEAM_API_KEY)
-            s_user = s_api.call('ISteamUser.GetPlayerSummaries', steamids=str(steamid))
-            s_played = s_api.call('IPlayerService.GetRecentlyPlayedGames', steamid=steamid, count=5)
+            # The WebAPI object (and its interface list) is reused unless the API key has changed
+            if STEAM_API_KEY != s_api_key:
+                s_api = create_webapi()
+                s_api_key = STEAM_API_KEY
+            s_user = api_call(s_api, 'ISteamUser.GetPlayerSummaries', steamids=str(steamid))
             status = int(s_user["response"]["players"][0]["personastate"])
             gameid = s_user["response"]["players"][0].get("gameid")
             gamename = s_user["response"]["players"][0].get("gameextrainfo", "")
             current_username = s_user["response"]["players"][0].get("personaname")
+
+            # Recently played games are fetched only when a feature needs them, when the game changes or periodically
+            if ACHIEVEMENTS_CHECK or PLAYTIME_CHECK or gameid != state["gameid"] or (RECENTLY_PLAYED_CHECK_INTERVAL and int(clock.time()) - recently_played_ts >= RECENTLY_PLAYED_CHECK_INTERVAL):
+                s_played = api_call(s_api, 'IPlayerService.GetRecentlyPlayedGames', steamid=steamid, count=5)
+                recently_played_ts = int(clock.time())
             email_sent = False
 
             # Fetch Steam level and total XP if tracking is enabled
             if STEAM_LEVEL_XP_CHECK:
                 try:
-                    s_level = s_api.call('IPlayerService.GetSteamLevel', steamid=steamid)
+                    s_level = api_call(s_api, 'IPlayerService.GetSteamLevel', steamid=steamid)
                     current_steam_level = s_level.get('response', {}).get('player_level')
                 except Exception:
                     current_steam_level = None
 
                 try:
-                    badges = s_api.call('IPlayerService.GetBadges', steamid=steamid)
+                    badges = api_call(s_api, 'IPlayerService.GetBadges', steamid=steamid)
                     current_player_xp = badges.get('response', {}).get('player_xp')
                 except Exception:
                     current_player_xp = None
@@ -1917,16 +4870,17 @@ def steam_monitor_user(steamid, csv_file_name, profile_csv_file_name=None):
             # Fetch friends list when tracking is enabled
             if FRIENDS_CHECK:
                 try:
-                    friends = s_api.call('ISteamUser.GetFriendList', steamid=steamid, relationship='friend')
+                    friends = api_call(s_api, 'ISteamUser.GetFriendList', steamid=steamid, relationship='friend')
                     friend_entries = friends.get('friendslist', {}).get('friends', [])
-                    current_friend_ids = {f.get('steamid') for f in friend_entries if f.get('steamid')}
+                    current_friend_ids = array('Q', sorted(int(f.get('steamid')) for f in friend_entries if f.get('steamid')))
                 except Exception:
                     current_friend_ids = None
 
             # Fetch games library (minimal: count + appids only) when tracking is enabled
             if GAMES_LIBRARY_CHECK:
                 try:
-                    owned = s_api.call(
+                    owned = api_call(
+                        s_api,
                         "IPlayerService.GetOwnedGames",
                         steamid=steamid,
                         include_appinfo=0,
@@ -1939,6 +4893,7 @@ def steam_monitor_user(steamid, csv_file_name, profile_csv_file_name=None):
                     games_list = owned.get("response", {}).get("games", []) if isinstance(owned, dict) else []
                     current_games_count = len(games_list)
                     current_games_appids = set(g.get("appid") for g in games_list if g.get("appid"))
+                    current_games_playtimes = get_games_playtimes(owned)
                 except Exception:
                     current_games_count = None
                     current_games_appids = None
@@ -1949,13 +4904,22 @@ def steam_monitor_user(steamid, csv_file_name, profile_csv_file_name=None):
             else:
                 sleep_interval = STEAM_CHECK_INTERVAL
 
+            # When the status endpoint is paused by its circuit breaker, wait for the (jittered) backoff delay instead
+            retry_in = get_circuit_breaker('ISteamUser.GetPlayerSummaries').retry_in()
+            if retry_in > sleep_interval:
+                sleep_interval = int(retry_in) + 1
+
             response = e.response if isinstance(e, req.exceptions.HTTPError) else None
-            if response is not None and response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After') or sleep_interval)
-                time.sleep(retry_after)
+            if response is not None and response.status_code == 429 and not once:
+                poll_due_ts = clock.time() + sleep_interval
+                if not wait_for_next_poll(target, sleep_interval):
+                    return
                 continue
             else:
                 print(f"* Error, retrying in {display_time(sleep_interval)}{': ' + str(e) if e else ''}")
+                breakers_str = format_circuit_breakers()
+                if breakers_str:
+                    print(f"* API circuit breakers:\t\t{breakers_str}")
                 if 'Forbidden' in str(e):
                     print("* API key might not be valid anymore!")
                     if ERROR_NOTIFICATION and not email_sent:
@@ -1967,466 +4931,170 @@ def steam_monitor_user(steamid, csv_file_name, profile_csv_file_name=None):
 
             print_cur_ts("Timestamp:\t\t\t")
 
-            time.sleep(sleep_interval)
+            # The state saved by the previous --once run is kept, so the next run compares against it
+            if once:
+                sys.exit(1)
 
-            continue
-
-        change = False
-        act_inact_flag = False
+            poll_due_ts = clock.time() + sleep_interval
+            if not wait_for_next_poll(target, sleep_interval):
+                return
 
-        status_ts = int(time.time())
-        game_ts = int(time.time())
-
-        # Player status changed
-        if status != status_old:
+            continue
 
-            last_status_to_save = []
-            last_status_to_save.append(status_ts)
-            last_status_to_save.append(status)
-            # Save estimated_last_activity_ts if status is away or snooze, otherwise save None
-            if status == 3 or status == 4:  # away (3) or snooze (4)
-                last_status_to_save.append(estimated_last_activity_ts)
-            else:
-                last_status_to_save.append(None)
-            try:
-                with open(steam_last_status_file, 'w', encoding="utf-8") as f:
-                    json.dump(last_status_to_save, f, indent=2)
-            except Exception as e:
-                print(f"* Cannot save last status to '{steam_last_status_file}' file: {e}")
+        parse_start_ts = time.perf_counter() if phase_profiler else 0
+        snapshot = {"status": status, "gameid": gameid, "gamename": gamename, "username": current_username}
+        if STEAM_LEVEL_XP_CHECK:
+            snapshot.update(steam_level=current_steam_level, player_xp=current_player_xp)
+        if FRIENDS_CHECK:
+            snapshot["friend_ids"] = current_friend_ids
+        if GAMES_LIBRARY_CHECK:
+            snapshot.update(games_count=current_games_count, games_appids=current_games_appids)
+        if PLAYTIME_CHECK:
+            snapshot["playtimes"] = dict(current_games_playtimes or {})
+            snapshot["playtimes"].update(get_games_playtimes(s_played))
+            recent_playtimes = get_recent_games_playtimes(s_played)
+            snapshot["game_names"] = {appid: playtimes[0] for appid, playtimes in recent_playtimes.items()}
+            snapshot["recent_playtimes"] = {appid: playtimes[1] for appid, playtimes in recent_playtimes.items()}
+
+        if phase_profiler:
+            phase_profiler.add("parse", time.perf_counter() - parse_start_ts)
+            detect_start_ts = time.perf_counter()
+        state, events = detect_events(state, snapshot, int(clock.time()))
+        if target:
+            target.state = state
+            target.polls = polls
+            target.last_poll_ts = int(clock.time())
+        if phase_profiler:
+            phase_profiler.add("detect", time.perf_counter() - detect_start_ts)
+        username = state["username"]
+
+        for event in events:
+            events_emitted.inc((event["type"],))
+            dispatch_monitor_event(event, s_api, profile_csv_file_name, monitor_files)
+
+        # Level/XP changes and the initial friends baseline do not reset the liveness counter
+        if any(event["type"] not in ("level_change", "xp_change", "friends_baseline") for event in events):
+            alive_counter = 0
 
-            print(f"Steam user {username} changed status from {steam_personastates[status_old]} to {steam_personastates[status]}")
-            print(f"User was {steam_personastates[status_old]} for {calculate_timespan(int(status_ts), int(status_ts_old))} ({get_range_of_dates_from_tss(int(status_ts_old), int(status_ts), short=True)})")
-
-            m_subject_was_since = f", was {steam_personastates[status_old]}: {get_range_of_dates_from_tss(int(status_ts_old), int(status_ts), short=True)}"
-            m_subject_after = calculate_timespan(int(status_ts), int(status_ts_old), show_seconds=False)
-            m_body_was_since = f" ({get_range_of_dates_from_tss(int(status_ts_old), int(status_ts), short=True)})"
-
-            m_body_short_offline_msg = ""
-            m_body_inactivity_info = ""
-
-            # Track inactivity for away/snooze status changes
-            # User changed from "online" to "away" - estimate last activity as ~5 minutes before status change
-            if status_old == 1 and status == 3:  # online (1) to away (3)
-                estimated_last_activity_ts = status_ts - STEAM_AWAY_INACTIVITY_THRESHOLD
-                online_duration = status_ts - status_ts_old
-                estimated_active_duration = max(0, online_duration - STEAM_AWAY_INACTIVITY_THRESHOLD)
-                estimated_inactive_duration = min(STEAM_AWAY_INACTIVITY_THRESHOLD, online_duration)
-
-                inactivity_msg = f"User was likely active for ~{display_time(estimated_active_duration)}, then inactive for ~{display_time(estimated_inactive_duration)} before status changed to away"
-                inactivity_msg_email = f"\n\n{inactivity_msg}\n\nEstimated last activity: {get_date_from_ts(estimated_last_activity_ts)}"
-                print(inactivity_msg)
-                print(f"Estimated last activity:\t{get_date_from_ts(estimated_last_activity_ts)}")
-                m_body_inactivity_info = inactivity_msg_email
-
-            # User changed from "away" to "snooze" - total inactivity is ~5 minutes (before away) + away duration
-            elif status_old == 3 and status == 4:  # away (3) to snooze (4)
-                away_duration = status_ts - status_ts_old
-                # If we have estimated_last_activity_ts from when user went to away, use it
-                # Otherwise estimate it as away_timestamp - 5 minutes
-                if estimated_last_activity_ts > 0:
-                    total_inactivity = status_ts - estimated_last_activity_ts
-                    estimated_last_activity_display = get_date_from_ts(estimated_last_activity_ts)
-                else:
-                    # Fallback: estimate last activity as away_timestamp - 5 minutes
-                    estimated_last_activity_ts = status_ts_old - STEAM_AWAY_INACTIVITY_THRESHOLD
-                    total_inactivity = away_duration + STEAM_AWAY_INACTIVITY_THRESHOLD
-                    estimated_last_activity_display = get_date_from_ts(estimated_last_activity_ts)
-
-                inactivity_msg = f"User was likely inactive for ~{display_time(total_inactivity)} total before status changed to snooze (including ~{display_time(STEAM_AWAY_INACTIVITY_THRESHOLD)} before away status + {display_time(away_duration)} away)"
-                inactivity_msg_email = f"\n\n{inactivity_msg}\n\nEstimated last activity: {estimated_last_activity_display}"
-                print(inactivity_msg)
-                print(f"Estimated last activity:\t{estimated_last_activity_display}")
-                m_body_inactivity_info = inactivity_msg_email
-
-            # Player got online (from offline, away, or snooze)
-            if status_old == 0 and status > 0:
-                print(f"*** User got ACTIVE ! (was offline since {get_date_from_ts(status_ts_old)})")
-                game_total_after_offline_counted = False
-                estimated_last_activity_ts = 0  # Reset when user goes back online
-                if (status_ts - status_ts_old) > OFFLINE_INTERRUPT or not status_online_start_ts_old:
-                    status_online_start_ts = status_ts
-                    game_total_ts = 0
-                    games_number = 0
-                elif (status_ts - status_ts_old) <= OFFLINE_INTERRUPT and status_online_start_ts_old > 0:
-                    status_online_start_ts = status_online_start_ts_old
-                    m_body_short_offline_msg = f"\n\nShort offline interruption ({display_time(status_ts - status_ts_old)}), online start timestamp set back to {get_short_date_from_ts(status_online_start_ts_old)}"
-                    print(f"Short offline interruption ({display_time(status_ts - status_ts_old)}), online start timestamp set back to {get_short_date_from_ts(status_online_start_ts_old)}")
-                act_inact_flag = True
-            elif (status_old == 3 or status_old == 4) and status == 1:  # away (3) or snooze (4) to online (1)
-                estimated_last_activity_ts = 0  # Reset when user becomes active again
-
-            m_body_played_games = ""
-
-            # Player got offline
-            if status_old > 0 and status == 0:
-                if status_online_start_ts > 0:
-                    m_subject_after = calculate_timespan(int(status_ts), int(status_online_start_ts), show_seconds=False)
-                    online_since_msg = f"(after {calculate_timespan(int(status_ts), int(status_online_start_ts), show_seconds=False)}: {get_range_of_dates_from_tss(int(status_online_start_ts), int(status_ts), short=True)})"
-                    m_subject_was_since = f", was available: {get_range_of_dates_from_tss(int(status_online_start_ts), int(status_ts), short=True)}"
-                    m_body_was_since = f" ({get_range_of_dates_from_tss(int(status_ts_old), int(status_ts), short=True)})\n\nUser was available for {calculate_timespan(int(status_ts), int(status_online_start_ts), show_seconds=False)} ({get_range_of_dates_from_tss(int(status_online_start_ts), int(status_ts), short=True)})"
+        # Achievements unlocked (re-checked only in games whose playtime changed)
+        if ACHIEVEMENTS_CHECK:
+            current_recent_playtimes = get_recent_games_playtimes(s_played)
+            changed_games = {}
+            for appid, playtimes in current_recent_playtimes.items():
+                old_playtimes = last_recent_playtimes.get(appid)
+                if old_playtimes is None or old_playtimes[1:] != playtimes[1:]:
+                    changed_games[appid] = playtimes
+
+            unlocks, failed_appids = fetch_new_achievements(s_api, steamid, changed_games, achievements_watermarks, achievements_start_ts)
+            # Keep the old playtime of games which could not be checked, so they are retried in the next poll
+            for appid in failed_appids:
+                if appid in last_recent_playtimes:
+                    current_recent_playtimes[appid] = last_recent_playtimes[appid]
                 else:
-                    online_since_msg = ""
-                if games_number > 0:
-                    if gameid_old and not gameid:
-                        game_total_ts += (int(game_ts) - int(game_ts_old))
-                        game_total_after_offline_counted = True
-                    m_body_played_games = f"\n\nUser played {games_number} games for total time of {display_time(game_total_ts)}"
-                    print(f"User played {games_number} games for total time of {display_time(game_total_ts)}")
-                print(f"*** User got OFFLINE ! {online_since_msg}")
-                status_online_start_ts_old = status_online_start_ts
-                status_online_start_ts = 0
-                act_inact_flag = True
-
-            m_body_user_in_game = ""
-            if gameid:
-                print(f"User is currently in-game: {gamename}")
-                m_body_user_in_game = f"\n\nUser is currently in-game: {gamename}"
-
-            change = True
-
-            m_subject = f"Steam user {username} is now {steam_personastates[status]} (after {m_subject_after}{m_subject_was_since})"
-            m_body = f"Steam user {username} changed status from {steam_personastates[status_old]} to {steam_personastates[status]}\n\nUser was {steam_personastates[status_old]} for {calculate_timespan(int(status_ts), int(status_ts_old))}{m_body_was_since}{m_body_inactivity_info}{m_body_short_offline_msg}{m_body_user_in_game}{m_body_played_games}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
-            if STATUS_NOTIFICATION or (ACTIVE_INACTIVE_NOTIFICATION and act_inact_flag):
-                print(f"Sending email notification to {RECEIVER_EMAIL}")
-                send_email(m_subject, m_body, "", SMTP_SSL)
-            status_ts_old = status_ts
-            print_cur_ts("Timestamp:\t\t\t")
-
-        # Player started/stopped/changed the game
-        if gameid != gameid_old:
-
-            # User changed the game
-            if gameid_old and gameid:
-                print(f"Steam user {username} changed game from '{gamename_old}' to '{gamename}' after {calculate_timespan(int(game_ts), int(game_ts_old))}")
-                print(f"User played game from {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True, between_sep=' to ')}")
-                game_total_ts += (int(game_ts) - int(game_ts_old))
-                games_number += 1
-                m_subject = f"Steam user {username} changed game to '{gamename}' (after {calculate_timespan(int(game_ts), int(game_ts_old), show_seconds=False)}: {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True)})"
-                m_body = f"Steam user {username} changed game from '{gamename_old}' to '{gamename}' after {calculate_timespan(int(game_ts), int(game_ts_old))}\n\nUser played game from {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True, between_sep=' to ')}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
-
-            # User started playing new game
-            elif not gameid_old and gameid:
-                print(f"Steam user {username} started playing '{gamename}'")
-                games_number += 1
-                m_subject = f"Steam user {username} now plays '{gamename}'"
-                m_body = f"Steam user {username} now plays '{gamename}'{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
-
-            # User stopped playing the game
-            elif gameid_old and not gameid:
-                print(f"Steam user {username} stopped playing '{gamename_old}' after {calculate_timespan(int(game_ts), int(game_ts_old))}")
-                print(f"User played game from {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True, between_sep=' to ')}")
-                if not game_total_after_offline_counted:
-                    game_total_ts += (int(game_ts) - int(game_ts_old))
-                m_subject = f"Steam user {username} stopped playing '{gamename_old}' (after {calculate_timespan(int(game_ts), int(game_ts_old), show_seconds=False)}: {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True)})"
-                m_body = f"Steam user {username} stopped playing '{gamename_old}' after {calculate_timespan(int(game_ts), int(game_ts_old))}\n\nUser played game from {get_range_of_dates_from_tss(int(game_ts_old), int(game_ts), short=True, between_sep=' to ')}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
-
-            change = True
-
-            if GAME_CHANGE_NOTIFICATION and m_subject and m_body:
-                print(f"Sending email notification to {RECEIVER_EMAIL}")
-                send_email(m_subject, m_body, "", SMTP_SSL)
-
-            game_ts_old = game_ts
-            print_cur_ts("Timestamp:\t\t\t")
-
-        # Steam level changed
-        if STEAM_LEVEL_XP_CHECK and current_steam_level is not None:
-            try:
-                level_int = int(current_steam_level)
-            except (TypeError, ValueError):
-                level_int = None
-            try:
-                last_level_int = int(last_steam_level) if last_steam_level is not None else None
-            except (TypeError, ValueError):
-                last_level_int = None
-
-            if last_level_int is not None and level_int is not None and level_int != last_level_int:
-                delta = level_int - last_level_int
-                direction = "increased" if delta > 0 else "decreased"
-                print(f"Steam user {username} level {direction} from {last_level_int} to {level_int} (delta {delta})")
-                xp_info_str = ""
-                if current_player_xp is not None:
-                    try:
-                        xp_int_for_level = int(current_player_xp)
-                        xp_info_str = f"Total XP after level change:\t{xp_int_for_level}"
-                    except (TypeError, ValueError):
-                        xp_info_str = ""
-                if profile_csv_file_name:
-                    try:
-                        write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(time.time())), event="steam_level_change", old_value=last_level_int, new_value=level_int, delta=delta,)
-                    except Exception as e:
-                        print(f"* Error writing profile CSV: {e}")
-
-                if STEAM_LEVEL_XP_NOTIFICATION:
-                    m_subject = f"Steam user {username} level changed to {level_int}"
-                    m_body = (
-                        f"Steam user {username} level {direction} from {last_level_int} to {level_int} (delta {delta})"
-                        f"\n{xp_info_str}"
-                        f"{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
-                    )
-                    print(f"Sending email notification to {RECEIVER_EMAIL}")
-                    send_email(m_subject, m_body, "", SMTP_SSL)
-
-                print_cur_ts("Timestamp:\t\t\t")
-
-            if level_int is not None:
-                last_steam_level = level_int
-
-        # Total XP changed
-        if STEAM_LEVEL_XP_CHECK and current_player_xp is not None:
-            try:
-                xp_int = int(current_player_xp)
-            except (TypeError, ValueError):
-                xp_int = None
-            try:
-                last_xp_int = int(last_player_xp) if last_player_xp is not None else None
-            except (TypeError, ValueError):
-                last_xp_int = None
-
-            if last_xp_int is not None and xp_int is not None and xp_int != last_xp_int:
-                delta = xp_int - last_xp_int
-                direction = "increased" if delta > 0 else "decreased"
-                print(f"Steam user {username} total XP {direction} from {last_xp_int} to {xp_int} (delta {delta})")
-
-                if profile_csv_file_name:
-                    try:
-                        write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(time.time())), event="total_xp_change", old_value=last_xp_int, new_value=xp_int, delta=delta,)
-                    except Exception as e:
-                        print(f"* Error writing profile CSV: {e}")
-
-                if STEAM_LEVEL_XP_NOTIFICATION:
-                    m_subject = f"Steam user {username} total XP changed to {xp_int}"
-                    m_body = (
-                        f"Steam user {username} total XP {direction} from {last_xp_int} to {xp_int} (delta {delta})"
-                        f"{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
-                    )
-                    print(f"Sending email notification to {RECEIVER_EMAIL}")
-                    send_email(m_subject, m_body, "", SMTP_SSL)
-
-                print_cur_ts("Timestamp:\t\t\t")
-
-            if xp_int is not None:
-                last_player_xp = xp_int
-
-        # Friends list changed
-        if FRIENDS_CHECK and current_friend_ids is not None:
-            if last_friend_ids is None:
-                # Initialize baseline without treating it as a change
-                last_friend_ids = current_friend_ids
-            else:
-                added_ids = current_friend_ids - last_friend_ids
-                removed_ids = last_friend_ids - current_friend_ids
-
-                if added_ids or removed_ids:
-                    old_count = len(last_friend_ids)
-                    new_count = len(current_friend_ids)
-                    delta = new_count - old_count
-                    print(f"Steam user {username} friends count changed from {old_count} to {new_count} (delta {delta})")
+                    current_recent_playtimes.pop(appid, None)
+            last_recent_playtimes = current_recent_playtimes
+
+            if unlocks:
+                events_emitted.inc(("achievement_unlocked",), len(unlocks))
+                unlock_lines = []
+                for ach in unlocks:
+                    unlock_line = f"Steam user {username} unlocked achievement '{ach['name']}' in '{ach['game']}' ({get_date_from_ts(ach['unlocktime'])})"
+                    print(unlock_line)
+                    unlock_lines.append(unlock_line)
+                    if ach.get("description"):
+                        print(f"Description: {ach['description']}")
+                        unlock_lines.append(f"Description: {ach['description']}")
 
                     if profile_csv_file_name:
                         try:
-                            write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(time.time())), event="friends_count_change", old_value=old_count, new_value=new_count, delta=delta,)
+                            write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(clock.time())), event="achievement_unlocked", new_value=ach['name'], appid=ach['appid'], game_name=ach['game'])
                         except Exception as e:
                             print(f"* Error writing profile CSV: {e}")
 
-                    added_details = []
-                    removed_details = []
-
-                    def _fetch_friend_summaries(id_set):
-                        if not id_set:
-                            return []
-                        summaries = []
-                        ids_list = list(id_set)
-                        chunk_size = 100
-                        for i in range(0, len(ids_list), chunk_size):
-                            chunk = ids_list[i:i + chunk_size]
-                            try:
-                                resp = s_api.call('ISteamUser.GetPlayerSummaries', steamids=",".join(chunk))
-                                players = resp.get('response', {}).get('players', [])
-                                summaries.extend(players)
-                            except Exception:
-                                continue
-                        return summaries
-
-                    added_players = []
-                    removed_players = []
-
-                    try:
-                        added_players = _fetch_friend_summaries(added_ids)
-                        added_map = {p.get('steamid'): p for p in added_players}
-                        for sid in added_ids:
-                            p = added_map.get(sid, {})
-                            persona = p.get('personaname') or ""
-                            real = p.get('realname') or ""
-                            if profile_csv_file_name:
-                                try:
-                                    write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(time.time())), event="friend_added", friend_steamid=sid, friend_persona=persona, friend_realname=real,)
-                                except Exception as e:
-                                    print(f"* Error writing profile CSV: {e}")
-                            if real:
-                                added_details.append(f"- {persona} ({real}) [{sid}]")
-                            else:
-                                added_details.append(f"- {persona or sid} [{sid}]")
-                    except Exception:
-                        pass
-
-                    try:
-                        removed_players = _fetch_friend_summaries(removed_ids)
-                        removed_map = {p.get('steamid'): p for p in removed_players}
-                        for sid in removed_ids:
-                            p = removed_map.get(sid, {})
-                            persona = p.get('personaname') or ""
-                            real = p.get('realname') or ""
-                            if profile_csv_file_name:
-                                try:
-                                    write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(time.time())), event="friend_removed", friend_steamid=sid, friend_persona=persona, friend_realname=real,)
-                                except Exception as e:
-                                    print(f"* Error writing profile CSV: {e}")
-                            if real:
-                                removed_details.append(f"- {persona} ({real}) [{sid}]")
-                            else:
-                                removed_details.append(f"- {persona or sid} [{sid}]")
-                    except Exception:
-                        pass
-
-                    if added_details:
-                        print("New friends added:")
-                        for line in added_details:
-                            print(line)
-                    if removed_details:
-                        print("Friends removed:")
-                        for line in removed_details:
-                            print(line)
-
-                    if FRIENDS_NOTIFICATION:
-                        m_subject_friends = f"Steam user {username} friends list changed (now {new_count})"
-                        body_lines = [
-                            f"Steam user {username} friends count changed from {old_count} to {new_count} (delta {delta})",
-                        ]
-                        if added_details:
-                            body_lines.append("\nNew friends added:")
-                            body_lines.extend(added_details)
-                        if removed_details:
-                            body_lines.append("\nFriends removed:")
-                            body_lines.extend(removed_details)
-                        m_body_friends = "\n".join(body_lines) + get_cur_ts(nl_ch + nl_ch + "Timestamp: ")
-                        print(f"Sending email notification to {RECEIVER_EMAIL}")
-                        send_email(m_subject_friends, m_body_friends, "", SMTP_SSL)
-
-                    print_cur_ts("Timestamp:\t\t\t")
-
-                    alive_counter = 0
-                    last_friend_ids = current_friend_ids
-
-        # Games library changed
-        if GAMES_LIBRARY_CHECK and current_games_count is not None and current_games_appids is not None:
-            if last_games_count is None or last_games_appids is None:
-                last_games_count = current_games_count
-                last_games_appids = set(current_games_appids)
-            else:
-                count_changed = current_games_count != last_games_count
-                appids_changed = current_games_appids != last_games_appids
-                if count_changed or appids_changed:
-                    old_count = last_games_count
-                    new_count = current_games_count
-                    delta = new_count - old_count
-                    added_appids = sorted(current_games_appids - last_games_appids)
-                    removed_appids = sorted(last_games_appids - current_games_appids)
-
-                    if delta != 0:
-                        delta_str = f"+{delta}" if delta > 0 else str(delta)
-                        print(f"Steam user {username} games library changed from {old_count} to {new_count} ({delta_str})")
+                if ACHIEVEMENTS_NOTIFICATION:
+                    if len(unlocks) == 1:
+                        m_subject_ach = f"Steam user {username} unlocked achievement '{unlocks[0]['name']}' in '{unlocks[0]['game']}'"
                     else:
-                        print(f"Steam user {username} games library changed (same count: {new_count}, titles changed)")
-
-                    if added_appids:
-                        print(f"Added: {', '.join(str(a) for a in added_appids)}")
-                    if removed_appids:
-                        print(f"Removed: {', '.join(str(a) for a in removed_appids)}")
-
-                    try:
-                        with open(steam_games_file, 'w', encoding="utf-8") as f:
-                            json.dump({"game_count": new_count, "appids": sorted(current_games_appids)}, f, indent=2)
-                    except Exception as e:
-                        print(f"* Cannot save games library to '{steam_games_file}': {e}")
-
-                    if profile_csv_file_name:
-                        try:
-                            write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(time.time())), event="games_library_change", old_value=old_count, new_value=new_count, delta=delta,)
-                        except Exception as e:
-                            print(f"* Error writing profile CSV: {e}")
-
-                    if GAMES_LIBRARY_NOTIFICATION:
-                        m_subject_games = f"Steam user {username} games library changed (now {new_count})"
-                        body_parts = []
-                        if delta != 0:
-                            delta_str = f"+{delta}" if delta > 0 else str(delta)
-                            body_parts.append(f"Steam user {username} games library changed from {old_count} to {new_count} ({delta_str})")
-                        else:
-                            body_parts.append(f"Steam user {username} games library changed (same count: {new_count}, titles changed)")
-                        if added_appids:
-                            body_parts.append(f"Added: {', '.join(str(a) for a in added_appids)}")
-                        if removed_appids:
-                            body_parts.append(f"Removed: {', '.join(str(a) for a in removed_appids)}")
-                        m_body_games = "\n".join(body_parts) + get_cur_ts(nl_ch + nl_ch + "Timestamp: ")
-                        print(f"Sending email notification to {RECEIVER_EMAIL}")
-                        send_email(m_subject_games, m_body_games, "", SMTP_SSL)
-
-                    print_cur_ts("Timestamp:\t\t\t")
-                    alive_counter = 0
-                    last_games_count = current_games_count
-                    last_games_appids = set(current_games_appids)
-
-        # Display (persona) name changed
-        if current_username and current_username != username:
-            old_name = username
-            new_name = current_username
-            print(f"Steam user {old_name} changed display name to {new_name}")
-
-            if profile_csv_file_name:
-                try:
-                    write_profile_csv_entry(profile_csv_file_name, date=datetime.fromtimestamp(int(time.time())), event="name_change", old_value=old_name, new_value=new_name)
-                except Exception as e:
-                    print(f"* Error writing profile CSV: {e}")
-
-            if NAME_CHANGE_NOTIFICATION:
-                m_subject_name = f"Steam user {old_name} changed display name to {new_name}"
-                m_body_name = f"Steam user {old_name} changed display name to {new_name}{get_cur_ts(nl_ch + nl_ch + 'Timestamp: ')}"
-                print(f"Sending email notification to {RECEIVER_EMAIL}")
-                send_email(m_subject_name, m_body_name, "", SMTP_SSL)
-
-            print_cur_ts("Timestamp:\t\t\t")
-            alive_counter = 0
-
-            # Adopt the new display name for subsequent notifications and output
-            username = current_username
+                        m_subject_ach = f"Steam user {username} unlocked {len(unlocks)} achievements"
+                    m_body_ach = "\n".join(unlock_lines) + get_cur_ts(nl_ch + nl_ch + "Timestamp: ")
+                    print(f"Sending email notification to {RECEIVER_EMAIL}")
+                    send_email(m_subject_ach, m_body_ach, "", SMTP_SSL)
 
-        if change:
-            alive_counter = 0
+                print_cur_ts("Timestamp:\t\t\t")
+                alive_counter = 0
 
+        if any(event["type"] in ("status_change", "game_change") for event in events):
             try:
                 if csv_file_name:
-                    write_csv_entry(csv_file_name, datetime.fromtimestamp(int(time.time())), steam_personastates[status], gamename, gameid)
+                    write_csv_entry(csv_file_name, datetime.fromtimestamp(int(clock.time())), steam_personastates[status], gamename, gameid)
             except Exception as e:
                 print(f"* Error: {e}")
 
-        status_old = status
-        gameid_old = gameid
-        gamename_old = gamename
         alive_counter += 1
 
         if LIVENESS_CHECK_COUNTER and alive_counter >= LIVENESS_CHECK_COUNTER and status == 0:
+            print(f"* API requests since start:\t{format_api_call_stats(polls)}")
+            print(f"* API concurrency limit:\t{format_concurrency_stats()}")
+            breakers_str = format_circuit_breakers()
+            if breakers_str:
+                print(f"* API circuit breakers:\t\t{breakers_str}")
             print_cur_ts("Liveness check, timestamp:\t")
             alive_counter = 0
 
-        if status > 0:
-            time.sleep(STEAM_ACTIVE_CHECK_INTERVAL)
-        else:
-            time.sleep(STEAM_CHECK_INTERVAL)
+        if phase_profiler:
+            phase_profiler.add("poll", time.perf_counter() - poll_start_ts)
+            profile_report = phase_profiler.take_report()
+            if profile_report:
+                print(profile_report)
+                print_cur_ts("Timestamp:\t\t\t")
+
+        if once:
+            save_monitor_state(state_file, state, {"files": monitor_files, "recently_played_ts": recently_played_ts, "recent_playtimes": last_recent_playtimes, "achievements_watermarks": achievements_watermarks, "achievements_start_ts": achievements_start_ts})
+            return
+
+        sleep_interval = STEAM_ACTIVE_CHECK_INTERVAL if status > 0 else STEAM_CHECK_INTERVAL
+        poll_due_ts = clock.time() + sleep_interval
+        if not wait_for_next_poll(target, sleep_interval):
+            return
+
+
+# Runs the monitoring of the user on a virtual clock against a steam_fake_api.py scenario (JSON) or responses
+# recorded with steam_fake_api.py --record (JSON lines), so the given duration (in seconds) runs at full CPU speed
+def run_simulation(steamid, simulation_file, duration, csv_file_name, profile_csv_file_name=None):
+    global clock, simulated_webapi, circuit_breakers, _api_rate_limiter, _concurrency_limiter
+    import steam_fake_api
+
+    start_ts = int(time.time())
+    virtual_clock = VirtualClock(start_ts, start_ts + duration)
+    if os.path.isfile(simulation_file + ".idx"):
+        api = steam_fake_api.ReplayApi(snapshot_replay_records(simulation_file))
+    else:
+        with open(simulation_file, "r", encoding="utf-8") as f:
+            if simulation_file.endswith(".jsonl"):
+                api = steam_fake_api.ReplayApi(json.loads(line) for line in f if line.strip())
+            else:
+                api = steam_fake_api.FakeSteamApi(json.load(f), clock=virtual_clock.time, sleep=virtual_clock.sleep, monotonic=virtual_clock.monotonic)
+
+    # Rate limiter, concurrency limiter and circuit breakers keep timestamps, so the simulation gets its own ones
+    saved_throttling = (circuit_breakers, _api_rate_limiter, _concurrency_limiter)
+    circuit_breakers, _api_rate_limiter, _concurrency_limiter = {}, None, None
+    clock = virtual_clock
+    simulated_webapi = steam_fake_api.LocalWebAPI(api)
+    real_start_ts = time.monotonic()
+    try:
+        steam_monitor_user(steamid, csv_file_name, profile_csv_file_name)
+    except SimulationFinished:
+        pass
+    finally:
+        clock = time
+        simulated_webapi = None
+        circuit_breakers, _api_rate_limiter, _concurrency_limiter = saved_throttling
+
+    print(f"* Simulated {display_time(duration)} of monitoring in {time.monotonic() - real_start_ts:.2f} seconds ({api_call_counts.get('ISteamUser.GetPlayerSummaries', 0)} polls, {sum(api_call_counts.values())} API requests)")
 
 
 def main():
-    global CLI_CONFIG_PATH, DOTENV_FILE, LIVENESS_CHECK_COUNTER, STEAM_API_KEY, CSV_FILE, PROFILE_CSV_FILE, DISABLE_LOGGING, ST_LOGFILE, ACTIVE_INACTIVE_NOTIFICATION, GAME_CHANGE_NOTIFICATION, STATUS_NOTIFICATION, NAME_CHANGE_NOTIFICATION, ERROR_NOTIFICATION, STEAM_LEVEL_XP_CHECK, STEAM_LEVEL_XP_NOTIFICATION, FRIENDS_CHECK, FRIENDS_NOTIFICATION, GAMES_LIBRARY_CHECK, GAMES_LIBRARY_NOTIFICATION, STEAM_CHECK_INTERVAL, STEAM_ACTIVE_CHECK_INTERVAL, FILE_SUFFIX, SMTP_PASSWORD, stdout_bck, COLORED_OUTPUT, COLOR_THEME
+    global CLI_CONFIG_PATH, DOTENV_FILE, LIVENESS_CHECK_COUNTER, STEAM_API_KEY, STEAM_API_URL, CSV_FILE, PROFILE_CSV_FILE, SNAPSHOT_FILE, METRICS_PORT, CONTROL_PORT, DISABLE_LOGGING, phase_profiler, cprofile_profiler, cprofile_dump_file, ST_LOGFILE, ACTIVE_INACTIVE_NOTIFICATION, GAME_CHANGE_NOTIFICATION, STATUS_NOTIFICATION, NAME_CHANGE_NOTIFICATION, ERROR_NOTIFICATION, STEAM_LEVEL_XP_CHECK, STEAM_LEVEL_XP_NOTIFICATION, FRIENDS_CHECK, FRIENDS_NOTIFICATION, GAMES_LIBRARY_CHECK, GAMES_LIBRARY_NOTIFICATION, ACHIEVEMENTS_CHECK, ACHIEVEMENTS_NOTIFICATION, PLAYTIME_CHECK, STEAM_CHECK_INTERVAL, STEAM_ACTIVE_CHECK_INTERVAL, FILE_SUFFIX, SMTP_PASSWORD, stdout_bck, COLORED_OUTPUT, COLOR_THEME
 
     if "--generate-config" in sys.argv:
         config_content = CONFIG_BLOCK.strip("\n") + "\n"
@@ -2526,6 +5194,28 @@ def main():
         type=str,
         help="Use Steam community URL & resolve it to Steam64 ID"
     )
+    creds.add_argument(
+        "--api-url",
+        dest="api_url",
+        metavar="URL",
+        type=str,
+        help="Base URL of the Steam Web API, e.g. http://127.0.0.1:8765 for a local steam_fake_api.py server"
+    )
+    creds.add_argument(
+        "--simulate",
+        dest="simulate",
+        metavar="FILE",
+        type=str,
+        help="Simulate monitoring on a virtual clock at full speed against a steam_fake_api.py scenario (JSON) or recorded responses (JSONL or --snapshot-file)"
+    )
+    creds.add_argument(
+        "--simulate-duration",
+        dest="simulate_duration",
+        metavar="SECONDS",
+        type=int,
+        default=604800,
+        help="Simulated monitoring time when used with --simulate (default: 604800, one week)"
+    )
 
     # Notifications
     notify = parser.add_argument_group("Notifications")
@@ -2578,6 +5268,13 @@ def main():
         default=None,
         help="Email when games library changes (requires --check-games or GAMES_LIBRARY_CHECK=True)"
     )
+    notify.add_argument(
+        "--notify-achievements",
+        dest="notify_achievements",
+        action="store_true",
+        default=None,
+        help="Email when user unlocks an achievement (requires --check-achievements or ACHIEVEMENTS_CHECK=True)"
+    )
     notify.add_argument(
         "-e", "--no-error-notify",
         dest="notify_errors",
@@ -2625,6 +5322,27 @@ def main():
         type=int,
         help="When used with --achievements, limit number of recent achievements to display (default: 10)"
     )
+    info.add_argument(
+        "--batch-info",
+        dest="batch_info",
+        metavar="FILE",
+        type=str,
+        help="Get details of many users listed in FILE (Steam64 IDs or community URLs, one per line) and save them, then exit"
+    )
+    info.add_argument(
+        "--batch-output",
+        dest="batch_output",
+        metavar="FILE",
+        type=str,
+        help="When used with --batch-info, file to write the results to (default: steam_batch_info.jsonl or .csv)"
+    )
+    info.add_argument(
+        "--batch-format",
+        dest="batch_format",
+        choices=["jsonl", "csv"],
+        default="jsonl",
+        help="When used with --batch-info, output format: JSON lines or CSV (default: jsonl)"
+    )
     info.add_argument(
         "--achievements-all-games",
         dest="achievements_use_owned_games",
@@ -2632,6 +5350,44 @@ def main():
         help="When used with --achievements, check all owned games instead of only recently played games. "
              "Useful for users who haven't played recently, as their recently played list may be limited."
     )
+    # Friends graph
+    graph = parser.add_argument_group("Friends graph")
+    graph.add_argument(
+        "--crawl-friends",
+        dest="crawl_friends",
+        action="store_true",
+        help="Crawl the friends graph around the user (friends of friends) and save it as an index, then exit"
+    )
+    graph.add_argument(
+        "--crawl-depth",
+        dest="crawl_depth",
+        metavar="HOPS",
+        type=int,
+        default=2,
+        help="When used with --crawl-friends, number of hops to crawl (default: 2)"
+    )
+    graph.add_argument(
+        "--graph-dir",
+        dest="graph_dir",
+        metavar="PATH",
+        type=str,
+        help="Directory of the friends graph index (default: steam_graph_<steam64_id>)"
+    )
+    graph.add_argument(
+        "--mutual-friends",
+        dest="mutual_friends",
+        metavar="STEAM64_ID",
+        type=int,
+        help="List mutual friends of the user and STEAM64_ID using the saved friends graph, then exit"
+    )
+    graph.add_argument(
+        "--shortest-path",
+        dest="shortest_path",
+        metavar="STEAM64_ID",
+        type=int,
+        help="Display the shortest friends path between the user and STEAM64_ID using the saved friends graph, then exit"
+    )
+
     # Intervals & timers
     times = parser.add_argument_group("Intervals & timers")
     times.add_argument(
@@ -2648,6 +5404,13 @@ def main():
         type=int,
         help="Polling interval when user is online"
     )
+    times.add_argument(
+        "--once",
+        dest="once",
+        action="store_true",
+        default=None,
+        help="Poll the user once, report changes since the previous run (state kept in steam_<steam64_id>_state.json), then exit; for cron or systemd timers"
+    )
 
     # Features & Output
     opts = parser.add_argument_group("Features & output")
@@ -2672,6 +5435,29 @@ def main():
         default=None,
         help="Track changes in games library (game count); uses minimal API data (no names/icons)"
     )
+    opts.add_argument(
+        "--check-playtime",
+        dest="check_playtime",
+        action="store_true",
+        default=None,
+        help="Track per-game playtime changes (no extra API calls; more accurate with --check-games)"
+    )
+    opts.add_argument(
+        "--update-app-index",
+        dest="update_app_index",
+        metavar="APP_LIST_FILE",
+        nargs="?",
+        const="",
+        type=str,
+        help="Build the local AppID to game name index (from a JSON app list dump if provided, otherwise via Steam Web API), then exit"
+    )
+    opts.add_argument(
+        "--check-achievements",
+        dest="check_achievements",
+        action="store_true",
+        default=None,
+        help="Track achievements unlocked by the user (checked only for games with changed playtime)"
+    )
     opts.add_argument(
         "-b", "--csv-file",
         dest="csv_file",
@@ -2686,6 +5472,64 @@ def main():
         type=str,
         help="Write profile changes (Steam level/XP and friends) to a separate CSV"
     )
+    opts.add_argument(
+        "--snapshot-file",
+        dest="snapshot_file",
+        metavar="FILENAME",
+        type=str,
+        help="Record raw Steam Web API responses to a compact delta-encoded file (replay with --simulate)"
+    )
+    opts.add_argument(
+        "--snapshot-dump",
+        dest="snapshot_dump",
+        metavar="FILENAME",
+        type=str,
+        help="Print responses recorded with --snapshot-file as JSON lines, then exit"
+    )
+    opts.add_argument(
+        "--snapshot-since",
+        dest="snapshot_since",
+        metavar="TIMESTAMP",
+        type=float,
+        help="Print only responses recorded at or after the Unix timestamp (with --snapshot-dump)"
+    )
+    opts.add_argument(
+        "--snapshot-until",
+        dest="snapshot_until",
+        metavar="TIMESTAMP",
+        type=float,
+        help="Print only responses recorded at or before the Unix timestamp (with --snapshot-dump)"
+    )
+    opts.add_argument(
+        "--metrics-port",
+        dest="metrics_port",
+        metavar="PORT",
+        type=int,
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics (see METRICS_HOST)"
+    )
+    opts.add_argument(
+        "--control-port",
+        dest="control_port",
+        metavar="PORT",
+        type=int,
+        help="Serve the JSON control endpoint on http://127.0.0.1:PORT to change settings, force polls and add/remove monitored users at runtime (see CONTROL_HOST)"
+    )
+    opts.add_argument(
+        "--profile",
+        dest="profile",
+        metavar="SECONDS",
+        nargs="?",
+        const=600,
+        type=int,
+        help="Time each phase of the poll cycle (API fetch per endpoint, parse, detect, render, log, CSV, notify) and print a breakdown every SECONDS (default: 600)"
+    )
+    opts.add_argument(
+        "--profile-dump",
+        dest="profile_dump",
+        metavar="FILENAME",
+        type=str,
+        help="Run under cProfile and save pstats snapshots to FILENAME_<date>_<time>.pstats on SIGPROF and at exit"
+    )
     opts.add_argument(
         "-y", "--file-suffix",
         dest="file_suffix",
@@ -2715,7 +5559,7 @@ def main():
         sys.exit(1)
 
     # Allow empty targets if utility flags are used
-    if not args.steam64_id and not args.resolve_community_url:
+    if not args.steam64_id and not args.resolve_community_url and not args.batch_info and args.update_app_index is None and not args.snapshot_dump:
         utility_flags = {
             "--no-color", "-h", "--help",
             "--version", "--generate-config",
@@ -2746,6 +5590,8 @@ def main():
             print(f"* Error loading config file '{cfg_path}': {e}")
             sys.exit(1)
 
+    remember_loaded_config(cfg_path)
+
     if args.env_file:
         DOTENV_FILE = os.path.expanduser(args.env_file)
     else:
@@ -2778,8 +5624,27 @@ def main():
             val = os.getenv(secret)
             if val is not None:
                 globals()[secret] = val
+                loaded_config[secret] = val
+
+    # Handle snapshot dump mode - print recorded API responses and exit
+    if args.snapshot_dump:
+        try:
+            for snapshot in read_snapshots(os.path.expanduser(args.snapshot_dump), args.snapshot_since, args.snapshot_until):
+                print(json.dumps(snapshot, ensure_ascii=False))
+        except Exception as e:
+            print(f"* Error: Cannot read snapshot file '{args.snapshot_dump}': {e}")
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.api_url:
+        STEAM_API_URL = args.api_url
 
-    if not check_internet():
+    if args.once and args.simulate:
+        print("* Error: --once cannot be used with --simulate")
+        sys.exit(1)
+
+    # In --once mode the connectivity check is skipped to keep the start fast, the poll itself reports any errors
+    if not args.simulate and not args.once and not check_internet(STEAM_API_URL if args.api_url else CHECK_INTERNET_URL):
         sys.exit(1)
 
     if args.send_test_email:
@@ -2793,6 +5658,9 @@ def main():
     if args.steam_api_key:
         STEAM_API_KEY = args.steam_api_key
 
+    if args.simulate and (not STEAM_API_KEY or STEAM_API_KEY == "your_steam_web_api_key"):
+        STEAM_API_KEY = "simulation"
+
     if not STEAM_API_KEY or STEAM_API_KEY == "your_steam_web_api_key":
         print("* Error: STEAM_API_KEY (-u / --steam_api_key) value is empty or incorrect")
         sys.exit(1)
@@ -2804,6 +5672,25 @@ def main():
     if args.active_interval:
         STEAM_ACTIVE_CHECK_INTERVAL = args.active_interval
 
+    # Handle app index update - build the AppID to game name index and exit
+    if args.update_app_index is not None:
+        try:
+            update_app_index(os.path.expanduser(args.update_app_index) if args.update_app_index else None)
+        except Exception as e:
+            print(f"* Error: Cannot build app index: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
+    # Handle batch info mode - fetch details of all users from the file and exit
+    if args.batch_info:
+        batch_output = os.path.expanduser(args.batch_output) if args.batch_output else f"steam_batch_info.{args.batch_format}"
+        try:
+            run_batch_info(os.path.expanduser(args.batch_info), batch_output, args.batch_format)
+        except Exception as e:
+            print(f"* Error: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
     s_id = 0
     if args.steam64_id:
         s_id = int(args.steam64_id)
@@ -2811,10 +5698,13 @@ def main():
     if args.resolve_community_url:
         print(f"* Resolving Steam community URL to Steam64 ID: {args.resolve_community_url}\n")
         try:
-            s_id = resolve_steam_community_url(args.resolve_community_url, STEAM_API_KEY)
+            s_id = resolve_steam_community_url(args.resolve_community_url, STEAM_API_KEY, cache=get_vanity_cache())
         except ValueError as e:
             print(f"* Error: {e}")
             sys.exit(1)
+        finally:
+            if get_vanity_cache():
+                get_vanity_cache().save()
 
     if not s_id:
         # Check should have been handled earlier by the utility_flags logic
@@ -2849,6 +5739,26 @@ def main():
             print(f"* Error: Profile CSV file cannot be opened for writing: {e}")
             sys.exit(1)
 
+    if args.snapshot_file:
+        SNAPSHOT_FILE = args.snapshot_file
+
+    if SNAPSHOT_FILE:
+        try:
+            get_snapshot_recorder()
+        except Exception as e:
+            print(f"* Error: Snapshot file cannot be opened for writing: {e}")
+            sys.exit(1)
+
+    if args.metrics_port is not None:
+        METRICS_PORT = args.metrics_port
+
+    if args.control_port is not None:
+        CONTROL_PORT = args.control_port
+
+    if CONTROL_PORT and (args.once or args.simulate):
+        print("* Error: The control endpoint cannot be used with --once or --simulate")
+        sys.exit(1)
+
     if args.file_suffix:
         FILE_SUFFIX = args.file_suffix
     else:
@@ -2885,6 +5795,54 @@ def main():
         sys.stdout = stdout_bck
         sys.exit(0)
 
+    # Handle friends graph modes - crawl the graph or query the saved index and exit
+    if args.crawl_friends or args.mutual_friends or args.shortest_path:
+        graph_dir = os.path.expanduser(args.graph_dir) if args.graph_dir else f"steam_graph_{s_id}"
+
+        if args.crawl_friends:
+            if args.crawl_depth < 1:
+                print("* Error: --crawl-depth must be at least 1")
+                sys.exit(1)
+            print(f"* Crawling friends graph of Steam user with ID '{colorize('steam_id', str(s_id))}' (depth: {args.crawl_depth})\n")
+            try:
+                meta = crawl_friends_graph(s_id, args.crawl_depth, graph_dir)
+            except Exception as e:
+                print(f"* Error: {e}")
+                sys.exit(1)
+            print(f"\n* Friends graph saved to '{graph_dir}': {meta['nodes']} users, {meta['edges']} friendships ({meta['private']} private friends lists)")
+            if meta["truncated"]:
+                print(f"* Warning: crawl was limited to {CRAWL_MAX_NODES} users (CRAWL_MAX_NODES)")
+
+        if args.mutual_friends or args.shortest_path:
+            try:
+                graph = load_friends_graph(graph_dir)
+            except Exception as e:
+                print(f"* Error: Cannot load friends graph from '{graph_dir}': {e}")
+                sys.exit(1)
+
+            if args.mutual_friends:
+                mutual = graph_mutual_friends(graph, s_id, args.mutual_friends)
+                print(f"\nMutual friends of {format_graph_user(graph, s_id)} and {format_graph_user(graph, args.mutual_friends)} ({len(mutual)}):")
+                for sid in mutual:
+                    print(f"- {format_graph_user(graph, sid)}")
+                partial = [sid for sid in (s_id, args.mutual_friends) if not graph_is_expanded(graph, sid)]
+                if partial:
+                    print(f"* Warning: the list may be incomplete, friends lists of {', '.join(format_graph_user(graph, sid) for sid in partial)} were not fetched during the crawl (private or beyond --crawl-depth)")
+
+            if args.shortest_path:
+                path = graph_shortest_path(graph, s_id, args.shortest_path)
+                if path is None:
+                    print(f"\n* No path found between {format_graph_user(graph, s_id)} and {format_graph_user(graph, args.shortest_path)} in the friends graph")
+                else:
+                    print(f"\nShortest friends path ({len(path) - 1} hops):")
+                    for i, sid in enumerate(path):
+                        print(f"{i} {format_graph_user(graph, sid)}")
+
+            close_friends_graph(graph)
+
+        sys.stdout = stdout_bck
+        sys.exit(0)
+
     if args.notify_active_inactive is True:
         ACTIVE_INACTIVE_NOTIFICATION = True
 
@@ -2911,8 +5869,15 @@ def main():
         GAMES_LIBRARY_CHECK = True
     if getattr(args, "notify_games", None) is True:
         GAMES_LIBRARY_NOTIFICATION = True
-
-    if SMTP_HOST.startswith("your_smtp_server_"):
+    if args.check_achievements is True:
+        ACHIEVEMENTS_CHECK = True
+    if args.notify_achievements is True:
+        ACHIEVEMENTS_NOTIFICATION = True
+    if args.check_playtime is True:
+        PLAYTIME_CHECK = True
+
+    # No email notifications are sent in simulation mode
+    if SMTP_HOST.startswith("your_smtp_server_") or args.simulate:
         ACTIVE_INACTIVE_NOTIFICATION = False
         GAME_CHANGE_NOTIFICATION = False
         STATUS_NOTIFICATION = False
@@ -2921,19 +5886,51 @@ def main():
         STEAM_LEVEL_XP_NOTIFICATION = False
         FRIENDS_NOTIFICATION = False
         GAMES_LIBRARY_NOTIFICATION = False
+        ACHIEVEMENTS_NOTIFICATION = False
 
     print(f"* Steam polling intervals:\t[offline: {display_time(STEAM_CHECK_INTERVAL)}] [online: {display_time(STEAM_ACTIVE_CHECK_INTERVAL)}]")
-    print(f"* Email notifications:\t\t[online/offline status changes = {ACTIVE_INACTIVE_NOTIFICATION}] [game changes = {GAME_CHANGE_NOTIFICATION}]\n*\t\t\t\t[all status changes = {STATUS_NOTIFICATION}] [level/XP changes = {STEAM_LEVEL_XP_NOTIFICATION}]\n*\t\t\t\t[friends changes = {FRIENDS_NOTIFICATION}] [games library = {GAMES_LIBRARY_NOTIFICATION}]\n*\t\t\t\t[name changes = {NAME_CHANGE_NOTIFICATION}] [errors = {ERROR_NOTIFICATION}]")
+    print(f"* Email notifications:\t\t[online/offline status changes = {ACTIVE_INACTIVE_NOTIFICATION}] [game changes = {GAME_CHANGE_NOTIFICATION}]\n*\t\t\t\t[all status changes = {STATUS_NOTIFICATION}] [level/XP changes = {STEAM_LEVEL_XP_NOTIFICATION}]\n*\t\t\t\t[friends changes = {FRIENDS_NOTIFICATION}] [games library = {GAMES_LIBRARY_NOTIFICATION}]\n*\t\t\t\t[achievements = {ACHIEVEMENTS_NOTIFICATION}] [name changes = {NAME_CHANGE_NOTIFICATION}]\n*\t\t\t\t[errors = {ERROR_NOTIFICATION}]")
     print(f"* Liveness check:\t\t{bool(LIVENESS_CHECK_INTERVAL)}" + (f" ({display_time(LIVENESS_CHECK_INTERVAL)})" if LIVENESS_CHECK_INTERVAL else ""))
     print(f"* Level/XP tracking enabled:\t{STEAM_LEVEL_XP_CHECK}")
     print(f"* Friends tracking enabled:\t{FRIENDS_CHECK}")
     print(f"* Games tracking enabled:\t{GAMES_LIBRARY_CHECK}")
+    print(f"* Achievements tracking enabled:\t{ACHIEVEMENTS_CHECK}")
+    print(f"* Playtime tracking enabled:\t{PLAYTIME_CHECK}")
     print(f"* CSV logging enabled:\t\t{bool(CSV_FILE)}" + (f" ({CSV_FILE})" if CSV_FILE else ""))
     print(f"* Profile CSV logging enabled:\t{bool(PROFILE_CSV_FILE)}" + (f" ({PROFILE_CSV_FILE})" if PROFILE_CSV_FILE else ""))
+    print(f"* API snapshots enabled:\t{bool(SNAPSHOT_FILE)}" + (f" ({SNAPSHOT_FILE})" if SNAPSHOT_FILE else ""))
+    print(f"* Metrics endpoint enabled:\t{bool(METRICS_PORT)}" + (f" (http://{METRICS_HOST}:{METRICS_PORT}/metrics)" if METRICS_PORT else ""))
+    print(f"* Control endpoint enabled:\t{bool(CONTROL_PORT)}" + (f" (http://{CONTROL_HOST}:{CONTROL_PORT}/state)" if CONTROL_PORT else ""))
     print(f"* Output logging enabled:\t{not DISABLE_LOGGING}" + (f" ({FINAL_LOG_PATH})" if not DISABLE_LOGGING else ""))
     print(f"* Configuration file:\t\t{cfg_path}")
     print(f"* Dotenv file:\t\t\t{env_path or 'None'}")
 
+    if args.profile is not None:
+        phase_profiler = PhaseProfiler(max(1, args.profile))
+        print(f"* Poll phase timings are printed every {display_time(max(1, args.profile))}")
+
+    if args.profile_dump:
+        import cProfile
+        cprofile_dump_file = os.path.expanduser(args.profile_dump)
+        cprofile_profiler = cProfile.Profile()
+        cprofile_profiler.enable()
+        atexit.register(dump_cprofile_stats)
+        print("* cProfile statistics are saved on exit" + (" and on SIGPROF signal" if platform.system() != 'Windows' else ""))
+
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_HOST, METRICS_PORT)
+        except Exception as e:
+            print(f"* Error: Cannot start metrics endpoint on {METRICS_HOST}:{METRICS_PORT}: {e}")
+            sys.exit(1)
+
+    if CONTROL_PORT:
+        try:
+            start_control_server(CONTROL_HOST, CONTROL_PORT)
+        except Exception as e:
+            print(f"* Error: Cannot start control endpoint on {CONTROL_HOST}:{CONTROL_PORT}: {e}")
+            sys.exit(1)
+
     out = f"\nMonitoring user with Steam64 ID {colorize('steam_id', str(s_id))}"
     print(colorize("header", out))
     print("-" * len(out))
@@ -2944,16 +5941,33 @@ def main():
         signal.signal(signal.SIGUSR2, toggle_game_change_notifications_signal_handler)
         signal.signal(signal.SIGCONT, toggle_all_status_changes_notifications_signal_handler)
         signal.signal(signal.SIGURG, toggle_level_xp_notifications_signal_handler)
-        signal.signal(signal.SIGPIPE, toggle_friends_notifications_signal_handler)
+        # The control endpoint replaces SIGPIPE and SIGABRT, whose handlers would also be run by a client closing its
+        # connection early and by abort() respectively
+        if not CONTROL_PORT:
+            signal.signal(signal.SIGPIPE, toggle_friends_notifications_signal_handler)
         signal.signal(signal.SIGVTALRM, toggle_name_change_notifications_signal_handler)
         signal.signal(signal.SIGTRAP, increase_active_check_signal_handler)
-        signal.signal(signal.SIGABRT, decrease_active_check_signal_handler)
-        signal.signal(signal.SIGHUP, reload_secrets_signal_handler)
-
-    steam_monitor_user(s_id, CSV_FILE, PROFILE_CSV_FILE)
+        if not CONTROL_PORT:
+            signal.signal(signal.SIGABRT, decrease_active_check_signal_handler)
+        signal.signal(signal.SIGHUP, reload_config_signal_handler)
+        if cprofile_profiler:
+            signal.signal(signal.SIGPROF, dump_cprofile_signal_handler)
+
+    exit_code = 0
+    if args.simulate:
+        run_simulation(s_id, os.path.expanduser(args.simulate), args.simulate_duration, CSV_FILE, PROFILE_CSV_FILE)
+    elif CONTROL_PORT:
+        # Users are monitored in background threads, so more can be added with the control endpoint; the tool exits
+        # once the monitoring of all of them has stopped
+        primary_target = start_monitor_target(s_id, CSV_FILE, PROFILE_CSV_FILE)
+        while not monitor_targets_done.wait(1):
+            pass
+        exit_code = primary_target.exit_code
+    else:
+        steam_monitor_user(s_id, CSV_FILE, PROFILE_CSV_FILE, once=bool(args.once))
 
     sys.stdout = stdout_bck
-    sys.exit(0)
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+spec = importlib.util.spec_from_file_location("run_benchmarks", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "run_benchmarks.py"))
+run_benchmarks = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(run_benchmarks)
+
+
+class CompareResultsTests(unittest.TestCase):
+    # Saves benchmark results with the given median times per operation
+    def write_results(self, filename, medians):
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "commit": None, "results": {name: {"median": value, "min": value, "mean": value} for name, value in medians.items()}}, f)
+
+    # Verifies that only slowdowns above the threshold are counted as regressions
+    def test_flags_regressions_above_threshold(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            old_file = os.path.join(tmp_dir, "old.json")
+            new_file = os.path.join(tmp_dir, "new.json")
+            self.write_results(old_file, {"display_time": 1e-6, "poll_cycle": 2e-4, "colorize_line": 1e-5})
+            self.write_results(new_file, {"display_time": 1.05e-6, "poll_cycle": 3e-4, "colorize_line": 5e-6, "write_csv_entry": 2e-5})
+
+            output = io.StringIO()
+            with redirect_stdout(output):
+                regressions = run_benchmarks.compare_results(old_file, new_file, threshold=0.1)
+
+        self.assertEqual(regressions, 1)
+        self.assertRegex(output.getvalue(), r"poll_cycle .*\+50\.0%  REGRESSION")
+        self.assertRegex(output.getvalue(), r"colorize_line .*-50\.0%  faster")
+        self.assertIn("only in new", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import steam_fake_api
+import steam_monitor
+
+
+class FakeSteamApiTests(unittest.TestCase):
+    SCENARIO = {
+        "users": {
+            "76561197960265729": {
+                "profile": {"personaname": "alice", "personastate": 0, "level": 5, "friends": ["76561197960265730"], "games": {"570": 100}},
+                "timeline": [
+                    {"at": 100, "personastate": 1, "gameid": "570", "gameextrainfo": "Dota 2"},
+                    {"at": 200, "gameid": None, "gameextrainfo": None, "games": {"570": 130}, "recent": {"570": 30}, "achievements": {"570": {"ACH_1": None}}},
+                ],
+            },
+            "76561197960265730": {"profile": {"personaname": "bob", "communityvisibilitystate": 1}},
+        },
+        "vanity": {"alice": "76561197960265729"},
+    }
+
+    def setUp(self):
+        self.now = 1000000.0
+        self.api = steam_fake_api.FakeSteamApi(self.SCENARIO, clock=lambda: self.now)
+        self.server = steam_fake_api.start_server(self.api)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    # Returns WebAPI client of steam_monitor connected to the fake server
+    def make_webapi(self):
+        with patch.object(steam_monitor, "STEAM_API_URL", self.server.url), patch.object(steam_monitor, "STEAM_API_KEY", "test-key"):
+            return steam_monitor.create_webapi()
+
+    # Verifies that the steam library's WebAPI client works against the fake server and timelines advance with the clock
+    def test_serves_timeline_through_webapi_client(self):
+        s_api = self.make_webapi()
+
+        player = s_api.call("ISteamUser.GetPlayerSummaries", steamids="76561197960265729")["response"]["players"][0]
+        self.assertEqual((player["personaname"], player["personastate"]), ("alice", 0))
+
+        self.now += 150
+        player = s_api.call("ISteamUser.GetPlayerSummaries", steamids="76561197960265729")["response"]["players"][0]
+        self.assertEqual((player["personastate"], player["gameextrainfo"]), (1, "Dota 2"))
+
+        self.now += 100
+        achievements = steam_monitor.fetch_game_achievements(s_api, "76561197960265729", 570)
+        self.assertEqual(achievements, [{"apiname": "ACH_1", "unlocktime": 1000200}])
+        with self.assertRaises(steam_monitor.req.exceptions.HTTPError):
+            s_api.call("ISteamUser.GetFriendList", steamid="76561197960265730", relationship="friend")
+
+    # Verifies that vanity URLs and persona name history are resolved by the fake server
+    def test_serves_vanity_and_community_endpoints(self):
+        with patch.object(steam_monitor, "STEAM_API_URL", self.server.url), patch.object(steam_monitor, "STEAM_COMMUNITY_URL", self.server.url):
+            self.assertEqual(steam_monitor.resolve_steam_community_url("https://steamcommunity.com/id/Alice/", "test-key"), 76561197960265729)
+            self.assertEqual(steam_monitor.fetch_persona_name_history("76561197960265730"), [])
+
+    # Verifies that requests above the concurrency limit are throttled with HTTP 429
+    def test_injects_throttling(self):
+        api = steam_fake_api.FakeSteamApi(self.SCENARIO, max_inflight=1)
+        api.in_flight = 1
+        status, _, headers = api.handle("/IPlayerService/GetSteamLevel/v1/", {"key": "k", "steamid": "76561197960265729"})
+
+        self.assertEqual((status, headers), (429, {"Retry-After": "1"}))
+        self.assertEqual(api.stats["throttled"], 1)
+
+    # Verifies that recorded responses are replayed in order
+    def test_replays_recorded_responses(self):
+        records = [
+            {"path": "/IPlayerService/GetSteamLevel/v1/", "params": {"steamid": "1"}, "status": 200, "body": {"response": {"player_level": 1}}},
+            {"path": "/IPlayerService/GetSteamLevel/v1/", "params": {"steamid": "1"}, "status": 200, "body": {"response": {"player_level": 2}}},
+        ]
+        api = steam_fake_api.ReplayApi(records)
+        levels = [api.handle("/IPlayerService/GetSteamLevel/v1/", {"key": "k", "steamid": "1"})[1]["response"]["player_level"] for _ in range(3)]
+
+        self.assertEqual(levels, [1, 2, 2])
+        self.assertEqual(api.handle("/IPlayerService/GetSteamLevel/v1/", {"steamid": "2"})[0], 404)
+
+    # Verifies that the monitoring loop detects the scripted status and game changes end to end
+    def test_monitors_user_end_to_end(self):
+        class StopMonitoring(Exception):
+            pass
+
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            self.now += 60
+            if len(sleeps) > 4:
+                raise StopMonitoring()
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                with patch.object(steam_monitor, "STEAM_API_URL", self.server.url), patch.object(steam_monitor, "STEAM_API_KEY", "test-key"), patch.object(steam_monitor, "API_RATE_LIMIT", 0), patch.object(steam_monitor.time, "sleep", side_effect=sleep), patch("builtins.print") as mock_print:
+                    with self.assertRaises(StopMonitoring):
+                        steam_monitor.steam_monitor_user(76561197960265729, None)
+            finally:
+                os.chdir(cwd)
+
+        output = "\n".join(str(c[0][0]) for c in mock_print.call_args_list if c[0])
+        self.assertIn("Steam user alice changed status from offline to online", output)
+        self.assertIn("Steam user alice started playing 'Dota 2'", output)
+        self.assertIn("Steam user alice stopped playing 'Dota 2'", output)
+
+    # Verifies that --once runs poll without sleeping and detect changes against the state saved by the previous run
+    def test_once_mode_resumes_from_saved_state(self):
+        outputs = []
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                with patch.object(steam_monitor, "STEAM_API_URL", self.server.url), patch.object(steam_monitor, "STEAM_API_KEY", "test-key"), patch.object(steam_monitor, "API_RATE_LIMIT", 0), patch.object(steam_monitor, "PLAYTIME_CHECK", True), patch.object(steam_monitor.time, "sleep") as mock_sleep:
+                    for _ in range(3):
+                        with patch("builtins.print") as mock_print:
+                            steam_monitor.steam_monitor_user(76561197960265729, None, once=True)
+                        outputs.append("\n".join(str(c[0][0]) for c in mock_print.call_args_list if c[0]))
+                        self.now += 150
+                self.assertTrue(os.path.isfile("steam_76561197960265729_state.json"))
+            finally:
+                os.chdir(cwd)
+
+        mock_sleep.assert_not_called()
+        self.assertNotIn("changed status", outputs[0])
+        self.assertIn("Monitoring state loaded from file", outputs[1])
+        self.assertIn("Steam user alice changed status from offline to online", outputs[1])
+        self.assertIn("Steam user alice started playing 'Dota 2'", outputs[1])
+        self.assertIn("Steam user alice stopped playing 'Dota 2'", outputs[2])
+        self.assertIn("Steam user alice played 'Dota 2' for 30 minutes", outputs[2])
+
+
+class SimulationTests(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+        self.addCleanup(os.chdir, cwd)
+        for name, value in (("STEAM_CHECK_INTERVAL", 60), ("STEAM_ACTIVE_CHECK_INTERVAL", 60), ("api_call_counts", {}), ("circuit_breakers", {}), ("_api_rate_limiter", None), ("_concurrency_limiter", None)):
+            patcher = patch.object(steam_monitor, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    # Verifies that a day of monitoring runs on the virtual clock, with short offline interruptions and away/snooze estimates
+    def test_simulates_day_of_monitoring(self):
+        scenario = {"users": {"76561197960265729": {
+            "profile": {"personaname": "alice", "personastate": 1},
+            "timeline": [{"at": 3000, "personastate": 0}, {"at": 3200, "personastate": 1}, {"at": 5000, "personastate": 3}, {"at": 6000, "personastate": 4}],
+        }}}
+        scenario_file = os.path.join(self.tmp_dir, "scenario.json")
+        with open(scenario_file, "w", encoding="utf-8") as f:
+            steam_monitor.json.dump(scenario, f)
+        rate_limiter = steam_monitor.get_api_rate_limiter()
+
+        with patch("builtins.print") as mock_print:
+            real_start_ts = steam_monitor.time.monotonic()
+            steam_monitor.run_simulation(76561197960265729, scenario_file, 86400, None)
+            real_duration = steam_monitor.time.monotonic() - real_start_ts
+
+        output = "\n".join(str(c[0][0]) for c in mock_print.call_args_list if c[0])
+        self.assertIn("Short offline interruption (4 minutes), online start timestamp set back", output)
+        self.assertIn("User was likely inactive for ~21 minutes total before status changed to snooze", output)
+        self.assertEqual(steam_monitor.api_call_counts["ISteamUser.GetPlayerSummaries"], 1440)
+        self.assertLess(real_duration, 30)
+        self.assertIs(steam_monitor.clock, steam_monitor.time)
+        self.assertIs(steam_monitor.get_api_rate_limiter(), rate_limiter)
+        self.assertEqual(steam_monitor.circuit_breakers, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,12 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+import urllib.error
+import urllib.request
 from unittest.mock import Mock, patch
 
 import steam_monitor
@@ -74,6 +82,813 @@ class ResolveSteamCommunityUrlTests(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "Only Steam user profile URLs are supported"):
             steam_monitor.resolve_steam_community_url("https://steamcommunity.com/groups/Valve/", "test-key")
 
+    # Verifies that resolved and unknown vanity names are served from the cache without HTTP requests
+    def test_caches_vanity_names(self):
+        found = self.make_response(payload={"response": {"steamid": "76561197960265740", "success": 1}})
+        not_found = self.make_response(payload={"response": {"success": 42, "message": "No match"}})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = steam_monitor.DiskCache(os.path.join(tmp_dir, "vanity.json"), ttl=3600)
+            with patch.object(steam_monitor.req, "get", side_effect=[found, not_found]) as get_mock, patch.object(steam_monitor, "VANITY_CACHE_NEGATIVE_TTL", 60):
+                for _ in range(2):
+                    self.assertEqual(steam_monitor.resolve_steam_community_url("https://steamcommunity.com/id/MisiekToja/", "test-key", cache=cache), 76561197960265740)
+                    with self.assertRaisesRegex(ValueError, "No match"):
+                        steam_monitor.resolve_steam_community_url("https://steamcommunity.com/id/does-not-exist/", "test-key", cache=cache)
+
+        self.assertEqual(get_mock.call_count, 2)
+
+    # Verifies that the bulk resolver returns resolved IDs and errors per URL
+    def test_resolves_urls_in_bulk(self):
+        urls = ["https://steamcommunity.com/profiles/76561197960265740/", "https://example.com/id/x/"]
+        with patch.object(steam_monitor, "VANITY_CACHE_FILE", ""):
+            resolved, errors = steam_monitor.resolve_steam_community_urls(urls, "test-key")
+
+        self.assertEqual(resolved, {urls[0]: 76561197960265740})
+        self.assertEqual(errors, {urls[1]: "Invalid Steam community URL"})
+
+    # Verifies that names cached as not found and invalid URLs are answered without taking a rate limiter slot
+    def test_bulk_resolve_skips_rate_limiter_for_cached_names(self):
+        urls = ["https://steamcommunity.com/id/gone/", "https://example.com/id/x/"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = steam_monitor.DiskCache(os.path.join(tmp_dir, "vanity.json"))
+            cache.set("gone", "")
+            limiter = Mock()
+            with patch.object(steam_monitor, "get_vanity_cache", return_value=cache), patch.object(steam_monitor, "get_api_rate_limiter", return_value=limiter), patch.object(steam_monitor.req, "get") as mock_get:
+                resolved, errors = steam_monitor.resolve_steam_community_urls(urls, "test-key")
+
+        self.assertEqual(resolved, {})
+        self.assertEqual(errors[urls[0]], "Steam community URL could not be resolved: No match")
+        limiter.acquire.assert_not_called()
+        mock_get.assert_not_called()
+
+
+class DiskCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp_dir.name, "cache.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    # Verifies that entries older than the TTL are only served when stale entries are allowed
+    def test_expires_entries_after_ttl(self):
+        cache = steam_monitor.DiskCache(self.cache_file, ttl=60)
+        cache.set("a", {"personaname": "old"}, ts=1)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("a", allow_stale=True), {"personaname": "old"})
+
+    # Verifies that the least recently used entries are evicted first
+    def test_evicts_least_recently_used_entries(self):
+        cache = steam_monitor.DiskCache(self.cache_file, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    # Verifies that saving merges entries written by another cache instance
+    def test_save_merges_entries_from_other_instances(self):
+        first = steam_monitor.DiskCache(self.cache_file)
+        second = steam_monitor.DiskCache(self.cache_file)
+        first.set("a", 1)
+        first.save()
+        second.set("b", 2)
+        second.save()
+
+        reloaded = steam_monitor.DiskCache(self.cache_file)
+        self.assertEqual(reloaded.get("a"), 1)
+        self.assertEqual(reloaded.get("b"), 2)
+
+
+class FetchPlayerSummariesTests(unittest.TestCase):
+    # Verifies that only cache misses are requested from the API
+    def test_requests_only_cache_misses(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = steam_monitor.DiskCache(os.path.join(tmp_dir, "profiles.json"), ttl=3600)
+            cache.set("1", {"personaname": "cached", "realname": "", "avatar": ""})
+            s_api = Mock()
+            s_api.call.return_value = {"response": {"players": [{"steamid": "2", "personaname": "fetched"}]}}
+
+            profiles = steam_monitor.fetch_player_summaries(s_api, ["1", "2"], cache)
+
+        self.assertEqual(profiles["1"]["personaname"], "cached")
+        self.assertEqual(profiles["2"]["personaname"], "fetched")
+        s_api.call.assert_called_once_with("ISteamUser.GetPlayerSummaries", steamids="2")
+
+    # Verifies that a failed chunk is reported and its expired cached profiles are used instead
+    def test_failed_chunk_falls_back_to_stale_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = steam_monitor.DiskCache(os.path.join(tmp_dir, "profiles.json"), ttl=3600)
+            cache.set("1", {"personaname": "stale", "realname": "", "avatar": ""}, ts=1)
+            s_api = Mock()
+            s_api.call.side_effect = ValueError("boom")
+
+            with patch.object(steam_monitor, "API_RATE_LIMIT", 0), patch("builtins.print") as mock_print:
+                profiles = steam_monitor.fetch_player_summaries(s_api, ["1", "2"], cache)
+
+        self.assertEqual(profiles, {"1": {"personaname": "stale", "realname": "", "avatar": ""}})
+        self.assertIn("Cannot fetch profile details of 2 users", mock_print.call_args[0][0])
+
+
+class FriendsBaselineTests(unittest.TestCase):
+    # Verifies that the linear merge diff reports added and removed IDs
+    def test_diff_sorted_ids(self):
+        added, removed = steam_monitor.diff_sorted_ids([1, 3, 5, 7], [2, 3, 7, 8, 9])
+
+        self.assertEqual(added, [2, 8, 9])
+        self.assertEqual(removed, [1, 5])
+
+    # Verifies that the binary baseline round-trips as a sorted uint64 array
+    def test_u64_array_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "friends.bin")
+            steam_monitor.save_u64_array(filename, [76561197960265740, 76561197960265729])
+
+            self.assertEqual(os.path.getsize(filename), 16)
+            self.assertEqual(list(steam_monitor.load_u64_array(filename)), [76561197960265729, 76561197960265740])
+
+
+class FriendsGraphTests(unittest.TestCase):
+    FRIENDS = {
+        1: [2, 3],
+        2: [1, 3, 4],
+        3: [1, 2],
+        4: [2, 5],
+    }
+
+    # Builds a fake WebAPI serving friends lists and summaries from FRIENDS
+    def make_api(self):
+        def call(method, **kwargs):
+            if method == "ISteamUser.GetFriendList":
+                steamid = int(kwargs["steamid"])
+                if steamid not in self.FRIENDS:
+                    raise Exception("401 Unauthorized")
+                return {"friendslist": {"friends": [{"steamid": str(f)} for f in self.FRIENDS[steamid]]}}
+            if method == "ISteamUser.GetPlayerSummaries":
+                return {"response": {"players": [{"steamid": sid, "personaname": f"user{sid}"} for sid in kwargs["steamids"].split(",")]}}
+            raise AssertionError(method)
+
+        s_api = Mock()
+        s_api.call.side_effect = call
+        return s_api
+
+    # Verifies that the crawl saves a CSR index supporting mutual friends and shortest path queries
+    def test_crawl_and_query_graph(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            graph_dir = os.path.join(tmp_dir, "graph")
+            with patch.object(steam_monitor.steam.webapi, "WebAPI", return_value=self.make_api()), patch.object(steam_monitor, "PROFILE_CACHE_FILE", ""), patch("builtins.print"):
+                meta = steam_monitor.crawl_friends_graph(1, 2, graph_dir)
+            graph = steam_monitor.load_friends_graph(graph_dir)
+
+            self.assertEqual(meta["nodes"], 4)
+            self.assertEqual(list(graph["nodes"]), [1, 2, 3, 4])
+            self.assertEqual(steam_monitor.graph_mutual_friends(graph, 1, 2), [3])
+            self.assertEqual(steam_monitor.graph_shortest_path(graph, 1, 4), [1, 2, 4])
+            self.assertIsNone(steam_monitor.graph_shortest_path(graph, 1, 5))
+            self.assertEqual(graph["profiles"]["4"], "user4")
+            self.assertTrue(steam_monitor.graph_is_expanded(graph, 2))
+            self.assertFalse(steam_monitor.graph_is_expanded(graph, 4))
+            steam_monitor.close_friends_graph(graph)
+
+
+class FetchRecentAchievementsTests(unittest.TestCase):
+    # Verifies that games with unchanged playtime are served from the cache and top-N is ordered by unlock time
+    def test_skips_games_with_unchanged_playtime(self):
+        s_played = {"response": {"games": [{"appid": 10, "name": "A", "playtime_forever": 100}, {"appid": 20, "name": "B", "playtime_forever": 50}]}}
+        s_api = Mock()
+        s_api.call.side_effect = lambda method, **kwargs: {"playerstats": {"achievements": [
+            {"apiname": f"ach{kwargs['appid']}_{i}", "achieved": 1, "unlocktime": kwargs["appid"] * 100 + i} for i in range(3)
+        ]}}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch.object(steam_monitor, "ACHIEVEMENTS_CACHE_FILE", os.path.join(tmp_dir, "ach.json")), patch.object(steam_monitor, "_achievements_cache", None), patch.object(steam_monitor, "SCHEMA_CACHE_FILE", ""):
+                first = steam_monitor.fetch_recent_achievements(1, s_api, s_played, max_achievements=2)
+                s_played["response"]["games"][1]["playtime_forever"] = 60
+                second = steam_monitor.fetch_recent_achievements(1, s_api, s_played, max_achievements=4)
+
+        self.assertEqual([a["unlocktime"] for a in first], [2002, 2001])
+        self.assertEqual([a["unlocktime"] for a in second], [2002, 2001, 2000, 1002])
+        self.assertEqual(sorted(c[1]["appid"] for c in s_api.call.call_args_list if c[0][0] == "ISteamUserStats.GetPlayerAchievements"), [10, 20, 20])
+
+
+class AchievementTrackingTests(unittest.TestCase):
+    # Verifies that only achievements unlocked after the per-game watermark are reported, once
+    def test_reports_only_new_unlocks(self):
+        s_api = Mock()
+        s_api.call.return_value = {"playerstats": {"achievements": [
+            {"apiname": "OLD", "achieved": 1, "unlocktime": 900},
+            {"apiname": "NEW", "achieved": 1, "unlocktime": 1100},
+            {"apiname": "LOCKED", "achieved": 0, "unlocktime": 0},
+        ]}}
+        watermarks = {}
+        changed_games = {10: ("Game", 60, 600)}
+
+        with patch.object(steam_monitor, "ACHIEVEMENTS_CACHE_FILE", ""), patch.object(steam_monitor, "SCHEMA_CACHE_FILE", ""):
+            unlocks, failed = steam_monitor.fetch_new_achievements(s_api, 1, changed_games, watermarks, 1000)
+            unlocks_again, _ = steam_monitor.fetch_new_achievements(s_api, 1, changed_games, watermarks, 1000)
+
+        self.assertEqual([(a["name"], a["game"], a["appid"]) for a in unlocks], [("NEW", "Game", 10)])
+        self.assertEqual(failed, [])
+        self.assertEqual(unlocks_again, [])
+
+    # Verifies that profile CSV files from older versions get the new columns
+    def test_upgrades_legacy_profile_csv_header(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "profile.csv")
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write('"Date","Event","OldValue","NewValue","Delta","FriendSteamID","FriendPersona","FriendRealName"\n"2026-01-01","name_change","a","b","","","",""\n')
+
+            steam_monitor.init_profile_csv_file(filename)
+
+            with open(filename, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+
+        self.assertTrue(lines[0].endswith('"AppID","GameName"'))
+        self.assertTrue(lines[1].endswith('"",""'))
+
+
+class PlaytimeTrackingTests(unittest.TestCase):
+    # Verifies that only games with increased playtime are reported, missing games keep their last playtime and
+    # the previous playtimes are reused unchanged when nothing was played
+    def test_diffs_games_playtimes(self):
+        last_playtimes = {10: 100, 20: 50, 30: 7}
+        played, playtimes = steam_monitor.diff_games_playtimes(last_playtimes, {10: 145, 20: 50, 40: 3})
+
+        self.assertEqual(played, [(10, 100, 145)])
+        self.assertEqual(playtimes, {10: 145, 20: 50, 30: 7, 40: 3})
+        self.assertEqual(last_playtimes, {10: 100, 20: 50, 30: 7})
+        self.assertIs(steam_monitor.diff_games_playtimes(playtimes, {10: 145, 20: 40})[1], playtimes)
+
+    # Verifies that a game newly appearing in recently played games is reported with its last 2 weeks playtime
+    def test_reports_games_new_in_recently_played(self):
+        last_playtimes = {10: 100}
+        played, playtimes = steam_monitor.diff_games_playtimes(last_playtimes, {10: 100, 20: 530, 30: 40}, {10: 5, 20: 30})
+
+        self.assertEqual(played, [(20, 500, 530)])
+        self.assertEqual(playtimes, {10: 100, 20: 530, 30: 40})
+
+
+class GameSchemaCacheTests(unittest.TestCase):
+    # Verifies that display names come from the cached schema and it is fetched only once
+    def test_joins_names_from_cached_schema(self):
+        s_api = Mock()
+        s_api.call.return_value = {"game": {"gameVersion": "3", "availableGameStats": {"achievements": [{"name": "WIN", "displayName": "Winner", "description": "Win a match"}]}}}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch.object(steam_monitor, "SCHEMA_CACHE_FILE", os.path.join(tmp_dir, "schema.json")), patch.object(steam_monitor, "_schema_cache", None):
+                first = steam_monitor.describe_achievements(s_api, 10, [{"apiname": "WIN", "unlocktime": 1}])
+                second = steam_monitor.describe_achievements(s_api, 10, [{"apiname": "WIN", "unlocktime": 2}])
+
+        self.assertEqual((first[0]["name"], first[0]["description"]), ("Winner", "Win a match"))
+        self.assertEqual(second[0]["name"], "Winner")
+        s_api.call.assert_called_once_with("ISteamUserStats.GetSchemaForGame", appid=10, l="english")
+
+
+class DisplayUserInfoTests(unittest.TestCase):
+    # Verifies that info mode issues its requests concurrently and still prints the sections in the usual order
+    def test_fetches_concurrently_and_prints_in_order(self):
+        responses = {
+            "ISteamUser.GetPlayerSummaries": {"response": {"players": [{"personaname": "alice", "personastate": 1, "communityvisibilitystate": 3}]}},
+            "IPlayerService.GetRecentlyPlayedGames": {"response": {}},
+            "IPlayerService.GetSteamLevel": {"response": {"player_level": 7}},
+            "IPlayerService.GetBadges": {"response": {}},
+            "ISteamUser.GetPlayerBans": {"players": []},
+            "ISteamUser.GetFriendList": {"friendslist": {"friends": [{"steamid": "2"}]}},
+            "IPlayerService.GetOwnedGames": {"response": {}},
+        }
+        barrier = steam_monitor.threading.Barrier(len(responses) - 1, timeout=5)
+
+        def call(method, **kwargs):
+            # Every request after the player summary waits until all of them are in flight
+            if method != "ISteamUser.GetPlayerSummaries":
+                barrier.wait()
+            return responses[method]
+
+        s_api = Mock()
+        s_api.call.side_effect = call
+
+        # Fresh limiters, so the throttling state left by other tests cannot hold the requests back
+        with patch.object(steam_monitor.steam.webapi, "WebAPI", return_value=s_api), patch.object(steam_monitor, "API_RATE_LIMIT", 0), patch.object(steam_monitor, "_concurrency_limiter", None), patch("builtins.print") as mock_print:
+            steam_monitor.display_user_info(1)
+
+        output = "\n".join(str(c[0][0]) for c in mock_print.call_args_list if c[0])
+        self.assertLess(output.index("Display name:"), output.index("Steam level:"))
+        self.assertLess(output.index("Steam level:"), output.index("Friends:"))
+
+    # Verifies that no other requests are issued for a user who does not exist
+    def test_checks_user_exists_before_fan_out(self):
+        s_api = Mock()
+        s_api.call.return_value = {"response": {"players": []}}
+
+        with patch.object(steam_monitor.steam.webapi, "WebAPI", return_value=s_api), patch("builtins.print"):
+            with self.assertRaises(SystemExit):
+                steam_monitor.display_user_info(1)
+
+        s_api.call.assert_called_once_with("ISteamUser.GetPlayerSummaries", steamids="1")
+
+
+class BatchInfoTests(unittest.TestCase):
+    # Verifies that summaries and bans are requested once per chunk and unknown users are reported as errors
+    def test_batches_summaries_and_bans(self):
+        def call(method, **kwargs):
+            if method == "ISteamUser.GetPlayerSummaries":
+                return {"response": {"players": [{"steamid": "1", "personaname": "alice", "personastate": 1, "communityvisibilitystate": 3}]}}
+            if method == "ISteamUser.GetPlayerBans":
+                return {"players": [{"SteamId": "1", "VACBanned": False, "NumberOfVACBans": 0}]}
+            if method == "IPlayerService.GetSteamLevel":
+                return {"response": {"player_level": 5}}
+            return {"response": {}}
+
+        s_api = Mock()
+        s_api.call.side_effect = call
+
+        with steam_monitor.ThreadPoolExecutor(max_workers=2) as executor:
+            records = {r["Input"]: r for r in steam_monitor.batch_user_info(s_api, ["1", "2"], executor)}
+
+        self.assertEqual((records["1"]["Name"], records["1"]["Level"], records["1"]["VACBans"]), ("alice", 5, 0))
+        self.assertEqual(records["2"]["Error"], "User does not exist")
+        summary_calls = [c for c in s_api.call.call_args_list if c[0][0] == "ISteamUser.GetPlayerSummaries"]
+        self.assertEqual(len(summary_calls), 1)
+        self.assertEqual(summary_calls[0][1]["steamids"], "1,2")
+
+
+class AppIndexTests(unittest.TestCase):
+    # Verifies that the app index resolves AppIDs to names and keeps unknown AppIDs as numbers
+    def test_looks_up_game_names(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "apps.bin")
+            count = steam_monitor.save_app_index(filename, [(730, "Counter-Strike 2"), (570, "Dota 2"), (10, "Zażółć"), (570, "")])
+            app_index = steam_monitor.AppIndex(filename)
+
+            with patch.object(steam_monitor, "APP_INDEX_FILE", filename), patch.object(steam_monitor, "_app_index", None), patch.object(steam_monitor, "_app_index_stamp", None):
+                formatted = steam_monitor.format_appids([570, 999])
+
+            self.assertEqual(count, 3)
+            self.assertEqual((app_index.get(10), app_index.get(730), app_index.get(11)), ("Zażółć", "Counter-Strike 2", None))
+            self.assertEqual(formatted, "Dota 2 (570), 999")
+            del app_index
+
+    # Verifies that a refreshed index file is picked up by a running process and a failed load is retried
+    def test_reloads_changed_index_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "apps.bin")
+            with open(filename, "wb") as f:
+                f.write(b"broken")
+
+            with patch.object(steam_monitor, "APP_INDEX_FILE", filename), patch.object(steam_monitor, "_app_index", None), patch.object(steam_monitor, "_app_index_stamp", None), patch("builtins.print"):
+                self.assertIsNone(steam_monitor.get_app_name(570))
+                steam_monitor.save_app_index(filename, [(570, "Dota 2")])
+                self.assertEqual(steam_monitor.get_app_name(570), "Dota 2")
+                steam_monitor.save_app_index(filename, [(570, "Dota 2"), (730, "Counter-Strike 2")])
+                self.assertEqual(steam_monitor.get_app_name(730), "Counter-Strike 2")
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    # Builds an HTTP error with the given status code as raised by the Steam WebAPI wrapper
+    def make_http_error(self, status_code, headers=None):
+        response = Mock()
+        response.status_code = status_code
+        response.headers = headers or {}
+        return steam_monitor.req.exceptions.HTTPError(f"{status_code} Error", response=response)
+
+    # Verifies that the endpoint is paused after repeated server errors and a successful probe closes it again
+    def test_opens_after_failures_and_closes_after_probe(self):
+        s_api = Mock()
+        s_api.call.side_effect = [self.make_http_error(503), self.make_http_error(503), {"response": {}}]
+
+        with patch.object(steam_monitor, "circuit_breakers", {}), patch.object(steam_monitor, "API_BREAKER_FAILURE_THRESHOLD", 2), patch.object(steam_monitor, "API_BACKOFF_BASE", 10), patch.object(steam_monitor, "API_BACKOFF_MAX", 100), patch.object(steam_monitor, "API_RATE_LIMIT", 0):
+            for _ in range(2):
+                with self.assertRaises(steam_monitor.req.exceptions.HTTPError):
+                    steam_monitor.api_call(s_api, "IPlayerService.GetBadges", steamid=1)
+            with self.assertRaises(steam_monitor.CircuitOpenError):
+                steam_monitor.api_call(s_api, "IPlayerService.GetBadges", steamid=1)
+            breaker = steam_monitor.get_circuit_breaker("IPlayerService.GetBadges")
+            self.assertEqual(breaker.state, "open")
+            self.assertTrue(9 < breaker.retry_in() <= 100)
+            self.assertEqual(steam_monitor.get_circuit_breaker("ISteamUser.GetPlayerSummaries").state, "closed")
+
+            breaker.open_until = 0
+            steam_monitor.api_call(s_api, "IPlayerService.GetBadges", steamid=1)
+            self.assertEqual(breaker.state, "closed")
+
+        self.assertEqual(s_api.call.call_count, 3)
+
+    # Verifies that non-transient errors neither reset the failure count nor keep a half-open probe in flight
+    def test_non_transient_errors_leave_breaker_state(self):
+        s_api = Mock()
+        s_api.call.side_effect = [self.make_http_error(503), self.make_http_error(403), self.make_http_error(503), self.make_http_error(403), {"response": {}}]
+
+        with patch.object(steam_monitor, "circuit_breakers", {}), patch.object(steam_monitor, "API_BREAKER_FAILURE_THRESHOLD", 2), patch.object(steam_monitor, "API_RATE_LIMIT", 0):
+            for _ in range(3):
+                with self.assertRaises(steam_monitor.req.exceptions.HTTPError):
+                    steam_monitor.api_call(s_api, "IPlayerService.GetBadges", steamid=1)
+            breaker = steam_monitor.get_circuit_breaker("IPlayerService.GetBadges")
+            self.assertEqual(breaker.state, "open")
+
+            breaker.open_until = 0
+            with self.assertRaises(steam_monitor.req.exceptions.HTTPError):
+                steam_monitor.api_call(s_api, "IPlayerService.GetBadges", steamid=1)
+            self.assertEqual(breaker.state, "half-open")
+            steam_monitor.api_call(s_api, "IPlayerService.GetBadges", steamid=1)
+            self.assertEqual(breaker.state, "closed")
+
+    # Verifies that rate limit errors pause the endpoint immediately for at least Retry-After seconds
+    def test_rate_limit_opens_immediately(self):
+        breaker = steam_monitor.CircuitBreaker("test", failure_threshold=5, base_delay=1, max_delay=2)
+        transient, retry_after = steam_monitor.get_transient_api_error(self.make_http_error(429, {"Retry-After": "60"}))
+        breaker.record_failure(retry_after)
+
+        self.assertTrue(transient)
+        self.assertEqual(breaker.state, "open")
+        self.assertGreater(breaker.retry_in(), 58)
+        self.assertEqual(steam_monitor.get_transient_api_error(self.make_http_error(403)), (False, None))
+
+
+class SnapshotRecorderTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_file = os.path.join(self.tmp_dir.name, "api.snap")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    # Verifies that JSON deltas reproduce nested dict and list changes, including removals and shrinking lists
+    def test_json_diff_round_trip(self):
+        old = {"a": 1, "b": {"c": [1, 2, 3], "d": "x"}, "e": [{"f": 1}]}
+        new = {"a": 2, "b": {"c": [1, 5], "g": True}, "e": [{"f": 1}, {"f": 2}]}
+        changes = steam_monitor.diff_json(old, new)
+
+        self.assertEqual(steam_monitor.apply_json_diff(old, changes), new)
+        self.assertEqual(steam_monitor.diff_json(new, new), [])
+
+    # Verifies that responses are read back per request across blocks and time ranges use the time index
+    def test_records_and_reads_back_responses(self):
+        virtual_clock = steam_monitor.VirtualClock(1000)
+        with patch.object(steam_monitor, "clock", virtual_clock):
+            recorder = steam_monitor.SnapshotRecorder(self.snapshot_file, block_records=3, flush_interval=3600)
+            for level in range(5):
+                recorder.record("IPlayerService.GetSteamLevel", {"steamid": 1}, {"response": {"player_level": level, "badges": list(range(50))}})
+                recorder.record("ISteamUser.GetPlayerSummaries", {"steamids": "1"}, {"response": {"players": [{"personastate": 1}]}})
+                virtual_clock.sleep(60)
+            error = steam_monitor.req.exceptions.HTTPError("500 Error", response=Mock(status_code=500))
+            recorder.record("IPlayerService.GetSteamLevel", {"steamid": 1}, error=error)
+            recorder.close()
+
+        snapshots = list(steam_monitor.read_snapshots(self.snapshot_file))
+        levels = [s["response"]["response"]["player_level"] for s in snapshots if s["method"] == "IPlayerService.GetSteamLevel" and "response" in s]
+        self.assertEqual(len(snapshots), 11)
+        self.assertEqual(levels, [0, 1, 2, 3, 4])
+        self.assertEqual(snapshots[-1], {"error": "500 Error", "status": 500, "ts": 1300, "method": "IPlayerService.GetSteamLevel", "params": {"steamid": 1}})
+        self.assertEqual(os.path.getsize(self.snapshot_file + ".idx"), 4 * steam_monitor.SNAPSHOT_INDEX_ENTRY.size)
+
+        in_range = list(steam_monitor.read_snapshots(self.snapshot_file, 1120, 1180))
+        self.assertEqual([(s["ts"], s["response"]["response"].get("player_level")) for s in in_range], [(1120, 2), (1120, None), (1180, 3), (1180, None)])
+
+    # Verifies that a block missing in the time index is dropped when recording resumes
+    def test_drops_unindexed_block_on_reopen(self):
+        recorder = steam_monitor.SnapshotRecorder(self.snapshot_file, block_records=1)
+        recorder.record("IPlayerService.GetSteamLevel", {"steamid": 1}, {"response": {"player_level": 1}})
+        recorder.close()
+        with open(self.snapshot_file, "ab") as f:
+            f.write(b"SMS1\x10\x00\x00\x00partial")
+
+        recorder = steam_monitor.SnapshotRecorder(self.snapshot_file, block_records=1)
+        recorder.record("IPlayerService.GetSteamLevel", {"steamid": 1}, {"response": {"player_level": 2}})
+        recorder.close()
+
+        self.assertEqual([s["response"]["response"]["player_level"] for s in steam_monitor.read_snapshots(self.snapshot_file)], [1, 2])
+
+
+class MetricsTests(unittest.TestCase):
+    # Verifies that API request latencies and errors are exported per endpoint with cumulative histogram buckets
+    def test_exports_api_metrics_over_http(self):
+        s_api = Mock()
+        s_api.call.side_effect = [{"response": {}}, steam_monitor.req.exceptions.HTTPError("403 Error", response=Mock(status_code=403))]
+        latency = steam_monitor.MetricHistogram(steam_monitor.api_request_latency.name, "latency", ("endpoint",), buckets=(0.1, 1))
+        errors = steam_monitor.MetricCounter(steam_monitor.api_request_errors.name, "errors", ("endpoint", "code"))
+
+        with patch.object(steam_monitor, "api_request_latency", latency), patch.object(steam_monitor, "api_request_errors", errors), patch.object(steam_monitor, "circuit_breakers", {}), patch.object(steam_monitor, "API_RATE_LIMIT", 0):
+            steam_monitor.api_call(s_api, "IPlayerService.GetSteamLevel", steamid=1)
+            with self.assertRaises(steam_monitor.req.exceptions.HTTPError):
+                steam_monitor.api_call(s_api, "IPlayerService.GetSteamLevel", steamid=1)
+
+            server = steam_monitor.start_metrics_server("127.0.0.1", 0)
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5) as resp:
+                    text = resp.read().decode("utf-8")
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        self.assertIn('steam_monitor_api_request_duration_seconds_bucket{endpoint="IPlayerService.GetSteamLevel",le="0.1"} 2', text)
+        self.assertIn('steam_monitor_api_request_duration_seconds_bucket{endpoint="IPlayerService.GetSteamLevel",le="+Inf"} 2', text)
+        self.assertIn('steam_monitor_api_request_duration_seconds_count{endpoint="IPlayerService.GetSteamLevel"} 2', text)
+        self.assertIn('steam_monitor_api_request_errors_total{endpoint="IPlayerService.GetSteamLevel",code="403"} 1', text)
+        self.assertIn("# TYPE steam_monitor_poll_lag_seconds histogram", text)
+
+
+class ControlEndpointTests(unittest.TestCase):
+    def setUp(self):
+        self.server = steam_monitor.start_control_server("127.0.0.1", 0)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.target = steam_monitor.MonitorTarget(76561197960265729)
+        self.target.state = steam_monitor.new_monitor_state("alice", 1, "570", "Dota 2", now=1000)
+        for name, value in (("monitor_targets", {76561197960265729: self.target}), ("STATUS_NOTIFICATION", False), ("STEAM_CHECK_INTERVAL", 600), ("STEAM_ACTIVE_CHECK_INTERVAL", 600)):
+            patcher = patch.object(steam_monitor, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    # Sends the request to the control endpoint and returns (status, decoded JSON response)
+    def request(self, method, path, data=None):
+        body = steam_monitor.json.dumps(data).encode("utf-8") if data is not None else None
+        request = urllib.request.Request(f"http://127.0.0.1:{self.server.server_address[1]}{path}", data=body, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=5) as resp:
+                return resp.status, steam_monitor.json.loads(resp.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            return e.code, steam_monitor.json.loads(e.read().decode("utf-8"))
+
+    # Verifies that the state of monitored users is reported and invalid settings changes are rejected as a whole
+    def test_reports_state_and_applies_valid_settings_only(self):
+        status, state = self.request("GET", "/state")
+        self.assertEqual(status, 200)
+        self.assertEqual(state["targets"][0]["username"], "alice")
+        self.assertEqual(state["targets"][0]["game"], "Dota 2")
+
+        with patch("builtins.print"):
+            status, result = self.request("POST", "/settings", {"STATUS_NOTIFICATION": True, "STEAM_CHECK_INTERVAL": "60"})
+            self.assertEqual(status, 400)
+            self.assertFalse(steam_monitor.STATUS_NOTIFICATION)
+
+            status, result = self.request("POST", "/settings", {"STATUS_NOTIFICATION": True, "STEAM_CHECK_INTERVAL": 60})
+        self.assertEqual(status, 200)
+        self.assertEqual(result["changed"], ["STATUS_NOTIFICATION", "STEAM_CHECK_INTERVAL"])
+        self.assertTrue(steam_monitor.STATUS_NOTIFICATION)
+        self.assertEqual(steam_monitor.STEAM_CHECK_INTERVAL, 60)
+
+    # Verifies that waiting for the next poll is cut short by forced polls, interval changes and removal of the user
+    def test_wakes_up_monitoring_loop(self):
+        def run_in_background(function):
+            results = []
+            thread = threading.Thread(target=lambda: results.append(function()))
+            thread.start()
+            time.sleep(0.2)
+            return thread, results
+
+        thread, results = run_in_background(lambda: steam_monitor.wait_for_next_poll(self.target, 600))
+        self.assertEqual(self.request("POST", "/poll", {"steamid": "76561197960265729"})[0], 200)
+        thread.join(5)
+        self.assertEqual(results, [True])
+
+        thread, results = run_in_background(lambda: steam_monitor.wait_for_next_poll(self.target, 600))
+        with patch("builtins.print"):
+            self.request("POST", "/settings", {"STEAM_ACTIVE_CHECK_INTERVAL": 1})
+        thread.join(5)
+        self.assertEqual(results, [True])
+
+        thread, results = run_in_background(lambda: steam_monitor.wait_for_next_poll(self.target, 600))
+        with patch("builtins.print"):
+            self.assertEqual(self.request("DELETE", "/targets/76561197960265729")[0], 200)
+        thread.join(5)
+        self.assertEqual(results, [False])
+        self.assertEqual(self.request("DELETE", "/targets/1")[0], 404)
+
+
+class ConfigReloadTests(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.config_file = os.path.join(tmp_dir.name, "steam_monitor.conf")
+        self.write_config("STEAM_CHECK_INTERVAL = 120\nSTEAM_ACTIVE_CHECK_INTERVAL = 60\n")
+        for name, value in (("STEAM_API_KEY", "test-key"), ("DOTENV_FILE", "none"), ("STEAM_CHECK_INTERVAL", 120), ("STEAM_ACTIVE_CHECK_INTERVAL", 60), ("LIVENESS_CHECK_COUNTER", 360), ("config_file_path", None), ("loaded_config", {}), ("pending_config", None)):
+            patcher = patch.object(steam_monitor, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        steam_monitor.remember_loaded_config(self.config_file)
+        # Value given by a command line flag
+        steam_monitor.STEAM_ACTIVE_CHECK_INTERVAL = 30
+
+    def write_config(self, text):
+        with open(self.config_file, "w", encoding="utf-8") as f:
+            f.write("STEAM_API_KEY = 'test-key'\n" + text)
+
+    # Sends SIGHUP to the config reload handler and applies the pending changes like the monitoring loop does
+    def reload(self):
+        with patch("builtins.print") as mock_print:
+            steam_monitor.reload_config_signal_handler(steam_monitor.signal.SIGHUP, None)
+            applied = steam_monitor.apply_pending_config()
+        return applied, "\n".join(str(c[0][0]) for c in mock_print.call_args_list if c[0])
+
+    # Verifies that settings changed in the config file are applied together while command line values are kept
+    def test_applies_changed_settings_only(self):
+        self.write_config("STEAM_CHECK_INTERVAL = 300\nSTEAM_ACTIVE_CHECK_INTERVAL = 60\nSTATUS_NOTIFICATION = False\n")
+        applied, output = self.reload()
+
+        self.assertTrue(applied)
+        self.assertEqual(steam_monitor.STEAM_CHECK_INTERVAL, 300)
+        self.assertEqual(steam_monitor.LIVENESS_CHECK_COUNTER, steam_monitor.LIVENESS_CHECK_INTERVAL / 300)
+        self.assertEqual(steam_monitor.STEAM_ACTIVE_CHECK_INTERVAL, 30)
+        self.assertIn("STEAM_CHECK_INTERVAL changed from 120 to 300", output)
+
+        applied, output = self.reload()
+        self.assertFalse(applied)
+        self.assertIn("no changed settings", output)
+
+    # Verifies that invalid and unreadable config files are rejected without changing any setting
+    def test_rejects_invalid_config(self):
+        self.write_config("STEAM_CHECK_INTERVAL = 300\nSTEAM_ACTIVE_CHECK_INTERVAL = 0\n")
+        applied, output = self.reload()
+        self.assertFalse(applied)
+        self.assertIn("STEAM_ACTIVE_CHECK_INTERVAL must be at least 1", output)
+        self.assertEqual(steam_monitor.STEAM_CHECK_INTERVAL, 120)
+
+        self.write_config("STEAM_CHECK_INTERVAL = '300'\nCOLOR_THEME = {'header': 'not-a-colour'}\n")
+        applied, output = self.reload()
+        self.assertFalse(applied)
+        self.assertIn("STEAM_CHECK_INTERVAL must be int, not str", output)
+
+        self.write_config("STEAM_CHECK_INTERVAL = (")
+        applied, output = self.reload()
+        self.assertFalse(applied)
+        self.assertIn("Cannot reload config file", output)
+        self.assertEqual(steam_monitor.STEAM_CHECK_INTERVAL, 120)
+
+
+class PhaseProfilerTests(unittest.TestCase):
+    # Verifies that API fetches are timed per endpoint and the breakdown is reported once per interval
+    def test_times_fetches_and_reports_per_interval(self):
+        s_api = Mock()
+        s_api.call.return_value = {"response": {}}
+        virtual_clock = steam_monitor.VirtualClock(1000)
+
+        with patch.object(steam_monitor, "clock", virtual_clock), patch.object(steam_monitor, "circuit_breakers", {}), patch.object(steam_monitor, "API_RATE_LIMIT", 0):
+            profiler = steam_monitor.PhaseProfiler(60)
+            with patch.object(steam_monitor, "phase_profiler", profiler):
+                steam_monitor.api_call(s_api, "IPlayerService.GetSteamLevel", steamid=1)
+                steam_monitor.api_call(s_api, "IPlayerService.GetSteamLevel", steamid=1)
+                profiler.add("poll", 0.5)
+                self.assertIsNone(profiler.take_report())
+                virtual_clock.sleep(60)
+                report = profiler.take_report()
+
+        lines = report.splitlines()
+        self.assertIn("(1 polls)", lines[0])
+        self.assertTrue(lines[2].startswith("poll "))
+        self.assertRegex(lines[3], r"^fetch IPlayerService.GetSteamLevel\s+2 ")
+        self.assertEqual(profiler.phases, {})
+
+
+class LazyImportsTests(unittest.TestCase):
+    # Verifies that importing the tool does not load the Steam library, requests, SMTP/email or date utilities
+    def test_heavy_modules_are_imported_on_first_use(self):
+        code = "import sys, steam_monitor; print(','.join(m for m in ('steam', 'requests', 'smtplib', 'ssl', 'email.mime.text', 'dateutil.relativedelta', 'http.server') if m in sys.modules))"
+        output = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), stdout=subprocess.PIPE, check=True).stdout.decode().strip()
+
+        self.assertEqual(output, "")
+        self.assertTrue(callable(steam_monitor.steam.webapi.WebAPI))
+        self.assertEqual(steam_monitor.relativedelta.relativedelta(years=1).years, 1)
+
+
+class AdaptiveConcurrencyLimiterTests(unittest.TestCase):
+    # Verifies that the limit is halved on overload and latency spikes and grows back additively
+    def test_aimd_limit(self):
+        limiter = steam_monitor.AdaptiveConcurrencyLimiter(8, spike_factor=3)
+
+        limiter.acquire()
+        limiter.release(0.01, overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(0.01)
+        self.assertTrue(6 < limiter.limit < 8)
+
+        limiter.last_decrease_ts = 0
+        limiter.acquire()
+        limiter.release(0.5)
+        self.assertTrue(3 < limiter.limit < 4)
+        self.assertEqual(limiter.latency_percentiles()["p50"], 0.01)
+
+    # Verifies that API requests never exceed the limit while a throttling fake API returns HTTP 429
+    def test_api_call_backs_off_on_throttling(self):
+        lock = steam_monitor.threading.Lock()
+        state = {"in_flight": 0, "max_in_flight": 0}
+
+        def call(method, **kwargs):
+            with lock:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+                throttled = state["in_flight"] > 2
+            steam_monitor.time.sleep(0.005)
+            with lock:
+                state["in_flight"] -= 1
+            if throttled:
+                response = Mock(status_code=429, headers={})
+                raise steam_monitor.req.exceptions.HTTPError("429 Too Many Requests", response=response)
+            return {}
+
+        s_api = Mock()
+        s_api.call.side_effect = call
+        limiter = steam_monitor.AdaptiveConcurrencyLimiter(8)
+
+        def request(_):
+            try:
+                steam_monitor.api_call(s_api, "ISteamUser.GetPlayerSummaries", steamids="1")
+            except Exception:
+                pass
+
+        with patch.object(steam_monitor, "_concurrency_limiter", limiter), patch.object(steam_monitor, "API_RATE_LIMIT", 0), patch.object(steam_monitor, "API_BREAKER_FAILURE_THRESHOLD", 1000), patch.object(steam_monitor, "circuit_breakers", {}):
+            with steam_monitor.ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(request, range(100)))
+
+        self.assertLess(limiter.limit, 8)
+        self.assertLessEqual(state["max_in_flight"], 8)
+
+
+class EventDetectionTests(unittest.TestCase):
+    # Verifies that a short offline interruption keeps the online start time and game totals across snapshots
+    def test_short_offline_interruption_keeps_online_session(self):
+        state = steam_monitor.new_monitor_state("alice", 1, "570", "Dota 2", now=1000)
+        snapshots = [(1600, {"status": 0}), (1700, {"status": 1}), (2000, {"status": 1, "gameid": "730", "gamename": "CS2"})]
+
+        with patch.object(steam_monitor, "OFFLINE_INTERRUPT", 420):
+            all_events = []
+            for now, snapshot in snapshots:
+                state, events = steam_monitor.detect_events(state, snapshot, now)
+                all_events.extend(events)
+
+        self.assertEqual([e["type"] for e in all_events], ["status_change", "game_change", "status_change", "game_change"])
+        self.assertEqual((all_events[0]["games_number"], all_events[0]["game_total_ts"]), (1, 600))
+        self.assertEqual(all_events[2]["short_offline_since"], 1000)
+        self.assertEqual((state["status_online_start_ts"], state["games_number"], state["game_total_ts"]), (1000, 2, 600))
+
+    # Verifies that away/snooze inactivity is estimated and the input state is left untouched
+    def test_estimates_inactivity_without_modifying_state(self):
+        state = steam_monitor.new_monitor_state("alice", 1, now=1000)
+        with patch.object(steam_monitor, "STEAM_AWAY_INACTIVITY_THRESHOLD", 300):
+            away_state, events = steam_monitor.detect_events(state, {"status": 3}, 2000)
+            snooze_state, snooze_events = steam_monitor.detect_events(away_state, {"status": 4}, 2600)
+
+        self.assertEqual(events[0]["inactivity"], ("away", 700, 300))
+        self.assertEqual(snooze_events[0]["inactivity"], ("snooze", 900, 600))
+        self.assertEqual(snooze_state["estimated_last_activity_ts"], 1700)
+        self.assertEqual((state["status"], state["estimated_last_activity_ts"]), (1, 0))
+
+    # Verifies that level, library and name changes are reported after the first snapshot sets the baseline
+    def test_detects_profile_changes(self):
+        state = steam_monitor.new_monitor_state("alice", 0)
+        state, events = steam_monitor.detect_events(state, {"status": 0, "steam_level": "5", "games_count": 1, "games_appids": {10}}, 10)
+        self.assertEqual(events, [])
+
+        state, events = steam_monitor.detect_events(state, {"status": 0, "steam_level": 6, "player_xp": 900, "games_count": 2, "games_appids": {10, 20}, "username": "bob"}, 20)
+
+        self.assertEqual([e["type"] for e in events], ["level_change", "library_change", "name_change"])
+        self.assertEqual((events[0]["old"], events[0]["new"], events[0]["xp"]), (5, 6, 900))
+        self.assertEqual(events[1]["added"], [20])
+        self.assertEqual(state["username"], "bob")
+
+
+class MonitorLoopApiCallsTests(unittest.TestCase):
+    # Verifies that recently played games are not fetched in every poll when no feature needs them
+    def test_skips_recently_played_games_between_game_changes(self):
+        player = {"personaname": "alice", "personastate": 1, "communityvisibilitystate": 3}
+
+        def call(method, **kwargs):
+            if method == "ISteamUser.GetPlayerSummaries":
+                return {"response": {"players": [player]}}
+            return {"response": {}}
+
+        s_api = Mock()
+        s_api.call.side_effect = call
+
+        class StopMonitoring(Exception):
+            pass
+
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) > 5:
+                raise StopMonitoring()
+
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                with patch.object(steam_monitor.steam.webapi, "WebAPI", return_value=s_api) as webapi_mock, patch.object(steam_monitor.time, "sleep", side_effect=sleep), patch.object(steam_monitor, "RECENTLY_PLAYED_CHECK_INTERVAL", 0), patch.object(steam_monitor, "API_RATE_LIMIT", 0), patch.object(steam_monitor, "api_call_counts", {}), patch("builtins.print"):
+                    with self.assertRaises(StopMonitoring):
+                        steam_monitor.steam_monitor_user(1, None)
+                    counts = dict(steam_monitor.api_call_counts)
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual(counts, {"ISteamUser.GetPlayerSummaries": 6, "IPlayerService.GetRecentlyPlayedGames": 1})
+        webapi_mock.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()